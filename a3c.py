@@ -7,13 +7,28 @@ import math
 import os
 import time
 import pickle
+import json
 
 from game_ac_network import GameACFFNetwork, GameACLSTMNetwork
 from a3c_training_thread import A3CTrainingThread
+from shared_graph import SharedGraphTemplate, graph_stats
+from summary_recorder import SummaryRecorder
+from status_server import StatusServer, memory_usage
+from global_counter import GlobalCounter
+import staleness
+import memory_accounting
+import checkpoint_reader
+from checkpoint_state import StateWriter, write_file
+import actor_snapshot
+import pbt
 from rmsprop_applier import RMSPropApplier
+import phase_timer
+from sampling_profiler import SamplingProfiler
+import event_log
+import log_sink
 
 import options
-options = options.options
+options = options.get_options()
 
 def log_uniform(lo, hi, rate):
   log_lo = math.log(lo)
@@ -52,6 +67,19 @@ else:
 
 training_threads = []
 
+# structured event stream
+if options.event_log is not None:
+  event_log.open_log(options.event_log)
+  # effective values (options.py overrides them by color options)
+  event_log.emit("frames", options.frames_skip_in_ale, options.frames_skip_in_gs)
+
+# sampling profiler (toggled by SIGUSR1 or control file)
+profiler = None
+if options.profiler_dir is not None:
+  profiler = SamplingProfiler(options.profiler_dir, hz=options.profiler_hz,
+                              top=options.profiler_top,
+                              control_file=options.profiler_control_file)
+
 learning_rate_input = tf.placeholder("float")
 
 grad_applier = RMSPropApplier(learning_rate = learning_rate_input,
@@ -61,12 +89,49 @@ grad_applier = RMSPropApplier(learning_rate = learning_rate_input,
                               clip_norm = options.grad_norm_clip,
                               device = device)
 
+# number of applies of gradients of all threads (for policy lag)
+update_counter = GlobalCounter(options.parallel_size)
+
+graph_build_start = time.time()
+# seconds from start of build until each thread is built
+build_sec_by_threads = []
+shared_graph = None
+if options.shared_graph:
+  print("### --shared-graph: A3C variant without local copies of weights (see shared_graph.py)")
+  shared_graph = SharedGraphTemplate(global_network, grad_applier, options.entropy_beta,
+                                     options.use_lstm, device)
+
 for i in range(options.parallel_size):
   training_thread = A3CTrainingThread(i, global_network, initial_learning_rate,
                                       learning_rate_input,
                                       grad_applier, options.max_time_step,
-                                      device = device, options = options)
+                                      device = device, options = options,
+                                      shared_graph = shared_graph,
+                                      update_counter = update_counter)
   training_threads.append(training_thread)
+  # startup time versus number of threads (with or without --shared-graph)
+  build_sec_by_threads.append(time.time() - graph_build_start)
+
+graph_build_sec = time.time() - graph_build_start
+stats = graph_stats()
+print("### Graph : {} threads, {} ops, {} variables ({:.1f} MB), graph {:.1f} MB, built in {:.1f} sec".format(
+      options.parallel_size, stats["ops"], stats["variables"], stats["variable_mb"],
+      stats["graph_mb"], graph_build_sec))
+print("### Graph build time by threads : " + " ".join(
+      "{}:{:.2f}s".format(i + 1, sec) for i, sec in enumerate(build_sec_by_threads)))
+event_log.emit("graph", options.parallel_size, stats["ops"], stats["variables"],
+               stats["variable_mb"], stats["graph_mb"], graph_build_sec, build_sec_by_threads)
+
+# population-based training over threads (ranked by Episode_scores)
+pbt_scheduler = None
+if options.pbt_interval > 0:
+  if options.train_episode_steps > 0:
+    pbt_scheduler = pbt.PBTScheduler(options.pbt_interval, fraction=options.pbt_fraction,
+                                     perturb_factor=options.pbt_perturb,
+                                     ready_episodes=options.pbt_ready_episodes,
+                                     copy_psc=options.pbt_copy_psc)
+  else:
+    print("--pbt-interval is ignored: threads are ranked by Episode_scores (--train-episode-steps > 0)")
 
 # prepare session
 sess = tf.Session(config=tf.ConfigProto(log_device_placement=False,
@@ -74,26 +139,27 @@ sess = tf.Session(config=tf.ConfigProto(log_device_placement=False,
 
 init = tf.initialize_all_variables()
 sess.run(init)
+# LSTM state of one-step graph (not saved in checkpoints)
+sess.run(tf.initialize_local_variables())
 
-# summary for tensorboard
-score_input = tf.placeholder(tf.int32)
-tf.scalar_summary("score", score_input)
-
-summary_op = tf.merge_all_summaries()
+# summary for tensorboard (written without session, see summary_recorder.py)
 summary_writer = tf.train.SummaryWriter(options.log_file, sess.graph_def)
+summary_recorder = SummaryRecorder(summary_writer, options.summary_batch_episodes)
 
 # init or load checkpoint with saver
 saver = tf.train.Saver(max_to_keep = options.max_to_keep)
-checkpoint = tf.train.get_checkpoint_state(options.checkpoint_dir)
+# latest checkpoint whose saving was not interrupted (see save_data())
+checkpoint_path = checkpoint_reader.latest_checkpoint_path(options.checkpoint_dir)
 # for pseudo-count
 psc_info = None
 all_gs_info = [None for i in range(options.parallel_size)]
-if checkpoint and checkpoint.model_checkpoint_path:
-  saver.restore(sess, checkpoint.model_checkpoint_path)
-  print("checkpoint loaded:", checkpoint.model_checkpoint_path)
-  tokens = checkpoint.model_checkpoint_path.split("-")
+# for --actor-snapshots (loaded at start, taken by each thread at stop)
+actor_snapshots = [None for i in range(options.parallel_size)]
+if checkpoint_path is not None:
+  saver.restore(sess, checkpoint_path)
+  print("checkpoint loaded:", checkpoint_path)
   # set global step
-  global_t = int(tokens[1])
+  global_t = checkpoint_reader.checkpoint_global_t(checkpoint_path)
   print(">>> global step set: ", global_t)
   # set wall time
   wall_t_fname = options.checkpoint_dir + '/' + 'wall_t.' + str(global_t)
@@ -102,21 +168,39 @@ if checkpoint and checkpoint.model_checkpoint_path:
   # for pseudo-count
   if options.psc_use:
     # psc_info of thread0 (for compatibility)
-    psc_fname = options.checkpoint_dir + '/' + 'psc.' + str(global_t)
-    if os.path.exists(psc_fname):
+    # (of previous save if it was skipped by deadline of preemption)
+    psc_fname = checkpoint_reader.find_state_file(options.checkpoint_dir, 'psc', global_t)
+    if psc_fname is not None:
       with open(psc_fname, "rb") as f:
         psc_info = pickle.load(f)
       print("psc_info loaded:", psc_fname)
     else:
-      print("psc_info does not exist and not loaded:", psc_fname)
+      print("psc_info does not exist and not loaded")
     # gs_info of all thread
-    gs_fname = options.checkpoint_dir + '/' + 'gs.' + str(global_t)
-    if os.path.exists(gs_fname):
+    gs_fname = checkpoint_reader.find_state_file(options.checkpoint_dir, 'gs', global_t)
+    if gs_fname is not None:
       with open(gs_fname, "rb") as f:
         all_gs_info = pickle.load(f)
       print("all_gs_info loaded:", gs_fname)
     else:
-      print("all_gs_info does not exist and not loaded:", gs_fname)
+      print("all_gs_info does not exist and not loaded")
+  # hyperparameters of threads changed by PBT
+  if pbt_scheduler is not None:
+    pbt_fname = checkpoint_reader.find_state_file(options.checkpoint_dir, 'pbt', global_t)
+    if pbt_fname is not None:
+      with open(pbt_fname, "r") as f:
+        pbt_scheduler.load_state(json.load(f), training_threads)
+      print("pbt state loaded:", pbt_fname)
+  # actors in progress at last stop (only with same number of threads)
+  if options.actor_snapshots:
+    actors_fname = options.checkpoint_dir + '/' + 'actors.' + str(global_t)
+    if os.path.exists(actors_fname):
+      actor_snapshots = actor_snapshot.load(actors_fname)
+      if len(actor_snapshots) == options.parallel_size:
+        print("actor snapshots loaded:", actors_fname)
+      else:
+        print("actor snapshots of {} threads not loaded: {}".format(len(actor_snapshots), actors_fname))
+        actor_snapshots = [None] * options.parallel_size
 
   next_save_steps = (global_t + options.save_time_interval)//options.save_time_interval * options.save_time_interval
 else:
@@ -125,46 +209,88 @@ else:
   wall_t = 0.0
   next_save_steps = options.save_time_interval
 
+# exact global step (global_t is updated from it by each thread)
+global_counter = GlobalCounter(options.parallel_size, global_t)
+last_save_global_t = None
+
+# writer of pseudo-count state (estimates time to save, for deadline of preemption)
+state_writer = StateWriter(options.checkpoint_dir)
+# deadline of checkpoint after SIGTERM or SIGINT (with --preemption-deadline)
+preemption_deadline = None
+
+
+def save_data(training_threads, deadline=None):
+  # Data are saved in order of priority: weights (with slots of optimizer),
+  # wall time, then pseudo-count state of threads.
+  # Checkpoint is marked as incomplete until weights and wall time are saved.
+  # With deadline (preemption), pseudo-count state is skipped if it is not
+  # expected to be saved by deadline (previous one is used when resumed).
+  global last_save_time
+  global last_save_global_t
+  # write buffered log of actor threads before log of saving
+  log_sink.flush()
+  summary_recorder.flush()
 
-def save_data(training_threads):
   if not os.path.exists(options.checkpoint_dir):
     os.mkdir(options.checkpoint_dir)  
 
   # need copy of global_t because it might be changed in other thread
-  global_t_copy = global_t
+  global_t_copy = global_counter.value()
+
+  incomplete_marker = checkpoint_reader.incomplete_marker_path(options.checkpoint_dir, global_t_copy)
+  write_file(incomplete_marker, b'')
+
+  saver.save(sess, options.checkpoint_dir + '/' + 'checkpoint', global_step = global_t_copy)
 
   # write wall time
   wall_t = time.time() - start_time
   wall_t_fname = options.checkpoint_dir + '/' + 'wall_t.' + str(global_t_copy)
-  with open(wall_t_fname, 'w') as f:
-    f.write(str(wall_t))
+  write_file(wall_t_fname, str(wall_t).encode('ascii'))
+  os.remove(incomplete_marker)
+
+  # write hyperparameters of threads changed by PBT (small)
+  if pbt_scheduler is not None:
+    pbt_fname = options.checkpoint_dir + '/' + 'pbt.' + str(global_t_copy)
+    write_file(pbt_fname, json.dumps(pbt_scheduler.state(training_threads)).encode('ascii'))
 
   # write psc_info
   if options.psc_use:
-    # write psc_info of thread0 (for compatibility)
-    game_state = training_threads[0].game_state
-    psc_n = game_state.psc_n
-    psc_vcount = game_state.psc_vcount
-    psc_fname = options.checkpoint_dir + '/' + 'psc.' + str(global_t_copy)
-    with open(psc_fname, "wb") as f:
-      pickle.dump({"psc_n":psc_n, "psc_vcount":psc_vcount}, f)
-    # write game_state info of all thread (all_gs_info)
-    all_gs_info = []
-    for i in range(options.parallel_size):
-      game_state = training_threads[i].game_state
-      psc_n = game_state.psc_n
-      psc_vcount = game_state.psc_vcount
-      rooms = game_state.rooms
-      episode = game_state.episode
-      gs_info = {"psc_n":psc_n, "psc_vcount":psc_vcount, "rooms":rooms, "episode":episode}
-      all_gs_info.append(gs_info)
-    gs_fname = options.checkpoint_dir + '/' + 'gs.' + str(global_t_copy)
-    with open(gs_fname, "wb") as f:
-      pickle.dump(all_gs_info, f)
-
-  saver.save(sess, options.checkpoint_dir + '/' + 'checkpoint', global_step = global_t_copy)
+    state_writer.save(global_t_copy, [t.game_state for t in training_threads], deadline=deadline)
 
   print('@@@ Data saved at global_t={}'.format(global_t_copy))
+  last_save_time = time.time()
+  last_save_global_t = global_t_copy
+  event_log.emit("checkpoint", global_t_copy, wall_t)
+  event_log.flush()
+
+  if options.phase_timing:
+    print(phase_timer.format_table([t.timer for t in training_threads]))
+  print(staleness.format_table([t.staleness for t in training_threads]))
+  if options.memory_accounting:
+    breakdowns = dict((t.thread_index, t.memory) for t in training_threads if t.memory is not None)
+    print(memory_accounting.format_table(breakdowns, memory_usage()["rss_mb"]))
+
+def save_actor_snapshots(snapshots, deadline=None):
+  # snapshots taken by threads at stop, saved with last checkpoint
+  # (lowest priority: skipped after deadline of preemption)
+  if last_save_global_t is None or any(snapshot is None for snapshot in snapshots):
+    return
+  if deadline is not None and time.time() > deadline:
+    print('@@@ actor snapshots skipped: deadline passed')
+    return
+  actors_fname = options.checkpoint_dir + '/' + 'actors.' + str(last_save_global_t)
+  write_file(actors_fname, actor_snapshot.dumps(snapshots))
+  print('@@@ actor snapshots saved:', actors_fname)
+
+def run_pbt(global_t):
+  # called by thread 0
+  for record in pbt_scheduler.step(global_t, training_threads):
+    lineage = "<".join("th{}@{}".format(parent, s)
+                       for s, parent in pbt_scheduler.ancestry(record["th"]))
+    log_sink.log("pbt", "{},lineage={}", pbt.format_record(record), lineage)
+    new = record["new"]
+    event_log.emit("pbt", global_t, record["th"], record["parent"], record["score"],
+                   record["parent_score"], new.get("tes"), new.get("psc_beta"), new.get("psc_pow"))
 
 #@profile
 def train_function(parallel_index):
@@ -177,6 +303,9 @@ def train_function(parallel_index):
   start_time = time.time() - wall_t
   training_thread.set_start_time(start_time)
 
+  if profiler is not None:
+    profiler.register_thread("th{}".format(parallel_index))
+
   # for pseudo-count
   if options.psc_use:
     training_thread.game_state.psc_set_psc_info(psc_info)
@@ -184,11 +313,19 @@ def train_function(parallel_index):
     if gs_info is not None:
       training_thread.game_state.psc_set_gs_info(gs_info) 
 
+  # continue episode of last stop
+  if actor_snapshots[parallel_index] is not None:
+    training_thread.restore_snapshot(sess, actor_snapshots[parallel_index])
+    actor_snapshots[parallel_index] = None
+
   best_average_score = 0
   while True:
+    global_t = global_counter.value()
     if global_t > next_save_steps or \
       global_t > options.end_time_step or \
       stop_requested:
+      # rollout deferred by --bootstrap-pass=post-sync (not lost at stop)
+      training_thread.train_pending(sess)
 
       if parallel_index == 0:
         if options.sync_thread:
@@ -203,7 +340,7 @@ def train_function(parallel_index):
  
         if global_t > options.end_time_step or \
           stop_requested:
-          save_data(training_threads)
+          save_data(training_threads, deadline=preemption_deadline)
         elif options.save_best_avg_only:
           average_score = training_thread.episode_scores.average()
           print("%%% best_average_score={:.5f}, average_score={:.5f}".format(best_average_score, average_score))
@@ -229,11 +366,17 @@ def train_function(parallel_index):
 
       if global_t > options.end_time_step or \
         stop_requested:
+        if options.actor_snapshots:
+          actor_snapshots[parallel_index] = training_thread.get_snapshot(sess)
         break
 
+    if pbt_scheduler is not None and parallel_index == 0 and \
+       global_t >= pbt_scheduler.next_step:
+      run_pbt(global_t)
+
     diff_global_t, _ = training_thread.process(sess, global_t, summary_writer,
-                                               summary_op, score_input)
-    global_t += diff_global_t
+                                               summary_recorder)
+    global_counter.add(parallel_index, diff_global_t)
      
 
 def gym_eval_function(parallel_index):
@@ -271,25 +414,91 @@ def gym_eval_function(parallel_index):
         break
 
       diff_global_t, terminal_end = training_thread.process(sess, global_t, summary_writer,
-                                                            summary_op, score_input)
-      global_t += diff_global_t
+                                                            summary_recorder)
+      global_counter.add(parallel_index, diff_global_t)
+      global_t = global_counter.value()
       if terminal_end:
         break
 
   env.monitor.close()
+  summary_recorder.flush()
  
     
-def signal_handler(signal, frame):
+def signal_handler(signum, frame):
   global stop_requested
-  print('You pressed Ctrl+C!')
+  global preemption_deadline
+  if signum == signal.SIGTERM:
+    print('SIGTERM received!')
+  else:
+    print('You pressed Ctrl+C!')
+  if options.preemption_deadline > 0 and preemption_deadline is None:
+    preemption_deadline = time.time() + options.preemption_deadline
+    print('Preemption: checkpoint will be saved within {} sec'.format(options.preemption_deadline))
   stop_requested = True
+
+def profiler_signal_handler(signal, frame):
+  profiler.toggle()
   
+def status_snapshot():
+  # status served by --status-port (read without lock, see status_server.py)
+  now = time.time()
+  elapsed = max(now - run_start_time, 1e-6)
+  global_t_now = global_counter.value()
+  threads = []
+  for training_thread in list(training_threads):
+    game_state = training_thread.game_state
+    thread_status = {
+      "thread": training_thread.thread_index,
+      "local_t": training_thread.local_t,
+      "steps_per_sec": training_thread.local_t / elapsed,
+      "episode_reward": training_thread.episode_reward,
+      "episode_steps": training_thread.steps,
+      "room": int(game_state.room_no),
+      "lives": game_state.lives,
+      "rooms_visited": [room for room, n in enumerate(game_state.rooms) if n > 0],
+      "learning_rate": training_thread._anneal_learning_rate(global_t_now)}
+    updates = training_thread.staleness.updates
+    if updates.num > 0:
+      thread_status["policy_lag_updates"] = updates.sum / updates.num
+    memory = training_thread.memory
+    if memory is not None:
+      thread_status["memory_mb"] = dict((name, size / memory_accounting.MB)
+                                        for name, size in memory.items())
+    if training_thread.tes > 0:
+      thread_status["average_score"] = training_thread.episode_scores.average()
+    thread_status["hyperparameters"] = training_thread.get_hyperparameters()
+    threads.append(thread_status)
+  status = {
+    "global_t": global_t_now,
+    "end_time_step": options.end_time_step,
+    "elapsed_sec": now - run_start_time,
+    "wall_t": now - start_time,
+    "steps_per_sec": (global_t_now - run_start_global_t) / elapsed,
+    "next_save_steps": next_save_steps,
+    "sec_since_checkpoint": None if last_save_time is None else now - last_save_time,
+    "stop_requested": stop_requested,
+    "queues": {"log_sink_records": log_sink.queue_depth(),
+               "summary_episodes": summary_recorder.buffered_episodes()},
+    "memory": memory_usage(),
+    "threads": threads}
+  return status
+
+last_save_time = None
+run_start_time = time.time()
+run_start_global_t = global_t
+start_time = time.time() - wall_t
+if options.status_port is not None:
+  status_server = StatusServer(options.status_port, status_snapshot, host=options.status_host)
+  status_server.start()
+  print('Status is served at http://{}:{}/status'.format(options.status_host, status_server.port))
+
 if options.gym_eval:
   eval_threads = []
   for i in range(options.parallel_size):
     eval_threads.append(threading.Thread(target=gym_eval_function, args=(i,)))
 
   global_t = 0
+  global_counter = GlobalCounter(options.parallel_size)
 
   for t in eval_threads:
     t.start()
@@ -300,6 +509,14 @@ else:
     train_threads.append(threading.Thread(target=train_function, args=(i,)))
     
   signal.signal(signal.SIGINT, signal_handler)
+  signal.signal(signal.SIGTERM, signal_handler)
+  if profiler is not None:
+    signal.signal(signal.SIGUSR1, profiler_signal_handler)
+    profiler.start()
+    print('Send SIGUSR1 to pid {} to start/stop profiler'.format(os.getpid()))
+
+  if options.log_sink:
+    log_sink.start(log_sink.parse_rate_limits(options.log_rate_limits))
 
   # set start time
   start_time = time.time() - wall_t
@@ -311,3 +528,15 @@ else:
 
   for t in train_threads:
     t.join()
+
+  if options.actor_snapshots:
+    save_actor_snapshots(actor_snapshots, deadline=preemption_deadline)
+
+  # end of training or stop by signal (supervisor.py restarts the latter)
+  global_t = global_counter.value()
+  event_log.emit("stop", global_t, time.time() - start_time,
+                 "end" if global_t > options.end_time_step else "signal")
+
+  summary_recorder.flush()
+  log_sink.stop()
+  event_log.close()
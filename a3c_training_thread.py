@@ -2,7 +2,6 @@
 import numpy as np
 import random
 import time
-import cv2
 import os
 import lzma
 from collections import deque
@@ -11,9 +10,16 @@ from sortedcontainers import SortedList
 from accum_trainer import AccumTrainer
 from game_state import GameState
 from game_ac_network import GameACFFNetwork, GameACLSTMNetwork
+from shared_graph import SharedNetworkView
+from policy_cache import PolicyCache
+from global_counter import GlobalCounter
+from staleness import StalenessMeter
+import memory_accounting
+import actor_snapshot
+from phase_timer import PhaseTimer, NullPhaseTimer
+import event_log
+import log_sink
 
-import options
-options = options.options
 
 class Episode_scores(object):
   def __init__(self, options):
@@ -37,7 +43,9 @@ class Episode_scores(object):
       self.episode_scores_sum -= oldest
     self.num_episode += 1
     if self.num_episode % self.options.average_score_log_interval == 0:
-      print("@@@ Average Episode score = {:.6f}, s={:9d},th={}".format(self.average(), global_t, thread_index))
+      log_sink.log("average_score", "@@@ Average Episode score = {:.6f}, s={:9d},th={}",
+                   self.average(), global_t, thread_index)
+      event_log.emit("average", global_t, thread_index, self.average())
 
   def average(self):
     return self.episode_scores_sum / len(self.episode_scores)
@@ -61,33 +69,48 @@ class A3CTrainingThread(object):
                grad_applier,
                max_global_time_step,
                device,
-               options):
+               options,
+               shared_graph=None,
+               update_counter=None):
 
     self.thread_index = thread_index
     self.learning_rate_input = learning_rate_input
     self.max_global_time_step = max_global_time_step
     self.options = options
+    self.shared_graph = shared_graph
 
-    if options.use_lstm:
-      self.local_network = GameACLSTMNetwork(options.action_size, thread_index, device)
+    if shared_graph is not None:
+      # --shared-graph: graph is built once in SharedGraphTemplate
+      self.local_network = SharedNetworkView(shared_graph)
+      self.apply_gradients = shared_graph.apply_gradients
+      self.sync = None
     else:
-      self.local_network = GameACFFNetwork(options.action_size, device)
+      if options.use_lstm:
+        self.local_network = GameACLSTMNetwork(options.action_size, thread_index, device)
+      else:
+        self.local_network = GameACFFNetwork(options.action_size, device)
 
-    self.local_network.prepare_loss(options.entropy_beta)
+      self.local_network.prepare_loss(options.entropy_beta)
 
-    # TODO: don't need accum trainer anymore with batch
-    self.trainer = AccumTrainer(device)
-    self.trainer.prepare_minimize( self.local_network.total_loss,
-                                   self.local_network.get_vars() )
-    
-    self.accum_gradients = self.trainer.accumulate_gradients()
-    self.reset_gradients = self.trainer.reset_gradients()
-  
-    self.apply_gradients = grad_applier.apply_gradients(
-      global_network.get_vars(),
-      self.trainer.get_accum_grad_list() )
-
-    self.sync = self.local_network.sync_from(global_network)
+      # TODO: don't need accum trainer anymore with batch
+      self.trainer = AccumTrainer(device)
+      self.trainer.prepare_minimize( self.local_network.total_loss,
+                                     self.local_network.get_vars() )
+
+      self.accum_gradients = self.trainer.accumulate_gradients()
+      self.reset_gradients = self.trainer.reset_gradients()
+
+      self.apply_gradients = grad_applier.apply_gradients(
+        global_network.get_vars(),
+        self.trainer.get_accum_grad_list() )
+
+      self.sync = self.local_network.sync_from(global_network)
+
+    # for --memory-accounting (no variables of its own with shared graph)
+    self.variable_bytes = 0
+    if shared_graph is None:
+      self.variable_bytes = memory_accounting.variables_bytes(
+        self.local_network.get_vars() + self.trainer.get_accum_grad_list())
     
     self.game_state = GameState(random.randint(0, 2**16), options, thread_index = thread_index)
     
@@ -96,12 +119,16 @@ class A3CTrainingThread(object):
     self.initial_learning_rate = initial_learning_rate
 
     self.episode_reward = 0
+    # for summaries of episode
+    self.episode_rooms = set()
+    self.episode_psc_reward = 0.0
 
     self.indent = "         |" * self.thread_index
     self.steps = 0
     self.no_reward_steps = 0
     self.terminate_on_lives_lost = options.terminate_on_lives_lost and (self.thread_index != 0)
 
+    self.tes = 0
     if self.options.train_episode_steps > 0:
       self.max_reward = 0.0
       self.max_episode_reward = 0.0
@@ -134,6 +161,41 @@ class A3CTrainingThread(object):
     self.repeat_action_ratio = options.repeat_action_ratio
     self.prev_action = 0
 
+    # for --bootstrap-pass
+    # "separate"  : V for bootstrapping is calculated with run_value() and
+    #               pi, V of the same state are calculated again in next process()
+    # "pre-update": pi, V are calculated once at the end of rollout (with
+    #               weights before update) and reused for first step of next rollout
+    # "post-sync" : training of the rollout is deferred to next process(), where
+    #               pi, V are calculated once after sync
+    self.first_pi_value = None
+    self.first_start_lstm_state = None
+    self.pending_batch = None
+    self.forward_passes = 0
+
+    # cache of pi, V for repeated states (FF network with local weights only,
+    # because weights of shared graph change without sync)
+    self.policy_cache = None
+    if options.policy_cache_size > 0 and not options.use_lstm and shared_graph is None:
+      self.policy_cache = PolicyCache(options.policy_cache_size)
+
+    # memory breakdown of this thread (measured by this thread, see memory_accounting.py)
+    self.memory = None
+    self.memory_budgets = memory_accounting.parse_budgets(options.memory_budgets)
+
+    # policy lag between sync and apply (update_counter counts applies of all threads)
+    if update_counter is None:
+      update_counter = GlobalCounter(thread_index + 1)
+    self.staleness = StalenessMeter(thread_index, update_counter)
+    self.sync_mark = self.staleness.mark()
+
+    # timers of phases in process() (shared with game_state)
+    if options.phase_timing:
+      self.timer = PhaseTimer(thread_index)
+    else:
+      self.timer = NullPhaseTimer()
+    self.game_state.timer = self.timer
+
     
     
 
@@ -158,8 +220,8 @@ class A3CTrainingThread(object):
         pi_values /= sum(pi_values)
         if self.local_t % self.options.randomness_log_interval == 0:
           elapsed_time = time.time() - self.start_time
-          print("t={:6.0f},s={:9d},th={}:{}randomness={:.8f}".format(
-                elapsed_time, global_t, self.thread_index, self.indent, randomness))
+          log_sink.log("randomness", "t={:6.0f},s={:9d},th={}:{}randomness={:.8f}",
+                       elapsed_time, global_t, self.thread_index, self.indent, randomness)
 
       pi_values -= np.finfo(np.float32).epsneg
       action_samples = np.random.multinomial(self.options.num_experiments, pi_values)
@@ -168,17 +230,194 @@ class A3CTrainingThread(object):
     self.prev_action = action
     return action
 
-  def _record_score(self, sess, summary_writer, summary_op, score_input, score, global_t):
-    summary_str = sess.run(summary_op, feed_dict={
-      score_input: score
-    })
-    summary_writer.add_summary(summary_str, global_t)
-    
+  def _run_policy_and_value(self, sess, s_t):
+    # forward pass of local network (skipped if output is in policy cache)
+    if self.policy_cache is None:
+      self.forward_passes += 1
+      return self.local_network.run_policy_and_value(sess, s_t)
+    hits = self.policy_cache.hits
+    pi_value = self.policy_cache.run_policy_and_value(self.local_network, sess, s_t)
+    if self.policy_cache.hits == hits:
+      self.forward_passes += 1
+    return pi_value
+
+  def _account_memory(self, global_t):
+    self.memory = memory_accounting.thread_breakdown(self)
+    log_sink.log("memory", "### Memory : th{} {}", self.thread_index,
+                 memory_accounting.format_breakdown(self.memory))
+    for name, size in self.memory.items():
+      event_log.emit("memory", global_t, self.thread_index, name, size / memory_accounting.MB)
+    for name, mb, budget_mb in memory_accounting.over_budgets(self.memory, self.memory_budgets):
+      log_sink.log("memory_warning", "### Memory : WARNING th{} {} {:.1f} MB exceeds budget {:.1f} MB",
+                   self.thread_index, name, mb, budget_mb)
+
+  # for pbt.py
+  def get_hyperparameters(self):
+    hyperparameters = {}
+    if self.tes > 0:
+      hyperparameters["tes"] = self.tes
+    if self.game_state.psc_use:
+      hyperparameters["psc_beta"] = self.game_state.psc_beta
+      hyperparameters["psc_pow"] = self.game_state.psc_pow
+    return hyperparameters
+
+  def set_hyperparameters(self, hyperparameters):
+    if self.tes > 0 and "tes" in hyperparameters:
+      self.tes = int(hyperparameters["tes"])
+      self.max_history = int(self.tes * self.options.tes_extend_ratio * 2.1)
+    if self.game_state.psc_use and "psc_beta" in hyperparameters:
+      self.game_state.psc_set_hyperparameters(hyperparameters["psc_beta"],
+                                              hyperparameters["psc_pow"])
+
+  def copy_state_from(self, training_thread):
+    if self.game_state.psc_use:
+      self.game_state.psc_copy_from(training_thread.game_state)
+
+  def reset_episode_scores(self):
+    self.episode_scores = Episode_scores(self.options)
+
+  def get_snapshot(self, sess):
+    # state of actor to continue episode on resume (see actor_snapshot.py)
+    # (rollout waiting for training with --bootstrap-pass=post-sync must be
+    # trained by train_pending() before)
+    snapshot = dict(("gs_" + name, value) for name, value in self.game_state.get_snapshot().items())
+    snapshot.update({"steps": self.steps,
+                     "no_reward_steps": self.no_reward_steps,
+                     "episode_reward": self.episode_reward,
+                     "episode_rooms": sorted(self.episode_rooms),
+                     "episode_psc_reward": self.episode_psc_reward,
+                     "prev_action": self.prev_action})
+    if self.options.use_lstm:
+      snapshot["lstm_state"] = self.local_network.get_lstm_state(sess)
+    if self.tes > 0:
+      frames, channels = actor_snapshot.pack_states(self.episode_states)
+      snapshot.update({"episode_frames": frames,
+                       "episode_channels": channels,
+                       "episode_actions": self.episode_actions,
+                       "episode_rewards": self.episode_rewards,
+                       "episode_values": self.episode_values,
+                       "episode_liveses": self.episode_liveses,
+                       "max_reward": self.max_reward,
+                       "max_episode_reward": self.max_episode_reward})
+    return snapshot
+
+  def restore_snapshot(self, sess, snapshot):
+    game_state_snapshot = dict((name[3:], value) for name, value in snapshot.items()
+                               if name.startswith("gs_"))
+    self.game_state.restore_snapshot(game_state_snapshot)
+    self.steps = int(snapshot["steps"])
+    self.no_reward_steps = int(snapshot["no_reward_steps"])
+    self.episode_reward = float(snapshot["episode_reward"])
+    self.episode_rooms = set(int(room) for room in snapshot["episode_rooms"])
+    self.episode_psc_reward = float(snapshot["episode_psc_reward"])
+    self.prev_action = int(snapshot["prev_action"])
+    if self.options.use_lstm and "lstm_state" in snapshot:
+      self.local_network.set_lstm_state(sess, snapshot["lstm_state"])
+    if self.tes > 0 and "episode_frames" in snapshot:
+      self.episode_states = actor_snapshot.unpack_states(snapshot["episode_frames"],
+                                                         int(snapshot["episode_channels"]))
+      self.episode_actions = [int(a) for a in snapshot["episode_actions"]]
+      self.episode_rewards = [float(r) for r in snapshot["episode_rewards"]]
+      self.episode_values = [float(v) for v in snapshot["episode_values"]]
+      self.episode_liveses = [float(l) for l in snapshot["episode_liveses"]]
+      self.max_reward = float(snapshot["max_reward"])
+      self.max_episode_reward = float(snapshot["max_episode_reward"])
+
+  def _train(self, sess, global_t, states, actions, rewards, values, liveses, R, start_lstm_state,
+             sync_mark=None):
+    # states, actions, rewards, values and liveses are consumed
+    # sync_mark: StalenessMeter.mark() at start of rollout (default: last sync)
+    if sync_mark is None:
+      sync_mark = self.sync_mark
+    if self.shared_graph is None:
+      # reset accumulated gradients
+      sess.run( self.reset_gradients )
+
+    actions.reverse()
+    states.reverse()
+    rewards.reverse()
+    values.reverse()
+
+    batch_si = []
+    batch_a = []
+    batch_td = []
+    batch_R = []
+
+    lives = liveses.pop()
+    # compute and accmulate gradients
+    for(ai, ri, si, Vi) in zip(actions, rewards, states, values):
+      # Consider the number of lives
+      if (not self.options.use_gym) and self.initial_lives != 0.0 and not self.terminate_on_lives_lost:
+        prev_lives = liveses.pop()
+        if prev_lives > lives:
+          weight = self.options.lives_lost_weight
+          rratio = self.options.lives_lost_rratio
+          R *= rratio * ( (1.0 - weight) + weight * (lives / prev_lives) )
+          ri = self.options.lives_lost_reward
+          lives = prev_lives
+
+      R = ri + self.options.gamma * R
+      td = R - Vi
+      a = np.zeros([self.options.action_size])
+      a[ai] = 1
+
+      batch_si.append(si)
+      batch_a.append(a)
+      batch_td.append(td)
+      batch_R.append(R)
+
+    feed_dict = {
+      self.local_network.s: batch_si,
+      self.local_network.a: batch_a,
+      self.local_network.td: batch_td,
+      self.local_network.r: batch_R}
+    if self.options.use_lstm:
+      batch_si.reverse()
+      batch_a.reverse()
+      batch_td.reverse()
+      batch_R.reverse()
+      feed_dict[self.local_network.initial_lstm_state] = start_lstm_state
+      feed_dict[self.local_network.step_size] = [len(batch_a)]
+
+    cur_learning_rate = self._anneal_learning_rate(global_t)
+
+    if self.shared_graph is not None:
+      # gradients are computed and applied in one run
+      feed_dict[self.learning_rate_input] = cur_learning_rate
+      sess.run( self.apply_gradients, feed_dict = feed_dict )
+      self.staleness.apply(sync_mark)
+      self.timer.lap("apply")
+      return
+
+    sess.run( self.accum_gradients, feed_dict = feed_dict )
+    self.timer.lap("gradient")
+
+    sess.run( self.apply_gradients,
+              feed_dict = { self.learning_rate_input: cur_learning_rate } )
+    self.staleness.apply(sync_mark)
+    self.timer.lap("apply")
+
+  def train_pending(self, sess):
+    # "post-sync": train rollout deferred to next process() now (at save and stop).
+    # V for bootstrapping is calculated with current (not synced) weights.
+    if self.pending_batch is None:
+      return
+    lstm_state = None
+    if self.options.use_lstm:
+      lstm_state = self.local_network.get_lstm_state(sess)
+    _, R = self._run_policy_and_value(sess, self.game_state.s_t)
+    if self.options.use_lstm:
+      # LSTM state must stay at state before s_t for next process()
+      self.local_network.set_lstm_state(sess, lstm_state)
+    self._train(sess, R=R, **self.pending_batch)
+    self.pending_batch = None
+
   def set_start_time(self, start_time):
     self.start_time = start_time
 
   #@profile
-  def process(self, sess, global_t, summary_writer, summary_op, score_input):
+  def process(self, sess, global_t, summary_writer, summary_recorder):
+    self.timer.start()
     states = []
     actions = []
     rewards = []
@@ -190,21 +429,44 @@ class A3CTrainingThread(object):
 
     terminal_end = False
 
-    # reset accumulated gradients
-    sess.run( self.reset_gradients )
-
     # copy weights from shared to local
-    sess.run( self.sync )
+    if self.sync is not None:
+      sess.run( self.sync )
+      if self.policy_cache is not None:
+        self.policy_cache.invalidate()
+    pending_sync_mark = self.sync_mark
+    self.sync_mark = self.staleness.mark()
+    self.timer.lap("sync")
 
     start_local_t = self.local_t
 
-    if self.options.use_lstm:
-      start_lstm_state = self.local_network.lstm_state_out
+    start_lstm_state = None
+    first_pi_value = None
+    if self.first_pi_value is not None:
+      # "pre-update": reuse pi, V calculated at the end of previous rollout
+      first_pi_value = self.first_pi_value
+      start_lstm_state = self.first_start_lstm_state
+      self.first_pi_value = None
+    else:
+      if self.options.use_lstm:
+        start_lstm_state = self.local_network.get_lstm_state(sess)
+      if self.pending_batch is not None:
+        # "post-sync": V for bootstrapping of previous rollout and pi for first step
+        # are calculated in one forward pass with synced weights
+        first_pi_value = self._run_policy_and_value(sess, self.game_state.s_t)
+        self.timer.lap("inference")
+        self._train(sess, R=first_pi_value[1], sync_mark=pending_sync_mark, **self.pending_batch)
+        self.pending_batch = None
     
     # t_max times loop
     for i in range(self.options.local_t_max):
-      pi_, value_ = self.local_network.run_policy_and_value(sess, self.game_state.s_t)
+      if i == 0 and first_pi_value is not None:
+        pi_, value_ = first_pi_value
+      else:
+        pi_, value_ = self._run_policy_and_value(sess, self.game_state.s_t)
+      self.timer.lap("inference")
       action = self.choose_action(pi_, global_t)
+      self.timer.lap("choose_action")
 
       states.append(self.game_state.s_t)
       actions.append(action)
@@ -212,10 +474,11 @@ class A3CTrainingThread(object):
       liveses.append(self.game_state.lives)
 
       if (self.thread_index == 0) and (self.local_t % self.options.log_interval == 0):
-        print("pi={} (thread{})".format(pi_, self.thread_index))
-        print(" V={} (thread{})".format(value_, self.thread_index))
+        log_sink.log("pi", "pi={} (thread{})\n V={} (thread{})",
+                     pi_, self.thread_index, value_, self.thread_index)
+      self.timer.lap("logging")
 
-      # process game
+      # process game (phases are measured in game_state)
       self.game_state.process(action)
 
       # receive game result
@@ -223,16 +486,20 @@ class A3CTrainingThread(object):
       terminal = self.game_state.terminal
 
       self.episode_reward += reward
+      self.episode_rooms.add(self.game_state.room_no)
       if reward > 0 and \
          (self.options.rom == "montezuma_revenge.bin" or self.options.gym_env == "MontezumaRevenge-v0"):
         elapsed_time = time.time() - self.start_time
-        print("t={:6.0f},s={:4.0f},th={}:{}r={:3.0f}RM{:02d}| NEW-SCORE".format(
-              elapsed_time, global_t, self.thread_index, self.indent, self.episode_reward,
-              self.game_state.room_no))
+        log_sink.log("new_score", "t={:6.0f},s={:4.0f},th={}:{}r={:3.0f}RM{:02d}| NEW-SCORE",
+                     elapsed_time, global_t, self.thread_index, self.indent, self.episode_reward,
+                     self.game_state.room_no)
+        event_log.emit("new_score", elapsed_time, global_t, self.thread_index,
+                       self.episode_reward, self.game_state.room_no)
 
       # pseudo-count reward
       if self.options.psc_use:
         reward += self.game_state.psc_reward
+        self.episode_psc_reward += self.game_state.psc_reward
 
       # add basic income after some no reward steps
       if self.no_reward_steps > self.options.no_reward_steps:
@@ -265,6 +532,7 @@ class A3CTrainingThread(object):
           self.episode_liveses = self.episode_liveses[-2:]
  
       self.local_t += 1
+      self.timer.lap("bookkeeping")
 
       if self.options.record_new_record_dir is not None \
          or self.options.record_new_room_dir is not None:
@@ -272,6 +540,7 @@ class A3CTrainingThread(object):
         if self.options.compress_frame:
           screen = lzma.compress(screen.tobytes(), preset=0)
         self.episode_screens.append(screen)
+        self.timer.lap("record")
 
       # terminate if the play time is too long
       self.steps += 1
@@ -294,10 +563,13 @@ class A3CTrainingThread(object):
       
       if self.local_t % self.options.score_log_interval == 0:
         elapsed_time = time.time() - self.start_time
-        print("t={:6.0f},s={:9d},th={}:{}r={:3.0f}RM{:02d}| l={:.0f},v={:.5f},pr={:.5f}".format(
-              elapsed_time, global_t, self.thread_index, self.indent,
-              self.episode_reward, self.game_state.room_no,
-              self.game_state.lives, value_, self.game_state.psc_reward))
+        log_sink.log("score", "t={:6.0f},s={:9d},th={}:{}r={:3.0f}RM{:02d}| l={:.0f},v={:.5f},pr={:.5f}",
+                     elapsed_time, global_t, self.thread_index, self.indent,
+                     self.episode_reward, self.game_state.room_no,
+                     self.game_state.lives, value_, self.game_state.psc_reward)
+        event_log.emit("score", elapsed_time, global_t, self.thread_index,
+                       self.episode_reward, self.game_state.room_no,
+                       self.game_state.lives, value_, self.game_state.psc_reward)
 
       # if self.game_state.room_no != self.game_state.prev_room_no:
       #   elapsed_time = time.time() - self.start_time
@@ -309,9 +581,12 @@ class A3CTrainingThread(object):
       if self.tes > 0:
         if self.game_state.lives < self.episode_liveses[-2]:
           elapsed_time = time.time() - self.start_time
-          print("t={:6.0f},s={:9d},th={}:{}l={:.0f}>{:.0f}RM{:02d}|".format(
-                elapsed_time, global_t, self.thread_index, self.indent, 
-                self.episode_liveses[-2], self.game_state.lives, self.game_state.room_no))
+          log_sink.log("lives_lost", "t={:6.0f},s={:9d},th={}:{}l={:.0f}>{:.0f}RM{:02d}|",
+                       elapsed_time, global_t, self.thread_index, self.indent,
+                       self.episode_liveses[-2], self.game_state.lives, self.game_state.room_no)
+          event_log.emit("lives_lost", elapsed_time, global_t, self.thread_index,
+                         self.episode_liveses[-2], self.game_state.lives, self.game_state.room_no)
+      self.timer.lap("logging")
 
       # seperate steps after getting reward
       if self.game_state.reward > 0:
@@ -322,11 +597,14 @@ class A3CTrainingThread(object):
         terminal_end = True
         elapsed_time = time.time() - self.start_time
         end_mark = "end" if self.terminate_on_lives_lost else "END"
-        print("t={:6.0f},s={:9d},th={}:{}r={:3.0f}@{}|".format(
-              elapsed_time, global_t, self.thread_index, self.indent, self.episode_reward, end_mark))
-
-        self._record_score(sess, summary_writer, summary_op, score_input,
-                           self.episode_reward, global_t)
+        log_sink.log("episode", "t={:6.0f},s={:9d},th={}:{}r={:3.0f}@{}|",
+                     elapsed_time, global_t, self.thread_index, self.indent, self.episode_reward, end_mark)
+        event_log.emit("episode", elapsed_time, global_t, self.thread_index,
+                       self.episode_reward, end_mark, self.game_state.room_no, self.steps)
+
+        summary_recorder.record_episode(self.thread_index, global_t, self.episode_reward,
+                                        self.steps, len(self.episode_rooms),
+                                        self.episode_psc_reward)
           
         if self.tes > 0:
           if self.options.record_new_room_dir is not None \
@@ -335,6 +613,7 @@ class A3CTrainingThread(object):
                        self.episode_reward, self.game_state.new_room)
             dirname = os.path.join(self.options.record_new_room_dir, dirname)
             os.makedirs(dirname)
+            import cv2 # only for recording
             for index, screen in enumerate(self.episode_screens):
               filename = "{:06d}.png".format(index)
               filename = os.path.join(dirname, filename)
@@ -342,7 +621,7 @@ class A3CTrainingThread(object):
               if self.options.compress_frame:
                 screen_image = np.frombuffer(lzma.decompress(screen), dtype=np.uint8).reshape((210, 160))
               cv2.imwrite(filename, screen_image)
-            print("@@@ New Room record screens saved to {}".format(dirname))
+            log_sink.log("record", "@@@ New Room record screens saved to {}", dirname)
 
           if self.episode_reward > self.max_episode_reward:
             if self.options.record_new_record_dir is not None:
@@ -350,6 +629,7 @@ class A3CTrainingThread(object):
                          self.episode_reward, self.game_state.room_no)
               dirname = os.path.join(self.options.record_new_record_dir, dirname)
               os.makedirs(dirname)
+              import cv2 # only for recording
               for index, screen in enumerate(self.episode_screens):
                 filename = "{:06d}.png".format(index)
                 filename = os.path.join(dirname, filename)
@@ -357,7 +637,7 @@ class A3CTrainingThread(object):
                 if self.options.compress_frame:
                   screen_image = np.frombuffer(lzma.decompress(screen), dtype=np.uint8).reshape((210, 160))
                 cv2.imwrite(filename, screen_image)
-              print("@@@ New Record screens saved to {}".format(dirname))
+              log_sink.log("record", "@@@ New Record screens saved to {}", dirname)
             self.max_episode_reward = self.episode_reward
             if self.options.record_all_non0_record:
               self.max_episode_reward = 0
@@ -374,18 +654,41 @@ class A3CTrainingThread(object):
             self.episode_screens= []
 
         self.episode_reward = 0
+        self.episode_rooms = set()
+        self.episode_psc_reward = 0.0
         self.steps = 0
         self.no_reward_steps = 0
         self.game_state.reset()
         if self.options.use_lstm:
-          self.local_network.reset_state()
+          self.local_network.reset_state(sess)
+        self.timer.lap("episode_end")
         break
 
     if self.thread_index == 0 and self.local_t % self.options.performance_log_interval < self.options.local_t_max:
       elapsed_time = time.time() - self.start_time
       steps_per_sec = global_t / elapsed_time
-      print("### Performance : {} STEPS in {:.0f} sec. {:.0f} STEPS/sec. {:.2f}M STEPS/hour".format(
-            global_t,  elapsed_time, steps_per_sec, steps_per_sec * 3600 / 1000000.))
+      log_sink.log("performance", "### Performance : {} STEPS in {:.0f} sec. {:.0f} STEPS/sec. {:.2f}M STEPS/hour",
+                   global_t,  elapsed_time, steps_per_sec, steps_per_sec * 3600 / 1000000.)
+      event_log.emit("performance", elapsed_time, global_t, steps_per_sec)
+      log_sink.log("performance", "### Forward passes : {:.3f} per step (bootstrap-pass={}, thread{})",
+                   self.forward_passes / max(self.local_t, 1), self.options.bootstrap_pass, self.thread_index)
+      updates = self.staleness.updates
+      if updates.num > 0:
+        log_sink.log("performance", "### Policy lag : {:.1f} updates, {:.3f} sec between sync and apply (thread{})",
+                     updates.sum / updates.num, self.staleness.seconds.sum / updates.num, self.thread_index)
+
+    if self.local_t % self.options.performance_log_interval < self.options.local_t_max:
+      self.timer.write_summaries(summary_writer, global_t)
+      self.staleness.write_summaries(summary_writer, global_t)
+      if self.options.memory_accounting:
+        self._account_memory(global_t)
+      if self.policy_cache is not None:
+        log_sink.log("performance", "### Policy cache : hit rate {:.1f}% ({} / {} lookups, {} entries, thread{})",
+                     self.policy_cache.hit_rate() * 100.0, self.policy_cache.hits,
+                     self.policy_cache.lookups, len(self.policy_cache), self.thread_index)
+        event_log.emit("policy_cache", global_t, self.thread_index, self.policy_cache.hits,
+                       self.policy_cache.lookups, len(self.policy_cache))
+    self.timer.lap("logging")
 
     if self.options.gym_eval:
       diff_local_t = self.local_t - start_local_t
@@ -409,7 +712,10 @@ class A3CTrainingThread(object):
                 tes *= 2
               tes = int(tes)
             tes = min(tes, len(self.episode_states))
-            print("[OHL]SCORE={:3.0f},s={:9d},th={},lives={},steps={},tes={},RM{:02d}".format(self.episode_reward,  global_t, self.thread_index, self.game_state.lives, self.steps, tes, self.game_state.room_no))
+            log_sink.log("ohl", "[OHL]SCORE={:3.0f},s={:9d},th={},lives={},steps={},tes={},RM{:02d}",
+                         self.episode_reward,  global_t, self.thread_index, self.game_state.lives, self.steps, tes, self.game_state.room_no)
+            event_log.emit("ohl", global_t, self.thread_index, self.episode_reward,
+                           self.game_state.lives, self.steps, tes, self.game_state.room_no)
             if tes == 0:
               states = []
               actions = []
@@ -429,70 +735,27 @@ class A3CTrainingThread(object):
               self.episode_values = []
               self.episode_liveses = self.episode_liveses[-2:]
 
+      self.timer.lap("bookkeeping")
       if len(states) > 0:
         R = 0.0
         if not terminal_end:
-          R = self.local_network.run_value(sess, self.game_state.s_t)
-
-        actions.reverse()
-        states.reverse()
-        rewards.reverse()
-        values.reverse()
-
-        batch_si = []
-        batch_a = []
-        batch_td = []
-        batch_R = []
-
-        lives = liveses.pop()
-        # compute and accmulate gradients
-        for(ai, ri, si, Vi) in zip(actions, rewards, states, values):
-          # Consider the number of lives
-          if (not self.options.use_gym) and self.initial_lives != 0.0 and not self.terminate_on_lives_lost:
-            prev_lives = liveses.pop()
-            if prev_lives > lives:
-              weight = self.options.lives_lost_weight
-              rratio = self.options.lives_lost_rratio
-              R *= rratio * ( (1.0 - weight) + weight * (lives / prev_lives) )
-              ri = self.options.lives_lost_reward
-              lives = prev_lives
-
-          R = ri + self.options.gamma * R
-          td = R - Vi
-          a = np.zeros([self.options.action_size])
-          a[ai] = 1
-
-          batch_si.append(si)
-          batch_a.append(a)
-          batch_td.append(td)
-          batch_R.append(R)
-
-        if self.options.use_lstm:
-          batch_si.reverse()
-          batch_a.reverse()
-          batch_td.reverse()
-          batch_R.reverse()
-
-          sess.run( self.accum_gradients,
-                    feed_dict = {
-                      self.local_network.s: batch_si,
-                      self.local_network.a: batch_a,
-                      self.local_network.td: batch_td,
-                      self.local_network.r: batch_R,
-                      self.local_network.initial_lstm_state: start_lstm_state,
-                      self.local_network.step_size : [len(batch_a)] } )
-        else:
-          sess.run( self.accum_gradients,
-                    feed_dict = {
-                      self.local_network.s: batch_si,
-                      self.local_network.a: batch_a,
-                      self.local_network.td: batch_td,
-                      self.local_network.r: batch_R} )
-          
-        cur_learning_rate = self._anneal_learning_rate(global_t)
-
-        sess.run( self.apply_gradients,
-                  feed_dict = { self.learning_rate_input: cur_learning_rate } )
+          if self.options.bootstrap_pass == "pre-update":
+            self.first_start_lstm_state = None
+            if self.options.use_lstm:
+              self.first_start_lstm_state = self.local_network.get_lstm_state(sess)
+            self.first_pi_value = self._run_policy_and_value(sess, self.game_state.s_t)
+            R = self.first_pi_value[1]
+          elif self.options.bootstrap_pass == "post-sync":
+            self.pending_batch = {"global_t": global_t, "states": states, "actions": actions,
+                                  "rewards": rewards, "values": values, "liveses": liveses,
+                                  "start_lstm_state": start_lstm_state}
+            return self.local_t - start_local_t, terminal_end
+          else:
+            R = self.local_network.run_value(sess, self.game_state.s_t)
+            self.forward_passes += 1
+          self.timer.lap("inference")
+
+        self._train(sess, global_t, states, actions, rewards, values, liveses, R, start_lstm_state)
 
       # return advanced local step size
       diff_local_t = self.local_t - start_local_t
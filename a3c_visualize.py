@@ -1,46 +1,26 @@
 # -*- coding: utf-8 -*-
-import tensorflow as tf
+import argparse
+import sys
 import matplotlib.pyplot as plt
 
-from game_ac_network import GameACFFNetwork, GameACLSTMNetwork
-from a3c_training_thread import A3CTrainingThread
-from rmsprop_applier import RMSPropApplier
+import checkpoint_reader
 
-import options
-options = options.options
+parser = argparse.ArgumentParser(description="visualize W_conv1 of A3C global network")
+parser.add_argument('--checkpoint-dir', type=str, default='checkpoints')
+parser.add_argument('--weights-file', type=str, default=None,
+                    help="checkpoint file or .npz file exported by checkpoint_reader.py")
+# ignore other options of options.py (for compatibility with old command lines)
+args, _ = parser.parse_known_args()
 
-# use CPU for weight visualize tool
-device = "/cpu:0"
-
-if options.use_lstm:
-  global_network = GameACLSTMNetwork(options.action_size, -1, device)
-else:
-  global_network = GameACFFNetwork(options.action_size, device)
-
-training_threads = []
-
-learning_rate_input = tf.placeholder("float")
-
-grad_applier = RMSPropApplier(learning_rate = learning_rate_input,
-                              decay = options.rmsp_alpha,
-                              momentum = 0.0,
-                              epsilon = options.rmsp_epsilon,
-                              clip_norm = options.grad_norm_clip,
-                              device = device)
-
-sess = tf.Session()
-init = tf.initialize_all_variables()
-sess.run(init)
-
-saver = tf.train.Saver()
-checkpoint = tf.train.get_checkpoint_state(options.checkpoint_dir)
-if checkpoint and checkpoint.model_checkpoint_path:
-  saver.restore(sess, checkpoint.model_checkpoint_path)
-  print("checkpoint loaded:", checkpoint.model_checkpoint_path)
-else:
+path = args.weights_file
+if path is None:
+  path = checkpoint_reader.latest_checkpoint_path(args.checkpoint_dir)
+if path is None:
   print("Could not find old checkpoint")
-  
-W_conv1 = sess.run(global_network.W_conv1)
+  sys.exit(1)
+print("checkpoint loaded:", path)
+
+W_conv1 = checkpoint_reader.read_weights(path)["W_conv1"]
 
 # show graph of W_conv1
 fig, axes = plt.subplots(4, 16, figsize=(12, 6),
@@ -55,4 +35,3 @@ for ax,i in zip(axes.flat, range(4*16)):
   ax.set_title(str(inch) + "," + str(outch))
 
 plt.show()
-
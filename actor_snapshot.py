@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy as np
+
+# Snapshots of actors (training threads) saved with checkpoint
+# (--actor-snapshots=True), so that episodes in progress continue on resume.
+# Snapshot of a thread is a dict of name => NumPy array (or scalar), made by
+# A3CTrainingThread.get_snapshot() (ALE state, frame stack, LSTM state,
+# counters and OHL episode history). Snapshots of all threads are written to
+# one compressed .npz (actors.STEP in checkpoint directory).
+# States are stored as uint8 frames (GameState makes them from uint8 frames),
+# and consecutive states of episode history share 3 of 4 frames, so history
+# is stored as one frame sequence if possible.
+
+def to_uint8(s_t):
+  return np.rint(np.asarray(s_t) * 255.0).astype(np.uint8)
+
+def to_float(s_t_uint8):
+  # same as GameState._process_frame()
+  s_t = s_t_uint8.astype(np.float32)
+  s_t *= (1.0/255.0)
+  return s_t
+
+def pack_states(states):
+  # (frames, channels) of list of states (84, 84, C)
+  # channels=C: frames (84, 84, N+C-1) and states[k] = frames[:, :, k:k+C]
+  # channels=0: frames (N, 84, 84, C) (states are not consecutive)
+  if len(states) == 0:
+    return np.zeros((0, 84, 84, 4), dtype=np.uint8), 0
+  overlapped = all(np.array_equal(states[k + 1][:, :, :-1], states[k][:, :, 1:])
+                   for k in range(len(states) - 1))
+  if overlapped:
+    frames = [states[0]] + [state[:, :, -1:] for state in states[1:]]
+    return to_uint8(np.concatenate(frames, axis=2)), states[0].shape[2]
+  return to_uint8(np.stack(states)), 0
+
+def unpack_states(frames, channels):
+  if channels == 0:
+    return [to_float(frames[k]) for k in range(len(frames))]
+  frames = to_float(frames)
+  num_states = frames.shape[2] - channels + 1
+  # views of frames (no copy)
+  return [frames[:, :, k:k + channels] for k in range(num_states)]
+
+def dumps(snapshots):
+  # bytes of compressed .npz of snapshots (list of dicts)
+  arrays = {"num_threads": np.array(len(snapshots))}
+  for i, snapshot in enumerate(snapshots):
+    for name, value in snapshot.items():
+      arrays["th{}/{}".format(i, name)] = np.asarray(value)
+  f = io.BytesIO()
+  np.savez_compressed(f, **arrays)
+  return f.getvalue()
+
+def load(fname):
+  # list of dicts (of NumPy arrays) written by dumps()
+  with np.load(fname) as data:
+    snapshots = [{} for _ in range(int(data["num_threads"]))]
+    for key in data.files:
+      if key == "num_threads":
+        continue
+      thread, name = key.split("/", 1)
+      snapshots[int(thread[2:])][name] = data[key]
+  return snapshots
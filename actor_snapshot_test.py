@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import actor_snapshot
+from fake_ale import FakeALEInterface
+
+def random_states(num_states, rng):
+  # consecutive states of episode (frame stack shifted by one frame)
+  frames = rng.randint(0, 256, (84, 84, num_states + 3)).astype(np.uint8)
+  return [actor_snapshot.to_float(frames[:, :, k:k + 4]) for k in range(num_states)]
+
+class TestActorSnapshot(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_pack_states(self):
+    rng = np.random.RandomState(0)
+    states = random_states(10, rng)
+    frames, channels = actor_snapshot.pack_states(states)
+    self.assertEqual(4, channels)
+    self.assertEqual((84, 84, 13), frames.shape)
+    unpacked = actor_snapshot.unpack_states(frames, channels)
+    self.assertEqual(10, len(unpacked))
+    for state, state2 in zip(states, unpacked):
+      self.assertTrue(np.array_equal(state, state2))
+    # not consecutive (e.g. history cleared)
+    states = random_states(3, rng) + random_states(2, rng)
+    frames, channels = actor_snapshot.pack_states(states)
+    self.assertEqual(0, channels)
+    unpacked = actor_snapshot.unpack_states(frames, channels)
+    self.assertTrue(all(np.array_equal(a, b) for a, b in zip(states, unpacked)))
+    self.assertEqual([], actor_snapshot.unpack_states(*actor_snapshot.pack_states([])))
+
+  def test_dumps_load(self):
+    snapshots = [{"steps": 10, "s_t": np.ones((84, 84, 4), dtype=np.uint8), "rooms": [1, 4]},
+                 {"steps": 20, "s_t": np.zeros((84, 84, 4), dtype=np.uint8), "rooms": []}]
+    fname = os.path.join(self.dir, "actors.100")
+    with open(fname, "wb") as f:
+      f.write(actor_snapshot.dumps(snapshots))
+    loaded = actor_snapshot.load(fname)
+    self.assertEqual(2, len(loaded))
+    self.assertEqual(20, int(loaded[1]["steps"]))
+    self.assertEqual([1, 4], loaded[0]["rooms"].tolist())
+    self.assertTrue(np.array_equal(snapshots[0]["s_t"], loaded[0]["s_t"]))
+
+  def test_fake_ale_state(self):
+    ale = FakeALEInterface()
+    for _ in range(30):
+      ale.act(0)
+    encoded = ale.encodeState(ale.cloneSystemState())
+    self.assertEqual(np.uint8, encoded.dtype)
+    rewards = [ale.act(0) for _ in range(20)]
+    ram = ale.getRAM().copy()
+    ale.reset_game()
+    ale.restoreSystemState(ale.decodeState(encoded))
+    self.assertEqual(rewards, [ale.act(0) for _ in range(20)])
+    self.assertTrue((ram == ale.getRAM()).all())
+
+if __name__ == '__main__':
+  unittest.main()
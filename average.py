@@ -2,7 +2,9 @@ import numpy as np
 import argparse
 import time
 import re
-from operator import itemgetter
+from log_store import SortedRows, MovingAverage
+from event_log import EventReader
+from log_index import LogIndex
 
 parser = argparse.ArgumentParser(description="show average of data in A3C log file and update it periodically")
 parser.add_argument('filename')
@@ -14,8 +16,14 @@ parser.add_argument('-s', '--samples', type=int, default=20,
                     help="number of samples")
 parser.add_argument('-e', '--endmark', default="END",
                     help="End Mark of in reward line")
+parser.add_argument('--events', action='store_true',
+                    help="FILENAME is structured event stream (--event-log) instead of log")
+parser.add_argument('--index', action='store_true',
+                    help="read FILENAME through columnar index FILENAME.index (see log_index.py)")
 
 def read_data(f):
+  if args.events or args.index:
+    return reader.read_info(info, args.endmark)
   data = []
   line = f.readline()
   while line != "":
@@ -28,55 +36,50 @@ def read_data(f):
     line = f.readline()
   return data
 
-def show_average(data):
+def show_average(rows, start):
   ans = args.ans
   samples = args.samples
-  if len(data) < 5:
+  if len(rows) < 5:
     return
-  elif len(data) < args.samples:
+  elif len(rows) < args.samples:
     ans = 1
-    samples = len(data)
-  elif len(data) < args.samples * args.ans:
-    ans = len(data) // args.samples
-    print("len(data)=", len(data), "ans=", ans, ", samples=", samples)
-  elif len(data) < args.ans * args.ans:
-    ans = len(data) // args.ans
-    print("len(data)=", len(data), "ans=", ans, ", samples=", samples)
+    samples = len(rows)
+  elif len(rows) < args.samples * args.ans:
+    ans = len(rows) // args.samples
+    print("len(data)=", len(rows), "ans=", ans, ", samples=", samples)
+  elif len(rows) < args.ans * args.ans:
+    ans = len(rows) // args.ans
+    print("len(data)=", len(rows), "ans=", ans, ", samples=", samples)
 
-
-# sort data along args.x_column and make it np.array again
-  data = sorted(data, key=itemgetter(1))
-  data = np.array(data)
-
-  t = data[:, 0]
-  s = data[:, 1]
-  r = data[:, 2]
-  t = t / 3600.0
-  s = s / 1e6
-
-  weight = np.ones(ans, dtype=np.float)/ans
-  ra = np.convolve(r, weight, 'valid')
+  moving_average.update(start, ans)
+  ra = moving_average.average()
   rim = ans - 1
 
-  t = t[rim:]
-  s = s[rim:]
-  l = t.shape[0]
-  i = np.linspace(0, l-1, samples, dtype=np.int)
+  l = len(ra)
+  i = np.linspace(0, l-1, samples, dtype=np.int64)
+  t = rows.column(0)[rim:][i] / 3600.0
+  s = rows.column(1)[rim:][i] / 1e6
   print("=====================================")
-  for t1, s1, ra1 in zip(t[i], s[i], ra[i]):
+  for t1, s1, ra1 in zip(t, s, ra[i]):
     print("t={:.2f} hours, s={:.2f} Msteps, ra={:.2f}".format(t1, s1, ra1))
 
 args = parser.parse_args()
 
+info = "r"
+if args.events:
+  reader = EventReader(args.filename)
+elif args.index:
+  reader = LogIndex(args.filename)
 f = open(args.filename, "r")
 prog = re.compile('t=\s*(\d+),s=\s*(\d+).*r=\s*(\d+)@' + args.endmark)
 
-data = []
+rows = SortedRows(3, 1)
+moving_average = MovingAverage(rows, 2)
 while True:
   new_data = read_data(f)
   print(len(new_data), "data added.")
   if (len(new_data) > 0):
-      data.extend(new_data)
-      show_average(data)
+      start = rows.add(new_data)
+      show_average(rows, start)
   time.sleep(args.interval)
 
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+import argparse
+import copy
+import json
+import sys
+import time
+import numpy as np
+
+# Microbenchmarks of hot paths (GameState, pseudo-count, policy cache, choose_action,
+# network inference and gradient section of A3CTrainingThread).
+# Runs with fake ALE (fake_ale.py), so no ROM is needed.
+# Other arguments are passed to options.py, e.g.
+#   python benchmark.py --filter=game_state --use-lstm=True
+#   python benchmark.py --output=bench.json
+#   python benchmark.py --baseline=bench.json --threshold=0.1 (exit 1 on regression)
+
+parser = argparse.ArgumentParser(description="microbenchmarks of hot paths of A3C")
+parser.add_argument('--repeat', type=int, default=7,
+                    help="number of rounds (median of rounds is reported)")
+parser.add_argument('--min-time', type=float, default=0.2,
+                    help="minimum time (sec) of one round")
+parser.add_argument('--filter', default=None,
+                    help="run only benchmarks whose name contains FILTER")
+parser.add_argument('--output', default=None,
+                    help="write results to json file")
+parser.add_argument('--baseline', default=None,
+                    help="compare results with json file written by --output")
+parser.add_argument('--threshold', type=float, default=0.1,
+                    help="regression if ops/sec is lower than baseline by THRESHOLD (ratio)")
+
+import options
+from game_state import GameState
+
+# set from command line by main
+args = None
+opts = None # options of options.py
+
+
+def measure(func):
+  # ops/sec of func() in each round (number of calls in round is calibrated
+  # so that a round takes at least --min-time)
+  func() # warm up
+  number = 1
+  while True:
+    start = time.time()
+    for _ in range(number):
+      func()
+    elapsed = time.time() - start
+    if elapsed >= args.min_time:
+      break
+    number *= 2 if elapsed == 0 else max(2, int(args.min_time / elapsed * 1.2))
+  rates = [number / elapsed]
+  for _ in range(args.repeat - 1):
+    start = time.time()
+    for _ in range(number):
+      func()
+    rates.append(number / (time.time() - start))
+  return rates
+
+results = []
+
+def bench(name, func):
+  if args.filter is not None and args.filter not in name:
+    return
+  rates = np.array(measure(func))
+  result = {"name": name, "ops_per_sec": float(np.median(rates)),
+            "min": float(rates.min()), "max": float(rates.max()),
+            "rsd": float(rates.std() / rates.mean() * 100.0)}
+  results.append(result)
+  print("{:40s} {:12.1f} ops/sec  (min {:.1f}, max {:.1f}, rsd {:.1f}%)".format(
+        name, result["ops_per_sec"], result["min"], result["max"], result["rsd"]))
+
+
+def game_state_options(**kwargs):
+  gs_opts = copy.copy(opts)
+  for name in ["color_maximizing_in_gs", "color_averaging_in_gs", "color_no_change_in_gs",
+               "stack_frames_in_gs"]:
+    setattr(gs_opts, name, False)
+  for name, value in kwargs.items():
+    setattr(gs_opts, name, value)
+  return gs_opts
+
+def bench_game_state():
+  color_modes = [("gray", {}),
+                 ("max", {"color_maximizing_in_gs": True}),
+                 ("avg", {"color_averaging_in_gs": True}),
+                 ("rgb", {"color_no_change_in_gs": True})]
+  # frames are stacked only with frames_skip_in_gs=4 (4 frames of state)
+  skip_modes = [("skip1", {"frames_skip_in_gs": 1}),
+                ("skip4", {"frames_skip_in_gs": 4}),
+                ("stack4", {"frames_skip_in_gs": 4, "stack_frames_in_gs": True})]
+  for color, color_kwargs in color_modes:
+    for skip, skip_kwargs in skip_modes:
+      kwargs = dict(color_kwargs, psc_use=False, **skip_kwargs)
+      game_state = GameState(0, game_state_options(**kwargs), thread_index=1)
+      def process():
+        game_state.process(0)
+        game_state.update()
+        if game_state.terminal:
+          game_state.reset()
+      bench("game_state.process[{},{}]".format(color, skip), process)
+
+def bench_psc():
+  game_state = GameState(0, game_state_options(psc_use=True), thread_index=1)
+  rng = np.random.RandomState(0)
+  images = rng.randint(0, opts.psc_maxval + 1, (64, game_state.psc_k)).astype(np.uint8)
+  index = [0]
+  def psc_add_image():
+    game_state.psc_add_image(images[index[0] % len(images)])
+    index[0] += 1
+  bench("game_state.psc_add_image", psc_add_image)
+
+def numpy_network():
+  # NumpyACNetwork with random weights
+  from numpy_network import NumpyACNetwork
+  from checkpoint_reader import FF_WEIGHT_NAMES, LSTM_WEIGHT_NAMES
+  shapes = {"W_conv1": [8, 8, 4, 16], "b_conv1": [16],
+            "W_conv2": [4, 4, 16, 32], "b_conv2": [32],
+            "W_fc1": [2592, 256], "b_fc1": [256],
+            "W_fc2": [256, opts.action_size], "b_fc2": [opts.action_size],
+            "W_fc3": [256, 1], "b_fc3": [1],
+            "lstm_matrix": [512, 1024], "lstm_bias": [1024]}
+  names = FF_WEIGHT_NAMES + (LSTM_WEIGHT_NAMES if opts.use_lstm else [])
+  rng = np.random.RandomState(0)
+  weights = dict((name, rng.uniform(-0.05, 0.05, shapes[name]).astype(np.float32))
+                 for name in names)
+  return NumpyACNetwork(weights)
+
+def bench_numpy_network():
+  network = numpy_network()
+  s_t = np.random.RandomState(0).rand(84, 84, 4).astype(np.float32)
+  bench("numpy_network.run_policy_and_value", lambda: network.run_policy_and_value(None, s_t))
+
+def bench_policy_cache():
+  # hit rate of policy cache (cleared at each sync, i.e. every LOCAL_T_MAX
+  # steps) with random actions on emulator of --fake-ale (use a recording of
+  # the game, see fake_ale.py), and cost of lookup versus forward pass
+  from policy_cache import PolicyCache, state_digest
+  if args.filter is not None and args.filter not in "policy_cache":
+    return
+  network = numpy_network()
+  game_state = GameState(0, game_state_options(psc_use=False), thread_index=1)
+  cache = PolicyCache(max(opts.policy_cache_size, opts.local_t_max))
+  rng = np.random.RandomState(0)
+  steps = 10000
+  for step in range(steps):
+    if step % opts.local_t_max == 0:
+      cache.invalidate()
+    cache.run_policy_and_value(network, None, game_state.s_t)
+    game_state.process(rng.randint(opts.action_size))
+    game_state.update()
+    if game_state.terminal:
+      game_state.reset()
+  s_t = game_state.s_t
+  bench("policy_cache.state_digest", lambda: state_digest(s_t))
+  digest_rate = results[-1]["ops_per_sec"]
+  forward_rate = float(np.median(measure(lambda: network.run_policy_and_value(None, s_t))))
+  # a hit saves a forward pass, every lookup costs a digest
+  print("policy cache: hit rate {:.1f}% in {} steps (t_max={}), break-even {:.1f}%".format(
+        cache.hit_rate() * 100.0, steps, opts.local_t_max, forward_rate / digest_rate * 100.0))
+
+def bench_training_thread():
+  try:
+    import tensorflow as tf
+  except ImportError:
+    print("tensorflow is not installed. skip benchmarks of A3CTrainingThread")
+    return
+  from game_ac_network import GameACFFNetwork, GameACLSTMNetwork
+  from a3c_training_thread import A3CTrainingThread
+  from rmsprop_applier import RMSPropApplier
+  from shared_graph import SharedGraphTemplate
+
+  device = "/cpu:0"
+  if opts.use_lstm:
+    global_network = GameACLSTMNetwork(opts.action_size, -1, device)
+  else:
+    global_network = GameACFFNetwork(opts.action_size, device)
+  learning_rate_input = tf.placeholder("float")
+  grad_applier = RMSPropApplier(learning_rate = learning_rate_input,
+                                decay = opts.rmsp_alpha,
+                                momentum = 0.0,
+                                epsilon = opts.rmsp_epsilon,
+                                clip_norm = opts.grad_norm_clip,
+                                device = device)
+  shared_graph = None
+  if opts.shared_graph:
+    shared_graph = SharedGraphTemplate(global_network, grad_applier, opts.entropy_beta,
+                                       opts.use_lstm, device)
+  thread = A3CTrainingThread(0, global_network, 7e-4, learning_rate_input, grad_applier,
+                             opts.max_time_step, device = device, options = opts,
+                             shared_graph = shared_graph)
+  sess = tf.Session(config=tf.ConfigProto(log_device_placement=False,
+                                          allow_soft_placement=True))
+  sess.run(tf.initialize_all_variables())
+  sess.run(tf.initialize_local_variables())
+  thread.set_start_time(time.time())
+
+  network = thread.local_network
+  game_state = thread.game_state
+  pi_, _ = network.run_policy_and_value(sess, game_state.s_t)
+  bench("training_thread.choose_action", lambda: thread.choose_action(pi_.copy(), 0))
+  bench("network.run_policy_and_value", lambda: network.run_policy_and_value(sess, game_state.s_t))
+  bench("network.run_value", lambda: network.run_value(sess, game_state.s_t))
+  if thread.sync is not None:
+    # no sync op with --shared-graph
+    bench("training_thread.sync", lambda: sess.run(thread.sync))
+
+  # rollout of LOCAL_T_MAX steps for gradient section
+  states = []
+  actions = []
+  values = []
+  rewards = []
+  liveses = [game_state.lives]
+  start_lstm_state = network.get_lstm_state(sess) if opts.use_lstm else None
+  for _ in range(opts.local_t_max):
+    pi_, value_ = network.run_policy_and_value(sess, game_state.s_t)
+    action = thread.choose_action(pi_, 0)
+    states.append(game_state.s_t)
+    actions.append(action)
+    values.append(value_)
+    game_state.process(action)
+    rewards.append(game_state.reward)
+    liveses.append(game_state.lives)
+    game_state.update()
+  def train():
+    thread._train(sess, 0, list(states), list(actions), list(rewards), list(values),
+                  list(liveses), 0.0, start_lstm_state)
+  bench("training_thread.train[t_max={}]".format(opts.local_t_max), train)
+
+
+def compare(results, baseline, threshold):
+  # returns names of regressed benchmarks
+  baseline = dict((result["name"], result) for result in baseline)
+  regressions = []
+  for result in results:
+    base = baseline.get(result["name"])
+    if base is None:
+      continue
+    ratio = result["ops_per_sec"] / base["ops_per_sec"]
+    mark = ""
+    if ratio < 1.0 - threshold:
+      mark = "REGRESSION"
+      regressions.append(result["name"])
+    print("{:40s} {:12.1f} / {:12.1f} = {:6.3f} {}".format(
+          result["name"], result["ops_per_sec"], base["ops_per_sec"], ratio, mark))
+  return regressions
+
+
+if __name__ == "__main__":
+  args, options_argv = parser.parse_known_args()
+  if not any(arg.startswith("--fake-ale") for arg in options_argv):
+    options_argv.append("--fake-ale=synthetic")
+  opts = options.parse_options(options_argv)
+
+  bench_game_state()
+  bench_psc()
+  bench_numpy_network()
+  bench_policy_cache()
+  bench_training_thread()
+
+  if args.output is not None:
+    with open(args.output, "w") as f:
+      json.dump(results, f, indent=2)
+    print("results saved to", args.output)
+
+  if args.baseline is not None:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    print("===== compare with {} =====".format(args.baseline))
+    regressions = compare(results, baseline, args.threshold)
+    if len(regressions) > 0:
+      print("{} benchmarks regressed by more than {:.0f}%".format(
+            len(regressions), args.threshold * 100))
+      sys.exit(1)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Graph-free access to the weights saved by a3c.py.
+#
+# The global network is the first network built in a3c.py (and in
+# a3c_display.py), so its tf.Variables are named "Variable", "Variable_1", ...
+# in the order of GameACNetwork.get_vars(). LSTM weights are created by
+# get_variable() under the "net_-1" scope.
+# Weights are read straight from the checkpoint file into NumPy arrays, so no
+# graph, session, ROM or options are needed. TensorFlow is imported only when
+# a TensorFlow checkpoint (not an exported .npz file) is read.
+import argparse
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+FF_WEIGHT_NAMES = ["W_conv1", "b_conv1",
+                   "W_conv2", "b_conv2",
+                   "W_fc1", "b_fc1",
+                   "W_fc2", "b_fc2",
+                   "W_fc3", "b_fc3"]
+LSTM_WEIGHT_NAMES = ["lstm_matrix", "lstm_bias"]
+
+GLOBAL_LSTM_SCOPE = "net_-1/"
+
+def _tf_variable_name(index):
+  if index == 0:
+    return "Variable"
+  return "Variable_{}".format(index)
+
+def checkpoint_global_t(path):
+  # "checkpoints/checkpoint-84000050" => 84000050
+  return int(os.path.basename(path).rsplit("-", 1)[1])
+
+def incomplete_marker_path(checkpoint_dir, global_t):
+  # exists while data of checkpoint is being saved by a3c.py
+  # (checkpoint is incomplete if saving was interrupted)
+  return os.path.join(checkpoint_dir, "incomplete.{}".format(global_t))
+
+def is_complete(path):
+  checkpoint_dir = os.path.dirname(path)
+  return not os.path.exists(incomplete_marker_path(checkpoint_dir, checkpoint_global_t(path)))
+
+def find_state_file(checkpoint_dir, prefix, global_t):
+  # newest state file PREFIX.STEP (e.g. 'gs.84000050') with STEP <= global_t,
+  # (state of previous save is used if it was not saved with checkpoint)
+  prog = re.compile(re.escape(prefix) + r"\.(\d+)$")
+  best = None
+  for fname in os.listdir(checkpoint_dir):
+    match = prog.match(fname)
+    if match and int(match.group(1)) <= global_t:
+      if best is None or int(match.group(1)) > best[0]:
+        best = (int(match.group(1)), fname)
+  if best is None:
+    return None
+  return os.path.join(checkpoint_dir, best[1])
+
+def get_checkpoint_paths(checkpoint_dir, complete_only=True):
+  # list of checkpoint paths (oldest first) recorded in 'checkpoint' file
+  # (checkpoints whose saving was interrupted are excluded if complete_only)
+  paths = []
+  state_fname = os.path.join(checkpoint_dir, "checkpoint")
+  if os.path.exists(state_fname):
+    prog = re.compile('all_model_checkpoint_paths:\s*"(.*)"')
+    with open(state_fname, "r") as f:
+      for line in f:
+        match = prog.match(line.strip())
+        if match:
+          path = match.group(1)
+          if not os.path.isabs(path):
+            path = os.path.join(checkpoint_dir, os.path.basename(path))
+          paths.append(path)
+  if len(paths) == 0 and os.path.isdir(checkpoint_dir):
+    prog = re.compile("checkpoint-(\d+)$")
+    for fname in os.listdir(checkpoint_dir):
+      if prog.match(fname):
+        paths.append(os.path.join(checkpoint_dir, fname))
+  paths.sort(key=checkpoint_global_t)
+  if complete_only:
+    paths = [path for path in paths if is_complete(path)]
+  return paths
+
+def latest_checkpoint_path(checkpoint_dir):
+  paths = get_checkpoint_paths(checkpoint_dir)
+  if len(paths) == 0:
+    return None
+  return paths[-1]
+
+def _read_tf_checkpoint(path):
+  from tensorflow.python import pywrap_tensorflow
+  reader = pywrap_tensorflow.NewCheckpointReader(path)
+  var_shapes = reader.get_variable_to_shape_map()
+
+  weights = OrderedDict()
+  for i, name in enumerate(FF_WEIGHT_NAMES):
+    weights[name] = reader.get_tensor(_tf_variable_name(i))
+
+  # LSTM network has matrix and bias of CustomBasicLSTMCell
+  for var_name in sorted(var_shapes.keys()):
+    if var_name.startswith(GLOBAL_LSTM_SCOPE):
+      if var_name.endswith("/Matrix"):
+        weights["lstm_matrix"] = reader.get_tensor(var_name)
+      elif var_name.endswith("/Bias"):
+        weights["lstm_bias"] = reader.get_tensor(var_name)
+  return weights
+
+def read_weights(path):
+  """Read weights of global network into OrderedDict of NumPy arrays.
+
+  Args:
+    path: checkpoint path (e.g. 'checkpoints/checkpoint-84000050'),
+          checkpoint directory (latest checkpoint is used) or .npz file
+          written by export_weights().
+  """
+  if os.path.isdir(path):
+    checkpoint_dir = path
+    path = latest_checkpoint_path(checkpoint_dir)
+    if path is None:
+      raise IOError("no checkpoint in {}".format(checkpoint_dir))
+
+  if path.endswith(".npz"):
+    weights = OrderedDict()
+    with np.load(path) as data:
+      for name in FF_WEIGHT_NAMES + LSTM_WEIGHT_NAMES:
+        if name in data.files:
+          weights[name] = data[name]
+    return weights
+  else:
+    return _read_tf_checkpoint(path)
+
+def is_lstm_weights(weights):
+  return "lstm_matrix" in weights
+
+def export_weights(path, export_path):
+  # write weights of global network into one compressed .npz file
+  weights = read_weights(path)
+  np.savez_compressed(export_path, **weights)
+  return weights
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="read weights in A3C checkpoint without building graph")
+  parser.add_argument('path',
+                      help="checkpoint directory, checkpoint file or exported .npz file")
+  parser.add_argument('--export', default=None,
+                      help="export weights to EXPORT (.npz)")
+  parser.add_argument('--list', action='store_true',
+                      help="list checkpoints in directory")
+  args = parser.parse_args()
+
+  if args.list:
+    for path in get_checkpoint_paths(args.path):
+      print(checkpoint_global_t(path), path)
+  else:
+    if args.export is not None:
+      weights = export_weights(args.path, args.export)
+      print("weights exported to", args.export)
+    else:
+      weights = read_weights(args.path)
+    for name, value in weights.items():
+      print("{:12s} shape={} mean={:.6f} std={:.6f}".format(name, value.shape, value.mean(), value.std()))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import checkpoint_reader
+from numpy_network import NumpyACNetwork
+
+def random_weights(action_size, use_lstm=False):
+  rng = np.random.RandomState(0)
+  shapes = {"W_conv1": [8, 8, 4, 16], "b_conv1": [16],
+            "W_conv2": [4, 4, 16, 32], "b_conv2": [32],
+            "W_fc1": [2592, 256], "b_fc1": [256],
+            "W_fc2": [256, action_size], "b_fc2": [action_size],
+            "W_fc3": [256, 1], "b_fc3": [1]}
+  if use_lstm:
+    shapes["lstm_matrix"] = [512, 1024]
+    shapes["lstm_bias"] = [1024]
+  return {name: (rng.uniform(-0.05, 0.05, shape)).astype(np.float32)
+          for name, shape in shapes.items()}
+
+class TestCheckpointReader(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_get_checkpoint_paths(self):
+    with open(os.path.join(self.dir, "checkpoint"), "w") as f:
+      f.write('model_checkpoint_path: "checkpoint-300"\n')
+      f.write('all_model_checkpoint_paths: "checkpoint-20"\n')
+      f.write('all_model_checkpoint_paths: "checkpoint-300"\n')
+    paths = checkpoint_reader.get_checkpoint_paths(self.dir)
+    self.assertEqual([20, 300], [checkpoint_reader.checkpoint_global_t(p) for p in paths])
+    self.assertEqual(os.path.join(self.dir, "checkpoint-300"),
+                     checkpoint_reader.latest_checkpoint_path(self.dir))
+
+  def test_get_checkpoint_paths_without_state_file(self):
+    for fname in ["checkpoint-7", "checkpoint-7.meta", "checkpoint-11", "wall_t.11"]:
+      open(os.path.join(self.dir, fname), "w").close()
+    paths = checkpoint_reader.get_checkpoint_paths(self.dir)
+    self.assertEqual(["checkpoint-7", "checkpoint-11"], [os.path.basename(p) for p in paths])
+
+  def test_incomplete_checkpoint(self):
+    for fname in ["checkpoint-7", "checkpoint-11", "checkpoint-15"]:
+      open(os.path.join(self.dir, fname), "w").close()
+    # saving of checkpoint-15 was interrupted
+    open(checkpoint_reader.incomplete_marker_path(self.dir, 15), "w").close()
+    self.assertEqual("checkpoint-11",
+                     os.path.basename(checkpoint_reader.latest_checkpoint_path(self.dir)))
+    paths = checkpoint_reader.get_checkpoint_paths(self.dir, complete_only=False)
+    self.assertEqual(3, len(paths))
+
+  def test_find_state_file(self):
+    for fname in ["gs.7", "gs.11.tmp", "gs.3", "psc.11"]:
+      open(os.path.join(self.dir, fname), "w").close()
+    # gs.11 was skipped by deadline, gs.7 is used
+    self.assertEqual("gs.7", os.path.basename(checkpoint_reader.find_state_file(self.dir, "gs", 11)))
+    self.assertEqual("psc.11", os.path.basename(checkpoint_reader.find_state_file(self.dir, "psc", 11)))
+    self.assertIsNone(checkpoint_reader.find_state_file(self.dir, "gs", 2))
+
+  def test_read_npz(self):
+    weights = random_weights(4, use_lstm=True)
+    fname = os.path.join(self.dir, "weights.npz")
+    np.savez_compressed(fname, **weights)
+    read = checkpoint_reader.read_weights(fname)
+    self.assertEqual(checkpoint_reader.FF_WEIGHT_NAMES + checkpoint_reader.LSTM_WEIGHT_NAMES,
+                     list(read.keys()))
+    self.assertTrue(checkpoint_reader.is_lstm_weights(read))
+    for name in weights:
+      self.assertTrue((weights[name] == read[name]).all())
+
+  def test_numpy_network(self):
+    network = NumpyACNetwork(random_weights(6, use_lstm=True))
+    s_t = np.random.rand(84, 84, 4).astype(np.float32)
+    pi, v = network.run_policy_and_value(None, s_t)
+    self.assertEqual((6,), pi.shape)
+    self.assertAlmostEqual(1.0, float(pi.sum()), places=5)
+
+    # run_value() doesn't change LSTM state
+    lstm_state = network.lstm_state_out.copy()
+    network.run_value(None, s_t)
+    self.assertTrue((lstm_state == network.lstm_state_out).all())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import time
+
+# Pseudo-count state of threads saved with each checkpoint of a3c.py:
+#   psc.GLOBAL_T : psc_info of thread 0 (for compatibility)
+#   gs.GLOBAL_T  : gs_info of all threads
+# The state has the lowest priority in a checkpoint. With a deadline
+# (preemption), it is skipped if it is not expected to be written by the
+# deadline, and the state of a previous checkpoint is used when resumed
+# (checkpoint_reader.find_state_file()).
+# Time to write is measured at each save. Before the first save of the
+# process, it is estimated from size of pseudo-count tables.
+
+# conservative throughput of pickle and write (slow persistent disk of VM)
+ESTIMATED_BYTES_PER_SEC = 20e6
+
+def write_file(fname, data):
+  # write data (bytes) atomically (no partial file is left by interruption)
+  tmp_fname = fname + '.tmp'
+  with open(tmp_fname, 'wb') as f:
+    f.write(data)
+  os.replace(tmp_fname, fname)
+
+class StateWriter(object):
+  def __init__(self, checkpoint_dir):
+    self.checkpoint_dir = checkpoint_dir
+    # measured time of last save (None until first save)
+    self.save_sec = None
+
+  def estimate_sec(self, game_states):
+    # expected time to save state of GAME_STATES
+    if self.save_sec is not None:
+      return self.save_sec
+    # tables of all threads, and of thread 0 again in psc file
+    nbytes = sum(game_state.psc_vcount.nbytes for game_state in game_states)
+    nbytes += game_states[0].psc_vcount.nbytes
+    return nbytes / ESTIMATED_BYTES_PER_SEC
+
+  def save(self, global_t, game_states, deadline=None):
+    # returns True if state is saved (False if skipped by deadline)
+    if deadline is not None:
+      needed_sec = self.estimate_sec(game_states)
+      if time.time() + needed_sec > deadline:
+        print('@@@ psc_info and all_gs_info skipped: {:.1f} sec to deadline, {:.1f} sec needed{}'.format(
+              deadline - time.time(), needed_sec, "" if self.save_sec is not None else " (estimated)"))
+        return False
+
+    start = time.time()
+    # write psc_info of thread0 (for compatibility)
+    game_state = game_states[0]
+    psc_fname = os.path.join(self.checkpoint_dir, 'psc.' + str(global_t))
+    write_file(psc_fname, pickle.dumps({"psc_n":game_state.psc_n, "psc_vcount":game_state.psc_vcount}))
+    # write game_state info of all thread (all_gs_info)
+    all_gs_info = []
+    for game_state in game_states:
+      gs_info = {"psc_n":game_state.psc_n, "psc_vcount":game_state.psc_vcount,
+                 "rooms":game_state.rooms, "episode":game_state.episode}
+      all_gs_info.append(gs_info)
+    gs_fname = os.path.join(self.checkpoint_dir, 'gs.' + str(global_t))
+    write_file(gs_fname, pickle.dumps(all_gs_info))
+    self.save_sec = time.time() - start
+    return True
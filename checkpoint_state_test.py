@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+import checkpoint_reader
+from checkpoint_state import StateWriter, ESTIMATED_BYTES_PER_SEC
+
+class FakeGameState(object):
+  def __init__(self, psc_n, table_bytes=1000):
+    self.psc_n = psc_n
+    self.psc_vcount = np.zeros(table_bytes // 8, dtype=np.float64)
+    self.rooms = np.zeros(24, dtype=np.int64)
+    self.episode = 1
+
+class TestStateWriter(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.stdout = sys.stdout
+    sys.stdout = io.StringIO()
+
+  def tearDown(self):
+    sys.stdout = self.stdout
+    shutil.rmtree(self.dir)
+
+  def test_deadline_before_first_save(self):
+    writer = StateWriter(self.dir)
+    game_states = [FakeGameState(i) for i in range(2)]
+    # preemption before first periodic save: no measurement yet
+    self.assertFalse(writer.save(100, game_states, deadline=time.time() - 1.0))
+    self.assertEqual([], os.listdir(self.dir))
+    self.assertIn("(estimated)", sys.stdout.getvalue())
+
+    # estimate from size of tables (thread 0 is saved twice)
+    self.assertAlmostEqual(3000 / ESTIMATED_BYTES_PER_SEC, writer.estimate_sec(game_states))
+    big = [FakeGameState(i, table_bytes=int(ESTIMATED_BYTES_PER_SEC)) for i in range(2)]
+    self.assertFalse(writer.save(100, big, deadline=time.time() + 1.0))
+    self.assertEqual([], os.listdir(self.dir))
+
+  def test_save_and_measure(self):
+    writer = StateWriter(self.dir)
+    game_states = [FakeGameState(i) for i in range(2)]
+    self.assertTrue(writer.save(100, game_states))
+    self.assertIsNotNone(writer.save_sec)
+    self.assertEqual(writer.save_sec, writer.estimate_sec(game_states))
+    with open(os.path.join(self.dir, "gs.100"), "rb") as f:
+      all_gs_info = pickle.load(f)
+    self.assertEqual([0, 1], [gs_info["psc_n"] for gs_info in all_gs_info])
+
+    # deadline passed: state of previous checkpoint is used when resumed
+    self.assertFalse(writer.save(200, game_states, deadline=time.time() - 1.0))
+    self.assertFalse(os.path.exists(os.path.join(self.dir, "psc.200")))
+    self.assertEqual(os.path.join(self.dir, "psc.100"),
+                     checkpoint_reader.find_state_file(self.dir, "psc", 200))
+
+if __name__ == '__main__':
+  unittest.main()
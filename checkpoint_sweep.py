@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import sys
+import time
+
+# Evaluate all checkpoints in checkpoint directories and make score-vs-step
+# table and curve. Each checkpoint is evaluated over --episodes episodes in
+# parallel by evaluate.py. Results are cached in --cache keyed by checkpoint,
+# so already evaluated checkpoints are skipped on rerun.
+# Other arguments are passed to evaluate.py and options.py, e.g.
+#   python checkpoint_sweep.py checkpoints.montezuma-b --rom=montezuma_revenge.bin --episodes=30 --workers=8
+#   python checkpoint_sweep.py dir1 dir2 --table=sweep.tsv --plot=sweep.png
+
+parser = argparse.ArgumentParser(description="evaluate all checkpoints and make score-vs-step curve")
+parser.add_argument('checkpoint_dirs', nargs='*',
+                    help="checkpoint directories (default: --checkpoint-dir)")
+parser.add_argument('--episodes', type=int, default=30,
+                    help="number of episodes of each checkpoint")
+parser.add_argument('--cache', default="checkpoint_sweep.json",
+                    help="cache of evaluation results")
+parser.add_argument('--table', default=None,
+                    help="write table (tab separated) to TABLE")
+parser.add_argument('--plot', default=None,
+                    help="save curve to PLOT (.png)")
+parser.add_argument('--no-eval', action='store_true',
+                    help="don't evaluate checkpoints, only make table and curve from cache")
+
+import evaluate
+import checkpoint_reader
+
+def checkpoint_mtime(path):
+  # TF checkpoint is one file (V1) or files with suffixes (V2)
+  for fname in [path, path + ".index", path + ".meta"]:
+    if os.path.exists(fname):
+      return os.path.getmtime(fname)
+  return None
+
+def cache_key(path, episodes, seed):
+  return "{}:e{}:seed{}".format(os.path.abspath(path), episodes, seed)
+
+def load_cache(cache_file):
+  if not os.path.exists(cache_file):
+    return {}
+  with open(cache_file) as f:
+    return json.load(f)
+
+def save_cache(cache, cache_file):
+  # write whole cache atomically (sweep can be interrupted at any time)
+  tmp_file = cache_file + ".tmp"
+  with open(tmp_file, "w") as f:
+    json.dump(cache, f, indent=2, sort_keys=True)
+  os.replace(tmp_file, cache_file)
+
+def is_cached(cache, path, episodes, seed):
+  entry = cache.get(cache_key(path, episodes, seed))
+  # checkpoint overwritten after evaluation is evaluated again
+  return entry is not None and entry["mtime"] == checkpoint_mtime(path)
+
+def sweep_rows(cache, checkpoint_dirs, episodes, seed):
+  # rows of (directory, global_t, summary) of cached checkpoints
+  rows = []
+  for checkpoint_dir in checkpoint_dirs:
+    for path in checkpoint_reader.get_checkpoint_paths(checkpoint_dir):
+      entry = cache.get(cache_key(path, episodes, seed))
+      if entry is not None:
+        rows.append((checkpoint_dir, entry["global_t"], entry["summary"]))
+  return rows
+
+def write_table(rows, f):
+  percentiles = list(rows[0][2]["percentiles"].keys()) if rows else []
+  f.write("\t".join(["dir", "global_t", "episodes", "mean", "std", "median", "min", "max"] +
+                    ["p" + p for p in percentiles] + ["rooms"]) + "\n")
+  for checkpoint_dir, global_t, summary in rows:
+    values = [checkpoint_dir, str(global_t), str(summary["episodes"])]
+    values += ["{:.1f}".format(summary[k]) for k in ["mean", "std", "median", "min", "max"]]
+    values += ["{:.1f}".format(summary["percentiles"].get(p, float("nan"))) for p in percentiles]
+    values.append(str(len(summary["rooms"])))
+    f.write("\t".join(values) + "\n")
+
+def plot_curve(rows, plot_file):
+  # trick for headless environment
+  import matplotlib as mpl
+  mpl.use('Agg')
+  import matplotlib.pyplot as plt
+
+  fig = plt.figure("checkpoint sweep")
+  ax = fig.add_subplot(111)
+  for checkpoint_dir in sorted(set(row[0] for row in rows)):
+    dir_rows = [row for row in rows if row[0] == checkpoint_dir]
+    x = [global_t / 1e6 for _, global_t, _ in dir_rows]
+    mean = [summary["mean"] for _, _, summary in dir_rows]
+    line, = ax.plot(x, mean, marker="o", label=checkpoint_dir)
+    percentiles = list(dir_rows[0][2]["percentiles"].keys())
+    if len(percentiles) >= 2:
+      # band between lowest and highest percentiles
+      low = [summary["percentiles"][percentiles[0]] for _, _, summary in dir_rows]
+      high = [summary["percentiles"][percentiles[-1]] for _, _, summary in dir_rows]
+      ax.fill_between(x, low, high, color=line.get_color(), alpha=0.2)
+  ax.set_xlabel("M steps")
+  ax.set_ylabel("Score")
+  ax.grid(linewidth=1, linestyle=":")
+  ax.legend(loc="upper left", fontsize="small")
+  plt.savefig(plot_file)
+  print("Graph saved to ", plot_file)
+
+
+if __name__ == "__main__":
+  sweep_args, evaluate_argv = parser.parse_known_args()
+  evaluate_args, options = evaluate.parse_args(evaluate_argv)
+  checkpoint_dirs = sweep_args.checkpoint_dirs or [options.checkpoint_dir]
+  episodes = sweep_args.episodes
+  seed = evaluate_args.seed
+  percentiles = evaluate.parse_percentiles(evaluate_args.percentiles)
+  cache = load_cache(sweep_args.cache)
+
+  if not sweep_args.no_eval:
+    paths = [path for checkpoint_dir in checkpoint_dirs
+             for path in checkpoint_reader.get_checkpoint_paths(checkpoint_dir)]
+    pending = [path for path in paths if not is_cached(cache, path, episodes, seed)]
+    print("{} checkpoints, {} cached, {} to evaluate".format(
+          len(paths), len(paths) - len(pending), len(pending)))
+    for i, path in enumerate(pending):
+      start = time.time()
+      weights = checkpoint_reader.read_weights(path)
+      results = evaluate.evaluate(weights, episodes, options, workers=evaluate_args.workers, seed=seed)
+      summary = evaluate.summarize(results, percentiles)
+      cache[cache_key(path, episodes, seed)] = {
+        "global_t": checkpoint_reader.checkpoint_global_t(path),
+        "mtime": checkpoint_mtime(path),
+        "summary": summary}
+      save_cache(cache, sweep_args.cache)
+      print("[{}/{}] {} ({:.1f} sec)".format(i + 1, len(pending), path, time.time() - start))
+      evaluate.print_summary(summary)
+      sys.stdout.flush()
+
+  rows = sweep_rows(cache, checkpoint_dirs, episodes, seed)
+  write_table(rows, sys.stdout)
+  if sweep_args.table is not None:
+    with open(sweep_args.table, "w") as f:
+      write_table(rows, f)
+    print("table saved to", sweep_args.table)
+  if sweep_args.plot is not None and len(rows) > 0:
+    plot_curve(rows, sweep_args.plot)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import checkpoint_sweep
+from evaluate import summarize
+
+class TestCheckpointSweep(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.checkpoint_dir = os.path.join(self.dir, "checkpoints")
+    os.makedirs(self.checkpoint_dir)
+    self.paths = []
+    for global_t in [200, 100]:
+      path = os.path.join(self.checkpoint_dir, "checkpoint-{}".format(global_t))
+      open(path, "w").close()
+      self.paths.append(path)
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_cache(self):
+    cache_file = os.path.join(self.dir, "sweep.json")
+    cache = checkpoint_sweep.load_cache(cache_file)
+    path = self.paths[0]
+    self.assertFalse(checkpoint_sweep.is_cached(cache, path, 10, 0))
+    summary = summarize([{"score": 100.0, "steps": 10, "rooms": [1]}])
+    cache[checkpoint_sweep.cache_key(path, 10, 0)] = {
+      "global_t": 200, "mtime": checkpoint_sweep.checkpoint_mtime(path), "summary": summary}
+    checkpoint_sweep.save_cache(cache, cache_file)
+
+    cache = checkpoint_sweep.load_cache(cache_file)
+    self.assertTrue(checkpoint_sweep.is_cached(cache, path, 10, 0))
+    # other number of episodes, other seed or overwritten checkpoint
+    self.assertFalse(checkpoint_sweep.is_cached(cache, path, 20, 0))
+    self.assertFalse(checkpoint_sweep.is_cached(cache, path, 10, 1))
+    os.utime(path, (0, 0))
+    self.assertFalse(checkpoint_sweep.is_cached(cache, path, 10, 0))
+
+  def test_rows(self):
+    cache = {}
+    for path, score in zip(self.paths, [300.0, 100.0]):
+      cache[checkpoint_sweep.cache_key(path, 5, 0)] = {
+        "global_t": int(path.rsplit("-", 1)[1]), "mtime": 0.0,
+        "summary": summarize([{"score": score, "steps": 10, "rooms": [1, 0]}])}
+    rows = checkpoint_sweep.sweep_rows(cache, [self.checkpoint_dir], 5, 0)
+    self.assertEqual([100, 200], [global_t for _, global_t, _ in rows])
+    self.assertEqual(300.0, rows[1][2]["mean"])
+    f = io.StringIO()
+    checkpoint_sweep.write_table(rows, f)
+    lines = f.getvalue().splitlines()
+    self.assertEqual(3, len(lines))
+    self.assertEqual(["dir", "global_t", "episodes", "mean"], lines[0].split("\t")[:4])
+    self.assertEqual("2", lines[1].split("\t")[-1])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from numpy_network import NumpyACNetwork
+import checkpoint_reader
+
+# Process-parallel evaluation of a checkpoint.
+# Episodes are spread over a pool of worker processes. Each worker has its own
+# emulator (ALE or gym, so gym evaluation doesn't need --parallel-size=1) and
+# read-only copy of the weights in NumpyACNetwork, so no graph is built.
+# Episode i is played with random seed SEED+i (emulator is reseeded and
+# restarted for each episode), so results don't depend on which worker plays
+# which episode.
+# Other arguments are passed to options.py, e.g.
+#   python evaluate.py --rom=montezuma_revenge.bin --episodes=100 --workers=8
+#   python evaluate.py --checkpoint=checkpoints/checkpoint-84000050 --output=eval.json
+#   python evaluate.py --record-screen-dir=screen (record screens of episodes)
+
+parser = argparse.ArgumentParser(description="process-parallel evaluation of A3C checkpoint")
+parser.add_argument('--checkpoint', default=None,
+                    help="checkpoint file, directory (latest checkpoint) or .npz file (default: --checkpoint-dir)")
+parser.add_argument('--episodes', type=int, default=None,
+                    help="number of episodes (default: --num-episode-record)")
+parser.add_argument('--workers', type=int, default=None,
+                    help="number of worker processes (default: number of CPUs, 0: play in this process)")
+parser.add_argument('--seed', type=int, default=0,
+                    help="episode i is played with random seed SEED+i (emulator and action sampling)")
+parser.add_argument('--percentiles', default="10,25,75,90",
+                    help="comma separated percentiles of scores")
+parser.add_argument('--output', default=None,
+                    help="write episodes and summary to json file")
+
+import options
+
+# state of worker process (set by _init_worker)
+_network = None
+_game_state = None
+_options = None
+_worker_index = 0
+
+def choose_action(pi_values):
+  # same as a3c_display.py
+  pi_values -= np.finfo(np.float32).epsneg
+  action_samples = np.random.multinomial(_options.num_experiments, pi_values)
+  return action_samples.argmax(0)
+
+def _init_worker(weights, opts, seed):
+  global _network, _game_state, _options, _worker_index
+  # game_state (and cv2) is imported in workers only
+  from game_state import GameState
+  from multiprocessing.util import Finalize
+
+  identity = multiprocessing.current_process()._identity
+  _worker_index = identity[0] if identity else 0
+  _options = opts
+  _network = NumpyACNetwork(weights)
+  _game_state = GameState(seed + _worker_index, opts, display=opts.display,
+                          no_op_max=30, thread_index=_worker_index)
+  if opts.use_gym and (opts.record_screen_dir is not None):
+    # gym monitor of each worker writes into its own directory
+    _game_state.set_record_screen_dir(
+      os.path.join(opts.record_screen_dir, "w{:02d}".format(_worker_index)))
+    Finalize(None, _game_state.close_record_screen_dir, exitpriority=10)
+
+def play_episode(episode, seed):
+  # returns dict of result of one episode
+  opts = _options
+  game_state = _game_state
+  np.random.seed(seed)
+  # no-ops of reset() use np.random too
+  game_state.reseed(seed)
+  _network.reset_state()
+
+  episode_record_dir = None
+  if (not opts.use_gym) and (opts.record_screen_dir is not None):
+    episode_dir = opts.rom.split(".")[0] + "-e{:03d}".format(episode)
+    episode_record_dir = os.path.join(opts.record_screen_dir, episode_dir)
+    os.makedirs(episode_record_dir)
+    game_state.set_record_screen_dir(episode_record_dir)
+
+  start = time.time()
+  steps = 0
+  reward = 0
+  rooms = set([int(game_state.room_no)])
+  while True:
+    pi_values = _network.run_policy(None, game_state.s_t)
+    action = choose_action(pi_values)
+    game_state.process(action)
+    reward += game_state.reward
+    rooms.add(int(game_state.room_no))
+
+    # terminate if the play time is too long
+    steps += 1
+    terminal = game_state.terminal
+    if steps > opts.max_play_steps:
+      terminal = True
+
+    if terminal:
+      game_state.reset()
+      break
+    else:
+      game_state.update()
+
+  if episode_record_dir is not None:
+    new_episode_record_dir = episode_record_dir + "-r{:04d}-s{:04d}".format(int(reward), steps)
+    os.rename(episode_record_dir, new_episode_record_dir)
+
+  return {"episode": episode, "worker": _worker_index, "score": float(reward),
+          "steps": steps, "rooms": sorted(rooms), "sec": time.time() - start}
+
+def parse_args(argv=None):
+  # (arguments of evaluate.py, options of options.py) of ARGV
+  args, options_argv = parser.parse_known_args(argv)
+  return args, options.parse_options(options_argv)
+
+def parse_percentiles(value):
+  # "10,12.5,90" -> [10, 12.5, 90] (integer-valued percentiles are ints)
+  percentiles = []
+  for p in value.split(","):
+    if p.strip() != "":
+      p = float(p)
+      percentiles.append(int(p) if p.is_integer() else p)
+  return percentiles
+
+def _play_episode(task):
+  return play_episode(*task)
+
+def summarize(episodes, percentiles=(10, 25, 75, 90)):
+  # statistics of scores, steps and room coverage of episodes
+  scores = np.array([e["score"] for e in episodes], dtype=np.float64)
+  steps = np.array([e["steps"] for e in episodes], dtype=np.float64)
+  room_visits = {}
+  for e in episodes:
+    for room in e["rooms"]:
+      room_visits[room] = room_visits.get(room, 0) + 1
+  summary = OrderedDict()
+  summary["episodes"] = len(episodes)
+  summary["mean"] = float(scores.mean())
+  summary["std"] = float(scores.std())
+  summary["median"] = float(np.median(scores))
+  summary["min"] = float(scores.min())
+  summary["max"] = float(scores.max())
+  summary["percentiles"] = OrderedDict(
+    ("{:g}".format(p), float(np.percentile(scores, p))) for p in percentiles)
+  summary["steps_mean"] = float(steps.mean())
+  summary["rooms"] = sorted(room_visits.keys())
+  # ratio of episodes which visited room
+  summary["room_coverage"] = OrderedDict(
+    (str(room), room_visits[room] / float(len(episodes))) for room in sorted(room_visits.keys()))
+  return summary
+
+def evaluate(weights, num_episodes, opts, workers=None, seed=0, callback=None):
+  """Play num_episodes episodes with weights and options OPTS in pool of
+  worker processes.
+
+  Returns list of results of episodes (in order of episode).
+  callback(result) is called in parent process when each episode ends.
+  With workers == 0, episodes are played in this process (e.g. for display).
+  """
+  # pseudo-count doesn't change policy
+  opts = copy.copy(opts)
+  opts.psc_use = False
+  tasks = [(episode, seed + episode) for episode in range(num_episodes)]
+  results = []
+  if workers == 0:
+    _init_worker(weights, opts, seed)
+    for task in tasks:
+      result = _play_episode(task)
+      results.append(result)
+      if callback is not None:
+        callback(result)
+    return results
+
+  if workers is None:
+    workers = multiprocessing.cpu_count()
+  workers = max(1, min(workers, num_episodes))
+  pool = multiprocessing.Pool(workers, _init_worker, (weights, opts, seed))
+  try:
+    for result in pool.imap_unordered(_play_episode, tasks):
+      results.append(result)
+      if callback is not None:
+        callback(result)
+    pool.close()
+  except:
+    pool.terminate()
+    raise
+  finally:
+    pool.join()
+  results.sort(key=lambda result: result["episode"])
+  return results
+
+def print_summary(summary):
+  print("episodes={} mean={:.1f} std={:.1f} median={:.1f} min={:.1f} max={:.1f} steps={:.0f}".format(
+        summary["episodes"], summary["mean"], summary["std"], summary["median"],
+        summary["min"], summary["max"], summary["steps_mean"]))
+  print("percentiles: " + " ".join("p{}={:.1f}".format(p, v) for p, v in summary["percentiles"].items()))
+  print("rooms: " + " ".join("{}({:.0f}%)".format(room, ratio * 100.0)
+                             for room, ratio in summary["room_coverage"].items()))
+
+
+if __name__ == "__main__":
+  args, opts = parse_args()
+  checkpoint = args.checkpoint or opts.checkpoint_dir
+  num_episodes = args.episodes or opts.num_episode_record
+  percentiles = parse_percentiles(args.percentiles)
+
+  weights = checkpoint_reader.read_weights(checkpoint)
+  if checkpoint_reader.is_lstm_weights(weights) != opts.use_lstm:
+    print("warning: --use-lstm={} but checkpoint is {}".format(
+          opts.use_lstm, "LSTM" if checkpoint_reader.is_lstm_weights(weights) else "FF"))
+  print("checkpoint loaded:", checkpoint)
+
+  def print_episode(result):
+    print("episode={} worker={} score={} steps={} rooms={} ({:.1f} sec)".format(
+          result["episode"], result["worker"], result["score"], result["steps"],
+          result["rooms"], result["sec"]))
+    sys.stdout.flush()
+
+  start = time.time()
+  episodes = evaluate(weights, num_episodes, opts, workers=args.workers, seed=args.seed,
+                      callback=print_episode)
+  summary = summarize(episodes, percentiles)
+  print("===== {} episodes in {:.1f} sec =====".format(len(episodes), time.time() - start))
+  print_summary(summary)
+
+  if args.output is not None:
+    with open(args.output, "w") as f:
+      json.dump({"checkpoint": checkpoint, "summary": summary, "episodes": episodes}, f, indent=2)
+    print("results saved to", args.output)
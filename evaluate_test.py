@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from evaluate import parse_percentiles, summarize
+
+class TestEvaluate(unittest.TestCase):
+  def test_summarize(self):
+    episodes = [{"episode": i, "score": float(score), "steps": 100 * (i + 1), "rooms": rooms}
+                for i, (score, rooms) in enumerate([(0, [1]), (100, [1, 0]),
+                                                    (400, [1, 0, 4]), (100, [1, 0])])]
+    summary = summarize(episodes, percentiles=(25, 75))
+    self.assertEqual(4, summary["episodes"])
+    self.assertAlmostEqual(150.0, summary["mean"])
+    self.assertAlmostEqual(100.0, summary["median"])
+    self.assertEqual(0.0, summary["min"])
+    self.assertEqual(400.0, summary["max"])
+    self.assertAlmostEqual(75.0, summary["percentiles"]["25"])
+    self.assertAlmostEqual(175.0, summary["percentiles"]["75"])
+    self.assertAlmostEqual(250.0, summary["steps_mean"])
+    self.assertEqual([0, 1, 4], summary["rooms"])
+    self.assertEqual(1.0, summary["room_coverage"]["1"])
+    self.assertEqual(0.75, summary["room_coverage"]["0"])
+    self.assertEqual(0.25, summary["room_coverage"]["4"])
+
+  def test_percentile_keys(self):
+    percentiles = parse_percentiles("10, 12.5,90.0")
+    self.assertEqual([10, 12.5, 90], percentiles)
+    self.assertIsInstance(percentiles[2], int)
+    episodes = [{"episode": i, "score": float(i), "steps": 1, "rooms": [1]} for i in range(11)]
+    summary = summarize(episodes, percentiles)
+    self.assertEqual(["10", "12.5", "90"], list(summary["percentiles"].keys()))
+    self.assertAlmostEqual(9.0, summary["percentiles"]["90"])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Structured training event stream (JSON lines).
+# First line is header with schemas. Each following line is one event:
+#   ["episode", 123.0, 4500, 3, 100, "END", 1, 812]
+# Values are in order of fields in SCHEMAS, so the stream stays compact and
+# tools don't depend on format of printed log lines.
+
+SCHEMAS = OrderedDict([
+  ("episode",     ("t", "s", "th", "r", "end", "room", "steps")),
+  ("score",       ("t", "s", "th", "r", "room", "lives", "v", "pr")),
+  ("new_score",   ("t", "s", "th", "r", "room")),
+  ("ohl",         ("s", "th", "score", "lives", "steps", "tes", "room")),
+  ("new_room",    ("th", "room")),
+  ("lives_lost",  ("t", "s", "th", "lives_from", "lives_to", "room")),
+  ("psc",         ("th", "psc_n", "room", "psc_reward")),
+  ("performance", ("t", "s", "steps_per_sec")),
+  ("checkpoint",  ("s", "wall_t")),
+  ("graph",       ("threads", "ops", "variables", "variable_mb", "graph_mb", "build_sec",
+                   "build_sec_by_threads")),
+  ("frames",      ("frames_skip_in_ale", "frames_skip_in_gs")),
+  ("policy_cache", ("s", "th", "hits", "lookups", "entries")),
+  ("memory",      ("s", "th", "name", "mb")),
+  ("average",     ("s", "th", "average")),
+  ("stop",        ("s", "wall_t", "reason")),
+  ("pbt",         ("s", "th", "parent", "score", "parent_score", "tes", "psc_beta", "psc_pow")),
+])
+
+_file = None
+_lock = threading.Lock()
+
+def _to_json(value):
+  # numpy scalars (np.float32 etc.)
+  return value.item()
+
+def open_log(path):
+  global _file
+  new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+  _file = open(path, "a")
+  if new_file:
+    _file.write(json.dumps({"schemas": SCHEMAS}) + "\n")
+
+def is_open():
+  return _file is not None
+
+def emit(event, *values):
+  if _file is None:
+    return
+  line = json.dumps([event] + list(values), default=_to_json)
+  with _lock:
+    _file.write(line + "\n")
+
+def flush():
+  if _file is not None:
+    with _lock:
+      _file.flush()
+
+def close():
+  global _file
+  if _file is not None:
+    with _lock:
+      _file.close()
+      _file = None
+
+
+class EventReader(object):
+  # reads events appended to stream since previous read (tail-following)
+  # Without path, data read elsewhere (e.g. over SSH) are given to parse().
+  def __init__(self, path=None):
+    self.f = open(path, "r") if path is not None else None
+    self.schemas = dict(SCHEMAS)
+    self.rest = ""
+
+  def read_events(self):
+    return self.parse(self.f.read())
+
+  def parse(self, data):
+    # events in DATA appended to stream
+    events = []
+    data = self.rest + data
+    lines = data.split("\n")
+    # last element is incomplete line (or "")
+    self.rest = lines.pop()
+    for line in lines:
+      if line == "":
+        continue
+      record = json.loads(line)
+      if isinstance(record, dict):
+        self.schemas.update(record["schemas"])
+        continue
+      event = record[0]
+      events.append((event, dict(zip(self.schemas[event], record[1:]))))
+    return events
+
+  def read_rows(self, event_types, fields, match=None):
+    # rows of FIELDS in events of EVENT_TYPES which have values in MATCH
+    rows = []
+    for event, values in self.read_events():
+      if event not in event_types:
+        continue
+      if match is not None and \
+         any(values.get(k) != v for k, v in match.items()):
+        continue
+      rows.append([float(values[field]) for field in fields])
+    return rows
+
+  def read_info(self, info, endmark="END"):
+    # same rows as regular expressions of -i INFO in plot.py / plot2.py
+    event_types, fields = INFO_EVENTS[info]
+    match = {"end": endmark} if info == "r" else None
+    return self.read_rows(event_types, fields, match)
+
+
+# -i INFO of plot tools -> (event types, fields)
+INFO_EVENTS = {
+  "r":     (["episode"], ("t", "s", "r")),
+  "lives": (["ohl"], ("score", "s", "lives")),
+  "s":     (["ohl"], ("score", "s", "steps")),
+  "tes":   (["ohl"], ("score", "s", "tes")),
+  "RO":    (["ohl"], ("score", "s", "room")),
+  "v":     (["score"], ("t", "s", "v")),
+  "pr":    (["score"], ("t", "s", "pr")),
+  "k":     (["lives_lost"], ("t", "s", "room")),
+  "R":     (["score", "new_score"], ("t", "s", "room")),
+}
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import event_log
+from event_log import EventReader
+
+class TestEventLog(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.dir, "events.jsonl")
+
+  def tearDown(self):
+    event_log.close()
+    shutil.rmtree(self.dir)
+
+  def test_emit_and_read(self):
+    event_log.open_log(self.path)
+    event_log.emit("episode", 10.0, 1000, 0, 100, "END", np.uint8(1), 500)
+    event_log.emit("episode", 11.0, 1200, 1, 0, "OVER", 0, 300)
+    event_log.emit("score", 12.0, 1300, 2, 400, 3, 5, np.float32(0.5), 0.01)
+    event_log.flush()
+
+    reader = EventReader(self.path)
+    self.assertEqual([[10.0, 1000.0, 100.0]], reader.read_info("r"))
+    # tail-following: only new events are read
+    event_log.emit("episode", 13.0, 1400, 3, 200, "END", 1, 700)
+    event_log.flush()
+    self.assertEqual([[13.0, 1400.0, 200.0]], reader.read_info("r"))
+    self.assertEqual([], reader.read_info("r"))
+
+  def test_partial_line(self):
+    with open(self.path, "w") as f:
+      f.write('["new_room", 0, 1]\n["new_room", 1, ')
+    reader = EventReader(self.path)
+    self.assertEqual([[1.0]], reader.read_rows(["new_room"], ("room",)))
+    with open(self.path, "a") as f:
+      f.write('2]\n')
+    self.assertEqual([[2.0]], reader.read_rows(["new_room"], ("room",)))
+
+  def test_parse(self):
+    # data read elsewhere (e.g. over SSH)
+    reader = EventReader()
+    self.assertEqual([("stop", {"s": 100, "wall_t": 5.0, "reason": "end"})],
+                     reader.parse('["stop", 100, 5.0, "end"]\n["average", 1'))
+    self.assertEqual([("average", {"s": 10, "th": 2, "average": 1.5})],
+                     reader.parse('0, 2, 1.5]\n'))
+
+if __name__ == '__main__':
+  unittest.main()
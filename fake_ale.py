@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import argparse
+import functools
+import numpy as np
+
+# Deterministic stand-in for ALEInterface (--fake-ale).
+# It replays screens, rewards, lives, terminals and RAM of a recording (.npz)
+# and ignores actions, so GameState and A3CTrainingThread can be run and
+# benchmarked without ALE and ROMs.
+# RECORDING is a file written by record() (python fake_ale.py --rom ...) or
+# "synthetic" for generated frames (no ALE needed at all).
+
+SYNTHETIC = "synthetic"
+SYNTHETIC_FRAMES = 256
+SYNTHETIC_EPISODE_LENGTH = 200
+SYNTHETIC_ACTION_SIZE = 18
+
+def synthetic_recording(num_frames=SYNTHETIC_FRAMES, episode_length=SYNTHETIC_EPISODE_LENGTH,
+                        action_size=SYNTHETIC_ACTION_SIZE, seed=0):
+  rng = np.random.RandomState(seed)
+  # blocks of 10x10 pixels moving on static background, like Atari screens
+  background = rng.randint(0, 256, (21, 16, 3)).astype(np.uint8)
+  background = background.repeat(10, axis=0).repeat(10, axis=1)
+  screens = np.empty((num_frames, 210, 160, 3), dtype=np.uint8)
+  for i in range(num_frames):
+    screens[i] = background
+    for k in range(4):
+      y = (i * (k + 1) + 37 * k) % 200
+      x = (i * (k + 2) + 53 * k) % 150
+      screens[i, y:y + 10, x:x + 10] = 255 - 60 * k
+  frame = np.arange(num_frames)
+  step = frame % episode_length
+  rewards = np.where(rng.rand(num_frames) < 0.02, 100, 0).astype(np.int32)
+  terminals = step == episode_length - 1
+  lives = (5 - step * 5 // episode_length).astype(np.int32)
+  rams = np.zeros((num_frames, 128), dtype=np.uint8)
+  rams[:, 3] = (frame // 50) % 24 # room number of Montezuma's Revenge
+  return {"screens": screens, "rewards": rewards, "terminals": terminals,
+          "lives": lives, "rams": rams,
+          "actions": np.arange(action_size, dtype=np.int32)}
+
+def load_recording(recording):
+  if recording == SYNTHETIC:
+    return synthetic_recording()
+  with np.load(recording) as data:
+    return dict((name, data[name]) for name in data.files)
+
+def record(ale, num_frames, seed=0):
+  # play NUM_FRAMES with random actions and record ALE outputs
+  rng = np.random.RandomState(seed)
+  actions = np.array(ale.getMinimalActionSet(), dtype=np.int32)
+  screen = np.empty((210 * 160 * 3), dtype=np.uint8)
+  recording = {"screens": [], "rewards": [], "terminals": [], "lives": [], "rams": []}
+  ale.reset_game()
+  for _ in range(num_frames):
+    reward = ale.act(actions[rng.randint(len(actions))])
+    ale.getScreenRGB(screen)
+    recording["screens"].append(screen.reshape((210, 160, 3)).copy())
+    recording["rewards"].append(reward)
+    recording["terminals"].append(ale.game_over())
+    recording["lives"].append(ale.lives())
+    recording["rams"].append(np.array(ale.getRAM(), dtype=np.uint8))
+    if ale.game_over():
+      ale.reset_game()
+  recording = dict((name, np.array(values)) for name, values in recording.items())
+  recording["actions"] = actions
+  return recording
+
+
+class FakeALEInterface(object):
+  # recordings are shared by all instances (threads) and never modified
+  _recordings = {}
+
+  def __init__(self, recording=SYNTHETIC):
+    if recording not in FakeALEInterface._recordings:
+      data = load_recording(recording)
+      # grayscale by luminance like ALE
+      gray = np.dot(data["screens"].astype(np.float32), [0.299, 0.587, 0.114])
+      data["screens_gray"] = gray.astype(np.uint8)
+      FakeALEInterface._recordings[recording] = data
+    data = FakeALEInterface._recordings[recording]
+    self._screens = data["screens"]
+    self._screens_gray = data["screens_gray"]
+    self._rewards = data["rewards"]
+    self._terminals = data["terminals"]
+    self._lives = data["lives"]
+    self._rams = data["rams"]
+    self._actions = data["actions"]
+    self._num_frames = len(self._rewards)
+    self._frame_skip = 1
+    self._frame = 0
+    self._game_over = False
+
+  # settings (only frame_skip changes behaviour)
+  def setInt(self, key, value):
+    if key == b'frame_skip':
+      self._frame_skip = max(int(value), 1)
+
+  def setFloat(self, key, value):
+    pass
+
+  def setBool(self, key, value):
+    pass
+
+  def setString(self, key, value):
+    pass
+
+  def loadROM(self, rom):
+    self._frame = 0
+    self._game_over = False
+
+  def getMinimalActionSet(self):
+    return self._actions.copy()
+
+  def act(self, action):
+    reward = 0
+    for _ in range(self._frame_skip):
+      self._frame = (self._frame + 1) % self._num_frames
+      reward += int(self._rewards[self._frame])
+      if self._terminals[self._frame]:
+        self._game_over = True
+        break
+    return reward
+
+  def game_over(self):
+    return self._game_over
+
+  def reset_game(self):
+    # continue from frame after terminal, so episodes follow the recording
+    self._game_over = False
+    if self._terminals[self._frame]:
+      self._frame = (self._frame + 1) % self._num_frames
+
+  def lives(self):
+    return int(self._lives[self._frame])
+
+  def getScreenRGB(self, screen_data):
+    screen_data[:] = self._screens[self._frame].reshape(-1)
+
+  def getScreenGrayscale(self, screen_data):
+    screen_data[:] = self._screens_gray[self._frame].reshape(-1)
+
+  def getRAM(self):
+    return self._rams[self._frame]
+
+  # state snapshot (position in recording)
+  def cloneSystemState(self):
+    return (self._frame, self._game_over)
+
+  def restoreSystemState(self, state):
+    self._frame, self._game_over = state
+
+  def encodeState(self, state):
+    return np.array([state[0], int(state[1])], dtype=np.int64).view(np.uint8)
+
+  def decodeState(self, serialized):
+    frame, game_over = np.asarray(serialized, dtype=np.uint8).view(np.int64)
+    return (int(frame), bool(game_over))
+
+  def deleteState(self, state):
+    pass
+
+
+def fake_ale_interface(recording):
+  # ALEInterface compatible constructor (no arguments) replaying RECORDING
+  return functools.partial(FakeALEInterface, recording)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="record ALE play for --fake-ale")
+  parser.add_argument('--rom', default="breakout.bin")
+  parser.add_argument('--frames', type=int, default=2000)
+  parser.add_argument('--frame-skip', type=int, default=1)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--output', default="fake_ale.npz")
+  args = parser.parse_args()
+
+  from ale_python_interface import ALEInterface
+  ale = ALEInterface()
+  ale.setInt(b'random_seed', args.seed)
+  ale.setInt(b'frame_skip', args.frame_skip)
+  ale.loadROM(args.rom.encode('ascii'))
+  np.savez_compressed(args.output, **record(ale, args.frames, args.seed))
+  print("{} frames recorded to {}".format(args.frames, args.output))
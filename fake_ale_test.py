@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import unittest
+import numpy as np
+
+from fake_ale import FakeALEInterface, synthetic_recording, SYNTHETIC_EPISODE_LENGTH
+
+class TestFakeALE(unittest.TestCase):
+  def test_replay(self):
+    ale1 = FakeALEInterface()
+    ale2 = FakeALEInterface()
+    ale2.setInt(b'frame_skip', 4)
+    screen1 = np.empty((210 * 160 * 3), dtype=np.uint8)
+    screen2 = np.empty((210 * 160 * 3), dtype=np.uint8)
+    for _ in range(10):
+      reward = sum(ale1.act(0) for _ in range(4))
+      self.assertEqual(reward, ale2.act(0))
+      ale1.getScreenRGB(screen1)
+      ale2.getScreenRGB(screen2)
+      self.assertTrue((screen1 == screen2).all())
+
+  def test_episode(self):
+    ale = FakeALEInterface()
+    recording = synthetic_recording()
+    self.assertEqual(len(recording["actions"]), len(ale.getMinimalActionSet()))
+    steps = 0
+    while not ale.game_over():
+      ale.act(0)
+      steps += 1
+    self.assertEqual(SYNTHETIC_EPISODE_LENGTH - 1, steps)
+    ale.reset_game()
+    self.assertFalse(ale.game_over())
+    self.assertEqual(5, ale.lives())
+    gray = np.empty((210 * 160), dtype=np.uint8)
+    ale.getScreenGrayscale(gray)
+    self.assertTrue((gray > 0).any())
+    # room number of first frame of second episode
+    self.assertEqual(SYNTHETIC_EPISODE_LENGTH // 50, ale.getRAM()[3])
+
+if __name__ == '__main__':
+  unittest.main()
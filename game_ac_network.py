@@ -191,6 +191,7 @@ class GameACLSTMNetwork(GameACNetwork):
       h_conv2_flat = tf.reshape(h_conv2, [-1, 2592])
       h_fc1 = tf.nn.relu(tf.matmul(h_conv2_flat, self.W_fc1) + self.b_fc1)
       # h_fc1 shape=(5,256)
+      self.h_fc1 = h_fc1 # for one-step graph of SharedGraphTemplate
 
       h_fc1_reshaped = tf.reshape(h_fc1, [1,-1,256])
       # h_fc_reshaped = (1,5,256)
@@ -205,7 +206,7 @@ class GameACLSTMNetwork(GameACNetwork):
       # Unrolling LSTM up to LOCAL_T_MAX time steps. (= 5time steps.)
       # When episode terminates unrolling time steps becomes less than LOCAL_TIME_STEP.
       # Unrolling step size is applied via self.step_size placeholder.
-      # When forward propagating, step_size is 1.
+      # This unrolled graph is used only for training (see one-step graph below).
       # (time_major = False, so output shape is [batch_size, max_time, cell.output_size])
       lstm_outputs, self.lstm_state = tf.nn.dynamic_rnn(self.lstm,
                                                         h_fc1_reshaped,
@@ -214,7 +215,7 @@ class GameACLSTMNetwork(GameACNetwork):
                                                         time_major = False,
                                                         scope = scope)
 
-      # lstm_outputs: (1,5,256) for back prop, (1,1,256) for forward prop.
+      # lstm_outputs: (1,5,256) for back prop.
       
       lstm_outputs = tf.reshape(lstm_outputs, [-1,256])
 
@@ -225,27 +226,51 @@ class GameACLSTMNetwork(GameACNetwork):
       v_ = tf.matmul(lstm_outputs, self.W_fc3) + self.b_fc3
       self.v = tf.reshape( v_, [-1] )
 
-      self.reset_state()
-      
-  def reset_state(self):
-    self.lstm_state_out = np.zeros([1, self.lstm.state_size])
+      # One-step graph for forward propagation.
+      # It shares weights of LSTM cell with dynamic_rnn above, and LSTM state
+      # stays in a variable between steps (no while-loop and no feed of LSTM state).
+      # The variable is in LOCAL_VARIABLES, so it is not saved in checkpoints.
+      self.lstm_state_var = tf.Variable(tf.zeros([1, self.lstm.state_size]),
+                                        trainable=False,
+                                        collections=[tf.GraphKeys.LOCAL_VARIABLES],
+                                        name="lstm_state")
+      self.scope = scope
+      with tf.variable_scope(scope, reuse=True):
+        step_output, step_state = self.lstm(h_fc1, tf.identity(self.lstm_state_var))
+
+      self.step_pi = tf.nn.softmax(tf.matmul(step_output, self.W_fc2) + self.b_fc2)
+      step_v_ = tf.matmul(step_output, self.W_fc3) + self.b_fc3
+      self.step_v = tf.reshape( step_v_, [-1] )
+
+      self.step_state_update = tf.assign(self.lstm_state_var, step_state)
+      self.step_state_reset = tf.assign(self.lstm_state_var,
+                                        tf.zeros([1, self.lstm.state_size]))
+      # for restoring LSTM state of actor snapshot
+      self.step_state_input = tf.placeholder(tf.float32, [1, self.lstm.state_size])
+      self.step_state_set = tf.assign(self.lstm_state_var, self.step_state_input)
+
+  def reset_state(self, sess):
+    sess.run( self.step_state_reset )
+
+  def get_lstm_state(self, sess):
+    # LSTM state before next step (initial_lstm_state for training)
+    return sess.run( self.lstm_state_var )
+
+  def set_lstm_state(self, sess, lstm_state):
+    sess.run( self.step_state_set, feed_dict = {self.step_state_input : lstm_state} )
 
   def run_policy_and_value(self, sess, s_t):
     # This run_policy_and_value() is used when forward propagating.
-    # so the step size is 1.
-    pi_out, v_out, self.lstm_state_out = sess.run( [self.pi, self.v, self.lstm_state],
-                                                   feed_dict = {self.s : [s_t],
-                                                                self.initial_lstm_state : self.lstm_state_out,
-                                                                self.step_size : [1]} )
+    # LSTM state is updated in the graph.
+    pi_out, v_out, _ = sess.run( [self.step_pi, self.step_v, self.step_state_update],
+                                 feed_dict = {self.s : [s_t]} )
     # pi_out: (1,3), v_out: (1)
     return (pi_out[0], v_out[0])
 
   def run_policy(self, sess, s_t):
     # This run_policy() is used for displaying the result with display tool.    
-    pi_out, self.lstm_state_out = sess.run( [self.pi, self.lstm_state],
-                                            feed_dict = {self.s : [s_t],
-                                                         self.initial_lstm_state : self.lstm_state_out,
-                                                         self.step_size : [1]} )
+    pi_out, _ = sess.run( [self.step_pi, self.step_state_update],
+                          feed_dict = {self.s : [s_t]} )
                                             
     return pi_out[0]
 
@@ -253,15 +278,8 @@ class GameACLSTMNetwork(GameACNetwork):
     # This run_value() is used for calculating V for bootstrapping at the 
     # end of LOCAL_T_MAX time step sequence.
     # When next sequcen starts, V will be calculated again with the same state using updated network weights,
-    # so we don't update LSTM state here.
-    prev_lstm_state_out = self.lstm_state_out
-    v_out, _ = sess.run( [self.v, self.lstm_state],
-                         feed_dict = {self.s : [s_t],
-                                      self.initial_lstm_state : self.lstm_state_out,
-                                      self.step_size : [1]} )
-    
-    # roll back lstm state
-    self.lstm_state_out = prev_lstm_state_out
+    # so we don't update LSTM state here (step_state_update is not run).
+    v_out = sess.run( self.step_v, feed_dict = {self.s : [s_t]} )
     return v_out[0]
 
   def get_vars(self):
@@ -1,26 +1,39 @@
 # -*- coding: utf-8 -*-
 import sys
 import numpy as np
-import cv2
 import os
 import math
 
-import options
-options = options.options
-if options.use_gym:
-  import gym
-  from gym.envs.atari.atari_env import AtariEnv
-  from atari_py import ALEInterface
-else:
+from phase_timer import NullPhaseTimer
+import event_log
+import actor_snapshot
+import log_sink
+
+# cv2 is imported by first GameState (modules which only need options or
+# GameState class don't need it)
+cv2 = None
+
+def _import_cv2():
+  global cv2
+  import cv2
+
+def ale_interface(options):
+  # emulator class of options (imported on first use)
+  if options.fake_ale is not None:
+    from fake_ale import fake_ale_interface
+    return fake_ale_interface(options.fake_ale)
   from ale_python_interface import ALEInterface
+  return ALEInterface
 
 
 class GameState(object):
   def __init__(self, rand_seed, options, display=False, no_op_max=30, thread_index=-1):
+    if cv2 is None:
+      _import_cv2()
     if options.use_gym:
       self._display = options.display
     else:
-      self.ale = ALEInterface()
+      self.ale = ale_interface(options)()
       self.ale.setInt(b'random_seed', rand_seed)
       self.ale.setFloat(b'repeat_action_probability', options.repeat_action_probability)
       self.ale.setInt(b'frame_skip', options.frames_skip_in_ale)
@@ -40,8 +53,12 @@ class GameState(object):
     self.prev_room_no = 1
     self.room_no = 1
     self.new_room = -1
+    # replaced by timer of A3CTrainingThread when --phase-timing=True
+    self.timer = NullPhaseTimer()
 
     if options.use_gym:
+      import gym
+      from gym.envs.atari.atari_env import AtariEnv
       # see https://github.com/openai/gym/issues/349
       def _seed(self, seed=None):
         self.ale.setFloat(b'repeat_action_probability', options.repeat_action_probability)
@@ -95,9 +112,7 @@ class GameState(object):
       self.psc_frsize = options.psc_frsize
       self.psc_k = options.psc_frsize ** 2
       self.psc_range_k = np.array([i for i in range(self.psc_k)])
-      self.psc_rev_pow = 1.0 / psc_pow
-      self.psc_alpha = math.pow(0.1, psc_pow)
-      self.psc_beta = psc_beta
+      self.psc_set_hyperparameters(psc_beta, psc_pow)
       self.psc_maxval = options.psc_maxval
       if options.psc_multi:
         self.psc_vcount = np.zeros((24, self.psc_maxval + 1, self.psc_k), dtype=np.float64)
@@ -109,17 +124,31 @@ class GameState(object):
     self.reset()
 
   # for pseudo-count
+  def psc_set_hyperparameters(self, psc_beta, psc_pow):
+    self.psc_pow = psc_pow
+    self.psc_rev_pow = 1.0 / psc_pow
+    self.psc_alpha = math.pow(0.1, psc_pow)
+    self.psc_beta = psc_beta
+
+  def psc_copy_from(self, game_state):
+    # pseudo-count tables of other thread (for pbt.py)
+    self.psc_vcount = np.array(game_state.psc_vcount, dtype=np.float64)
+    if self.options.psc_multi:
+      self.psc_n = np.array(game_state.psc_n, dtype=np.float64)
+    else:
+      self.psc_n = game_state.psc_n
+
   def psc_set_psc_info(self, psc_info):
     if psc_info is not None:
       self.psc_vcount = np.array(psc_info["psc_vcount"], dtype=np.float64)
-      if options.psc_multi:
+      if self.options.psc_multi:
         self.psc_n = np.array(psc_info["psc_n"], dtype=np.float64)
       else:
         self.psc_n = psc_info["psc_n"]
  
   def psc_set_gs_info(self, gs_info):
     self.psc_vcount = np.array(gs_info["psc_vcount"], dtype=np.float64)
-    if options.psc_multi:
+    if self.options.psc_multi:
       self.psc_n = np.array(gs_info["psc_n"], dtype=np.float64)
     else:
       self.psc_n = gs_info["psc_n"]
@@ -133,14 +162,14 @@ class GameState(object):
       print("Internal ERROR in dtype")
       sys.exit(1)
     range_k = self.psc_range_k
-    if options.psc_multi:
+    if self.options.psc_multi:
       room_no = self.room_no
       n = self.psc_n[room_no]
     else:
       n = self.psc_n
     if n > 0:
       nr = (n + 1.0)/n
-      if options.psc_multi:
+      if self.options.psc_multi:
         vcount = self.psc_vcount[room_no, psc_image, range_k]
         self.psc_vcount[room_no, psc_image, range_k] += 1.0
       else:
@@ -154,20 +183,22 @@ class GameState(object):
       psc_count = r_over_rp / dominator
       psc_reward = self.psc_beta / math.pow(psc_count + self.psc_alpha, self.psc_rev_pow)
     else:
-      if options.psc_multi:
+      if self.options.psc_multi:
         self.psc_vcount[room_no, psc_image, range_k] += 1.0
       else:
         self.psc_vcount[psc_image, range_k] += 1.0
       psc_count = 0.0
       psc_reward = self.psc_beta / math.pow(psc_count + self.psc_alpha, self.psc_rev_pow)
     
-    if options.psc_multi:
+    if self.options.psc_multi:
       self.psc_n[room_no] += 1.0
     else:
       self.psc_n += 1
 
     if n % (self.options.score_log_interval * 10) == 0:
-      print("[PSC]th={},psc_n={}:room={},psc_reward={:.8f},RM{:02d}".format(self.thread_index, n, self.room_no, psc_reward, self.room_no))
+      log_sink.log("psc", "[PSC]th={},psc_n={}:room={},psc_reward={:.8f},RM{:02d}",
+                   self.thread_index, n, self.room_no, psc_reward, self.room_no)
+      event_log.emit("psc", self.thread_index, n, self.room_no, psc_reward)
 
     return psc_reward   
 
@@ -179,13 +210,46 @@ class GameState(object):
     room_no = ram[3]
     self.rooms[room_no] += 1
     if self.rooms[room_no] == 1:
-      print("[PSC]th={} @@@ NEW ROOM({}) VISITED: visit counts={}".format(self.thread_index, room_no, self.rooms))
+      log_sink.log("new_room", "[PSC]th={} @@@ NEW ROOM({}) VISITED: visit counts={}",
+                   self.thread_index, room_no, self.rooms.copy())
+      event_log.emit("new_room", self.thread_index, room_no)
       self.new_room = room_no
     self.prev_room_no = self.room_no
     self.room_no = room_no
 
+  # for --actor-snapshots (see actor_snapshot.py)
+  def get_snapshot(self):
+    ale_state = self.ale.cloneSystemState()
+    encoded = np.array(self.ale.encodeState(ale_state), dtype=np.uint8)
+    if hasattr(self.ale, "deleteState"):
+      self.ale.deleteState(ale_state)
+    return {"ale_state": encoded,
+            "s_t": actor_snapshot.to_uint8(self.s_t),
+            "lives": self.lives,
+            "initial_lives": self.initial_lives,
+            "room_no": self.room_no,
+            "prev_room_no": self.prev_room_no,
+            "new_room": self.new_room}
+
+  def restore_snapshot(self, snapshot):
+    # continue episode in snapshot (with gym, state of gym env other than ALE
+    # is not restored)
+    ale_state = self.ale.decodeState(snapshot["ale_state"])
+    self.ale.restoreSystemState(ale_state)
+    if hasattr(self.ale, "deleteState"):
+      self.ale.deleteState(ale_state)
+    self.s_t = actor_snapshot.to_float(snapshot["s_t"])
+    self.lives = float(snapshot["lives"])
+    self.initial_lives = float(snapshot["initial_lives"])
+    self.room_no = int(snapshot["room_no"])
+    self.prev_room_no = int(snapshot["prev_room_no"])
+    self.new_room = int(snapshot["new_room"])
+    self.terminal = False
+    self.reward = 0
+    self._have_prev_screen_RGB = False
+
   def set_record_screen_dir(self, record_screen_dir):
-    if options.use_gym:
+    if self.options.use_gym:
       print("record_screen_dir", record_screen_dir)
       self.gym.monitor.start(record_screen_dir)
       self.reset()
@@ -196,14 +260,14 @@ class GameState(object):
       self.reset()
 
   def close_record_screen_dir(self):
-    if options.use_gym:
+    if self.options.use_gym:
       self.gym.monitor.close()
     else:
       pass
 
   #@profile
   def _process_action(self, action):
-    if options.use_gym:
+    if self.options.use_gym:
       observation, reward, terminal, _ = self.gym.step(action)
       return reward, terminal
     else:
@@ -211,6 +275,7 @@ class GameState(object):
       terminal = self.ale.game_over()
       self.terminal = terminal
       self._have_prev_screen_RGB = False
+      self.timer.lap("ale")
       return reward, terminal
     
   #@profile
@@ -218,7 +283,7 @@ class GameState(object):
     if self.terminal:
       reward = 0
       terminal = True
-    elif options.use_gym:
+    elif self.options.use_gym:
       observation, reward, terminal, _ = self.gym.step(action)
       self._screen_RGB = observation
       self.terminal = terminal
@@ -233,6 +298,7 @@ class GameState(object):
       reward = self.ale.act(action)
       terminal = self.ale.game_over()
       self.terminal = terminal
+    self.timer.lap("ale")
 
     # screen shape is (210, 160, 1)
     if self.color_maximizing or self.color_averaging: # impossible in gym
@@ -252,7 +318,7 @@ class GameState(object):
       self._screen_RGB = swap_screen_RGB
       self._have_prev_screen_RGB = True
     elif self.color_no_change:
-      if not options.use_gym:
+      if not self.options.use_gym:
         self.ale.getScreenRGB(self._screen_RGB)
       screen = self._screen_RGB
       screen = screen.reshape((210, 160, 3))
@@ -278,6 +344,7 @@ class GameState(object):
       x_t = np.reshape(x_t, (84, 84, 1))
     x_t = x_t.astype(np.float32)
     x_t *= (1.0/255.0)
+    self.timer.lap("preprocess")
     return reward, terminal, x_t, x_t_uint8
 
   #@profile
@@ -308,8 +375,17 @@ class GameState(object):
       self.ale.setBool(b'sound', True)
     self.ale.setBool(b'display_screen', True)
 
+  def reseed(self, rand_seed):
+    # restart emulator with new random seed (seed is used when ROM is loaded)
+    if self.options.use_gym:
+      self.gym.seed(rand_seed)
+    else:
+      self.ale.setInt(b'random_seed', rand_seed)
+      self.ale.loadROM(self.options.rom.encode('ascii'))
+    self.reset()
+
   def reset(self):
-    if options.use_gym:
+    if self.options.use_gym:
       self.gym.reset()
     else:
       self.ale.reset_game()
@@ -317,10 +393,10 @@ class GameState(object):
     # randomize initial state
     if self._no_op_max > 0:
       no_op = np.random.randint(0, self._no_op_max // self.options.frames_skip_in_ale + 1)
-      if options.use_gym:
+      if self.options.use_gym:
         no_op = no_op // 3 # gym skip 2 - 4 frame randomly
       for _ in range(no_op):
-        if options.use_gym:
+        if self.options.use_gym:
           self.gym.step(0)
         else:
           self.ale.act(0)
@@ -348,7 +424,7 @@ class GameState(object):
     
   #@profile
   def process(self, action):
-    if options.use_gym:
+    if self.options.use_gym:
       real_action = action
       if self._display:
         self.gym.render()
@@ -391,6 +467,7 @@ class GameState(object):
 
     self.psc_reward = self.pseudo_count(x_t_uint8)
     self.lives = float(self.ale.lives())
+    self.timer.lap("pseudo_count")
 
     if self.episode_record_dir is not None:
       filename = "{:06d}.png".format(self.stepNo)
@@ -398,6 +475,7 @@ class GameState(object):
       self.stepNo += 1
       screen_image = x_t1.reshape((84, 84)) * 255.
       cv2.imwrite(filename, screen_image)
+      self.timer.lap("record")
 
 
   def update(self):
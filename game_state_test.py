@@ -2,7 +2,7 @@ import unittest
 import numpy as np
 
 import options
-options = options.options
+options = options.parse_options([])
 
 from game_state import GameState
 
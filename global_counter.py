@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+# Exact counter incremented by many threads without lock.
+# Each thread adds only to its own slot, so no increment is lost (unlike
+# "global_t += diff" of racing threads), and value() is the sum of slots.
+
+class GlobalCounter(object):
+  def __init__(self, num_slots, initial=0):
+    self.initial = initial
+    self.slots = [0] * num_slots
+
+  def add(self, slot, n=1):
+    # called only by owner thread of slot
+    self.slots[slot] += n
+
+  def value(self):
+    return self.initial + sum(self.slots)
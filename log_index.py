@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import re
+import sys
+import numpy as np
+
+# Persistent columnar index of training log.
+# The log is parsed once; each table is stored as one float64 file per column
+# in LOGFILE.index/ (TABLE.COLUMN.f8) and meta.json keeps the byte offset of
+# parsed part of log and number of rows of each table, so update() only parses
+# lines appended since the previous update.
+# Tools (plot.py, plot2.py, average.py, rooms.py) read the index with --index.
+
+# table -> (columns, regular expression)
+TABLES = [
+  ("episode",   ("t", "s", "th", "r", "end"),
+   re.compile(r't=\s*(\d+),s=\s*(\d+),th=(\d+):.*r=\s*(-?\d+)@(\w+)\|')),
+  ("new_score", ("t", "s", "th", "r", "room"),
+   re.compile(r't=\s*(\d+),s=\s*(\d+),th=(\d+):.*r=\s*(-?\d+)RM(\d+)\| NEW-SCORE')),
+  ("score",     ("t", "s", "th", "r", "room", "lives", "v", "pr"),
+   re.compile(r't=\s*(\d+),s=\s*(\d+),th=(\d+):.*r=\s*(-?\d+)RM(\d+)\| l=(\d+),v=(-?\d+\.\d+),pr=(\d+\.\d+)')),
+  ("kill",      ("t", "s", "th", "lives_from", "lives_to", "room"),
+   re.compile(r't=\s*(\d+),s=\s*(\d+),th=(\d+):.*l=(\d+)>(\d+)RM(\d+)\|')),
+  ("ohl",       ("score", "s", "th", "lives", "steps", "tes", "room"),
+   re.compile(r'\[OHL\]SCORE=\s*(-?\d+),s=\s*(\d+),th=(\d+),lives=(\d+),steps=(\d+),tes=(\d+),RM(\d+)')),
+  ("psc",       ("th", "psc_n", "room", "psc_reward"),
+   re.compile(r'\[PSC\]th=(\d+),psc_n=(\d+):room=(\d+),psc_reward=(\d+\.\d+)')),
+  ("room",      ("th", "room"),
+   re.compile(r'\[PSC\]th=(\d+) @@@ NEW ROOM\((\d+)\)')),
+  ("average",   ("average", "s", "th"),
+   re.compile(r'@@@ Average Episode score = (-?\d+\.\d+), s=\s*(\d+),th=(\d+)')),
+  ("saved",     ("s",),
+   re.compile(r'@@@ Data saved at global_t=(\d+)')),
+]
+TABLE_COLUMNS = dict((name, columns) for name, columns, _ in TABLES)
+
+# -i INFO of plot tools -> (table, columns)
+INFO_TABLES = {
+  "r":     ("episode", ("t", "s", "r")),
+  "lives": ("ohl", ("score", "s", "lives")),
+  "s":     ("ohl", ("score", "s", "steps")),
+  "tes":   ("ohl", ("score", "s", "tes")),
+  "RO":    ("ohl", ("score", "s", "room")),
+  "v":     ("score", ("t", "s", "v")),
+  "pr":    ("score", ("t", "s", "pr")),
+  "k":     ("kill", ("t", "s", "room")),
+  "R":     ("score", ("t", "s", "room")), # new_score rows are added by read_info()
+}
+
+def _prefix(line):
+  # tables which can match LINE (cheap test before regular expressions)
+  if line.startswith("t="):
+    return ("episode", "new_score", "score", "kill")
+  elif line.startswith("[OHL]"):
+    return ("ohl",)
+  elif line.startswith("[PSC]"):
+    return ("psc", "room")
+  elif line.startswith("@@@ Average"):
+    return ("average",)
+  elif line.startswith("@@@ Data saved"):
+    return ("saved",)
+  return ()
+
+class LogIndex(object):
+  def __init__(self, log_path, index_dir=None):
+    self.log_path = log_path
+    self.index_dir = index_dir or log_path + ".index"
+    self.regexps = dict((name, regexp) for name, _, regexp in TABLES)
+    self.read_rows = {} # table -> rows returned by read_table() to this reader
+    meta_path = os.path.join(self.index_dir, "meta.json")
+    self.meta = None
+    if os.path.exists(meta_path):
+      with open(meta_path) as f:
+        self.meta = json.load(f)
+      if set(self.meta["rows"].keys()) != set(TABLE_COLUMNS.keys()):
+        # index of other version of TABLES is rebuilt from start of log
+        self.meta = None
+    if self.meta is None:
+      self.meta = {"offset": 0, "rows": dict((name, 0) for name in TABLE_COLUMNS),
+                   "end_marks": []}
+
+  def _column_path(self, table, column):
+    return os.path.join(self.index_dir, "{}.{}.f8".format(table, column))
+
+  def _write_meta(self):
+    meta_path = os.path.join(self.index_dir, "meta.json")
+    with open(meta_path + ".tmp", "w") as f:
+      json.dump(self.meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+  def update(self):
+    # parse lines appended to log since previous update and append them to index
+    # returns number of parsed lines
+    if not os.path.exists(self.index_dir):
+      os.makedirs(self.index_dir)
+    with open(self.log_path, "rb") as f:
+      f.seek(self.meta["offset"])
+      data = f.read()
+    # parse only complete lines
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+      return 0
+    lines = data[:end].decode("utf-8", "replace").split("\n")[:-1]
+
+    end_marks = self.meta["end_marks"]
+    new_rows = dict((name, []) for name in TABLE_COLUMNS)
+    for line in lines:
+      for name in _prefix(line):
+        match = self.regexps[name].match(line)
+        if match is None:
+          continue
+        values = list(match.groups())
+        if name == "episode":
+          if values[-1] not in end_marks:
+            end_marks.append(values[-1])
+          values[-1] = end_marks.index(values[-1])
+        new_rows[name].append([float(v) for v in values])
+        break
+
+    for name, columns in TABLE_COLUMNS.items():
+      rows = self.meta["rows"][name]
+      if len(new_rows[name]) == 0:
+        continue
+      array = np.array(new_rows[name], dtype=np.float64)
+      for j, column in enumerate(columns):
+        with open(self._column_path(name, column), "ab") as f:
+          # drop rows written after last meta.json (interrupted update)
+          f.truncate(rows * 8)
+          array[:, j].tofile(f)
+      self.meta["rows"][name] = rows + len(array)
+    self.meta["offset"] += end
+    self._write_meta()
+    return len(lines)
+
+  def num_rows(self, table):
+    return self.meta["rows"][table]
+
+  def column(self, table, column, start=0):
+    n = self.meta["rows"][table] - start
+    if n <= 0:
+      return np.zeros(0)
+    with open(self._column_path(table, column), "rb") as f:
+      f.seek(start * 8)
+      return np.fromfile(f, dtype=np.float64, count=n)
+
+  def table(self, table, columns, start=0):
+    # rows of COLUMNS of TABLE from row START, as (n, len(columns)) array
+    return np.stack([self.column(table, column, start) for column in columns], axis=1)
+
+  def read_table(self, table, columns):
+    # rows added to TABLE since previous read_table() of this reader
+    start = self.read_rows.get(table, 0)
+    self.read_rows[table] = self.meta["rows"][table]
+    return self.table(table, columns, start)
+
+  def read_info(self, info, endmark="END"):
+    # same rows as regular expressions of -i INFO in plot.py / plot2.py
+    self.update()
+    table, columns = INFO_TABLES[info]
+    if info == "r":
+      rows = self.read_table(table, columns + ("end",))
+      end_marks = self.meta["end_marks"]
+      if endmark not in end_marks:
+        return []
+      rows = rows[rows[:, -1] == end_marks.index(endmark)][:, :-1]
+    else:
+      rows = self.read_table(table, columns)
+      if info == "R":
+        rows = np.concatenate((rows, self.read_table("new_score", columns)))
+    return rows.tolist()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="update columnar index of A3C log file")
+  parser.add_argument('filename')
+  parser.add_argument('--index-dir', default=None,
+                      help="directory of index (default: FILENAME.index)")
+  parser.add_argument('--dump', choices=sorted(TABLE_COLUMNS.keys()), default=None,
+                      help="print rows of table")
+  args = parser.parse_args()
+
+  index = LogIndex(args.filename, args.index_dir)
+  num_lines = index.update()
+  if args.dump is None:
+    print("{} lines parsed. offset={}".format(num_lines, index.meta["offset"]))
+    for name, _, _ in TABLES:
+      print("{:10s} {:10d} rows".format(name, index.num_rows(name)))
+  else:
+    columns = TABLE_COLUMNS[args.dump]
+    sys.stdout.write(",".join(columns) + "\n")
+    for row in index.table(args.dump, columns):
+      sys.stdout.write(",".join("{:g}".format(v) for v in row) + "\n")
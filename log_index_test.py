@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from log_index import LogIndex
+
+LOG_LINES = [
+  "t=    10,s=     1000,th=0:r=  0RM01| l=5,v=0.12345,pr=0.00100\n",
+  "t=    11,s=1100,th=1:         |r=100RM01| NEW-SCORE\n",
+  "t=    12,s=     1200,th=1:         |l=5>4RM01|\n",
+  "t=    13,s=     1300,th=1:         |r=100@END|\n",
+  "[OHL]SCORE=100,s=     1300,th=1,lives=4,steps=812,tes=100,RM01\n",
+  "[PSC]th=1 @@@ NEW ROOM(1) VISITED: visit counts=[0 1 0]\n",
+  "t=    14,s=     1400,th=0:r=  0@end|\n",
+  "@@@ Average Episode score = 50.000000, s=     1400,th=1\n",
+  "@@@ Data saved at global_t=1500\n",
+]
+
+class TestLogIndex(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.dir, "log.txt")
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_update_and_query(self):
+    with open(self.path, "w") as f:
+      f.writelines(LOG_LINES)
+      f.write("t=    15,s=     1500,th=0:r=  0")
+    index = LogIndex(self.path)
+    self.assertEqual([[13.0, 1300.0, 100.0]], index.read_info("r", "END"))
+    self.assertEqual([[100.0, 1300.0, 4.0]], index.read_info("lives"))
+    self.assertEqual([[12.0, 1200.0, 1.0]], index.read_info("k"))
+    self.assertEqual([[10.0, 1000.0, 1.0], [11.0, 1100.0, 1.0]], index.read_info("R"))
+    self.assertEqual([1.0], list(index.column("room", "room")))
+    self.assertEqual([[50.0, 1400.0, 1.0]], index.table("average", ("average", "s", "th")).tolist())
+    self.assertEqual([1500.0], list(index.column("saved", "s")))
+
+    # resume from offset of incomplete line with new reader
+    with open(self.path, "a") as f:
+      f.write("@END|\n")
+    index = LogIndex(self.path)
+    index.update()
+    self.assertEqual(3, index.num_rows("episode"))
+    self.assertEqual([[14.0, 1400.0, 0.0]], index.read_info("r", "end"))
+
+  def test_rebuild_of_old_index(self):
+    with open(self.path, "w") as f:
+      f.writelines(LOG_LINES)
+    index = LogIndex(self.path)
+    index.update()
+    # index written before "saved" table was added
+    del index.meta["rows"]["saved"]
+    index._write_meta()
+    index = LogIndex(self.path)
+    index.update()
+    self.assertEqual([1500.0], list(index.column("saved", "s")))
+    self.assertEqual(2, index.num_rows("episode"))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import copy
+import sys
+import threading
+import time
+import itertools
+from collections import deque
+
+import numpy as np
+
+# Non-blocking log sink for actor threads.
+# log(kind, fmt, *args) appends a record (seq, fmt, args) to a per-thread
+# deque without taking any lock (deque.append is atomic). Formatting and
+# writing to stdout are done by a background writer thread, which drains
+# all buffers every FLUSH_INTERVAL and writes records in order of seq.
+# Mutable arguments (lists, arrays etc.) are copied when the record is
+# appended, so records show values at the time of log() even if the caller
+# changes them before the writer formats them.
+# Records of KIND are rate limited per thread by start(rate_limits=...):
+# if a record of same kind was logged less than rate_limits[kind] sec ago,
+# it is dropped and counted. Number of dropped records is reported by writer.
+# Counts of dropped records are updated under lock of the buffer (taken only
+# when a record is dropped, and by writer).
+# Before start() (and after stop()), log() prints immediately.
+
+FLUSH_INTERVAL = 0.2 # sec
+MAX_BUFFERED_RECORDS = 100000 # per thread
+
+_seq = itertools.count()
+_local = threading.local()
+_buffers = [] # list of _Buffer
+_buffers_lock = threading.Lock() # only used when a thread logs first time
+_drain_lock = threading.Lock() # writer thread and flush() from main thread
+_rate_limits = {}
+_writer = None
+_running = False
+
+# arguments of these types are kept as they are (not copied)
+IMMUTABLE_TYPES = (int, float, complex, str, bytes, bool, type(None), np.generic)
+
+class _Buffer(object):
+  def __init__(self):
+    self.lock = threading.Lock() # for dropped and overflow
+    self.records = deque()
+    self.last_time = {} # kind -> time of last record
+    self.dropped = {} # kind -> number of records dropped by rate limit
+    self.overflow = 0 # number of records dropped by MAX_BUFFERED_RECORDS
+
+def parse_rate_limits(spec):
+  # "new_score=1.0,lives_lost=0.5" -> {"new_score": 1.0, "lives_lost": 0.5}
+  rate_limits = {}
+  if spec is None:
+    return rate_limits
+  for item in spec.split(","):
+    item = item.strip()
+    if item == "":
+      continue
+    kind, sec = item.split("=")
+    rate_limits[kind.strip()] = float(sec)
+  return rate_limits
+
+def _get_buffer():
+  buf = getattr(_local, "buffer", None)
+  if buf is None:
+    buf = _Buffer()
+    _local.buffer = buf
+    with _buffers_lock:
+      _buffers.append(buf)
+  return buf
+
+def _snapshot(args):
+  # copy of mutable arguments
+  if all(isinstance(arg, IMMUTABLE_TYPES) for arg in args):
+    return args
+  return tuple(arg if isinstance(arg, IMMUTABLE_TYPES) else copy.deepcopy(arg)
+               for arg in args)
+
+def log(kind, fmt, *args):
+  if not _running:
+    print(fmt.format(*args))
+    return
+  buf = _get_buffer()
+  limit = _rate_limits.get(kind)
+  if limit is not None:
+    now = time.time()
+    if now - buf.last_time.get(kind, 0.0) < limit:
+      with buf.lock:
+        buf.dropped[kind] = buf.dropped.get(kind, 0) + 1
+      return
+    buf.last_time[kind] = now
+  if len(buf.records) >= MAX_BUFFERED_RECORDS:
+    with buf.lock:
+      buf.overflow += 1
+    return
+  buf.records.append((next(_seq), fmt, _snapshot(args)))
+
+def _drain():
+  with _drain_lock:
+    _drain_buffers()
+
+def _drain_buffers():
+  records = []
+  dropped = {}
+  overflow = 0
+  with _buffers_lock:
+    buffers = list(_buffers)
+  for buf in buffers:
+    records_popleft = buf.records.popleft
+    for _ in range(len(buf.records)):
+      records.append(records_popleft())
+    if buf.dropped or buf.overflow > 0:
+      with buf.lock:
+        for kind, n in buf.dropped.items():
+          dropped[kind] = dropped.get(kind, 0) + n
+        buf.dropped.clear()
+        overflow += buf.overflow
+        buf.overflow = 0
+  records.sort(key=lambda record: record[0])
+  lines = [fmt.format(*args) for _, fmt, args in records]
+  for kind, n in sorted(dropped.items()):
+    if n > 0:
+      lines.append("### Log : {} '{}' records dropped by rate limit".format(n, kind))
+  if overflow > 0:
+    lines.append("### Log : {} records dropped by buffer overflow".format(overflow))
+  if len(lines) > 0:
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+def _run():
+  while _running:
+    time.sleep(FLUSH_INTERVAL)
+    _drain()
+
+def start(rate_limits=None):
+  global _writer, _running, _rate_limits
+  _rate_limits = rate_limits or {}
+  _running = True
+  _writer = threading.Thread(target=_run, name="log_sink")
+  _writer.daemon = True
+  _writer.start()
+
+def stop():
+  # write all remaining records
+  global _writer, _running
+  if not _running:
+    return
+  _running = False
+  _writer.join()
+  _writer = None
+  _drain()
+
+def queue_depth():
+  # number of records waiting for writer (read without lock, for status)
+  return sum(len(buf.records) for buf in list(_buffers))
+
+def flush():
+  # called from main thread before printing, to keep order of output
+  if _running:
+    _drain()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import io
+import sys
+import threading
+import unittest
+
+import log_sink
+
+class TestLogSink(unittest.TestCase):
+  def setUp(self):
+    self.stdout = sys.stdout
+    sys.stdout = io.StringIO()
+
+  def tearDown(self):
+    log_sink.stop()
+    sys.stdout = self.stdout
+
+  def test_order_of_threads(self):
+    log_sink.start()
+    log_sink.log("score", "a={}", 1)
+    thread = threading.Thread(target=log_sink.log, args=("score", "b={:.1f}", 2.0))
+    thread.start()
+    thread.join()
+    log_sink.log("score", "c")
+    log_sink.stop()
+    self.assertEqual("a=1\nb=2.0\nc\n", sys.stdout.getvalue())
+
+  def test_rate_limit(self):
+    log_sink.start(log_sink.parse_rate_limits("new_score=60, score=0"))
+    for i in range(3):
+      log_sink.log("new_score", "new_score {}", i)
+      log_sink.log("score", "score {}", i)
+    log_sink.stop()
+    lines = sys.stdout.getvalue().splitlines()
+    self.assertEqual(["new_score 0", "score 0", "score 1", "score 2",
+                      "### Log : 2 'new_score' records dropped by rate limit"], lines)
+
+  def test_mutable_args(self):
+    log_sink.start()
+    rooms = [1]
+    log_sink.log("score", "rooms={}", rooms)
+    rooms.append(0)
+    log_sink.stop()
+    self.assertEqual("rooms=[1]\n", sys.stdout.getvalue())
+
+  def test_dropped_count_of_threads(self):
+    log_sink.start({"score": 3600.0})
+    def log_scores():
+      for i in range(2000):
+        log_sink.log("score", "score {}", i)
+    threads = [threading.Thread(target=log_scores) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for _ in range(20):
+      log_sink.flush()
+    for thread in threads:
+      thread.join()
+    log_sink.stop()
+    lines = sys.stdout.getvalue().splitlines()
+    self.assertEqual(4, len([line for line in lines if line.startswith("score 0")]))
+    dropped = sum(int(line.split()[3]) for line in lines if line.startswith("### Log :"))
+    self.assertEqual(4 * 1999, dropped)
+
+  def test_not_started(self):
+    log_sink.log("score", "x={}", 3)
+    self.assertEqual("x=3\n", sys.stdout.getvalue())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# Incremental data store for tail-following tools (plot.py, plot2.py, average.py).
+# Rows read from log are appended to arrays kept sorted along key column.
+# Rows usually arrive almost in order, so adding rows only touches tail of
+# arrays after the first changed index, and moving averages and partitions
+# are updated only from that index.
+
+INITIAL_CAPACITY = 1024
+
+class SortedRows(object):
+  def __init__(self, num_columns, key_column):
+    self.key_column = key_column
+    self.data = np.zeros((INITIAL_CAPACITY, num_columns))
+    self.n = 0
+    self.min = np.full(num_columns, np.inf)
+    self.max = np.full(num_columns, -np.inf)
+
+  def __len__(self):
+    return self.n
+
+  def column(self, j):
+    return self.data[:self.n, j]
+
+  def _reserve(self, n):
+    capacity = self.data.shape[0]
+    if n <= capacity:
+      return
+    while capacity < n:
+      capacity *= 2
+    data = np.zeros((capacity, self.data.shape[1]))
+    data[:self.n] = self.data[:self.n]
+    self.data = data
+
+  def add(self, rows):
+    # returns first index changed by rows (len(self) if no rows)
+    rows = np.asarray(rows, dtype=np.float64)
+    if len(rows) == 0:
+      return self.n
+    rows = rows[np.argsort(rows[:, self.key_column], kind="mergesort")]
+    self.min = np.minimum(self.min, rows.min(axis=0))
+    self.max = np.maximum(self.max, rows.max(axis=0))
+
+    k = self.key_column
+    start = np.searchsorted(self.data[:self.n, k], rows[0, k], side="right")
+    self._reserve(self.n + len(rows))
+    if start == self.n:
+      self.data[self.n:self.n + len(rows)] = rows
+    else:
+      tail = np.concatenate((self.data[start:self.n], rows))
+      tail = tail[np.argsort(tail[:, k], kind="mergesort")]
+      self.data[start:start + len(tail)] = tail
+    self.n += len(rows)
+    return start
+
+
+class MovingAverage(object):
+  # moving average of column Y of SortedRows with window of ANS rows
+  # ("valid" part of np.convolve(y, np.ones(ans)/ans))
+  def __init__(self, rows, y_column):
+    self.rows = rows
+    self.y_column = y_column
+    self.ans = None
+    self.cumsum = np.zeros(INITIAL_CAPACITY + 1)
+    self.averages = np.zeros(INITIAL_CAPACITY)
+    self.n = 0 # number of rows in cumsum
+
+  def update(self, start, ans):
+    # START is first changed index of rows (return value of SortedRows.add())
+    n = len(self.rows)
+    start = min(start, self.n)
+    if self.cumsum.shape[0] < n + 1:
+      capacity = self.rows.data.shape[0]
+      cumsum = np.zeros(capacity + 1)
+      cumsum[:self.n + 1] = self.cumsum[:self.n + 1]
+      self.cumsum = cumsum
+      averages = np.zeros(capacity)
+      averages[:self.averages.shape[0]] = self.averages
+      self.averages = averages
+    y = self.rows.column(self.y_column)
+    self.cumsum[start + 1:n + 1] = self.cumsum[start] + np.cumsum(y[start:n])
+    self.n = n
+
+    # averages[i] depends on rows i .. i + ans - 1
+    if ans != self.ans:
+      self.ans = ans
+      start = 0
+    else:
+      start = max(start - ans + 1, 0)
+    end = n - ans + 1
+    if end > start:
+      self.averages[start:end] = \
+        (self.cumsum[start + ans:end + ans] - self.cumsum[start:end]) / ans
+
+  def __len__(self):
+    return max(self.n - self.ans + 1, 0)
+
+  def average(self):
+    return self.averages[:len(self)]
+
+  def x(self, x_column):
+    # x of average(), same as x[rim_l:-rim_r] of np.convolve
+    rim_l = (self.ans - 1) // 2
+    return self.rows.column(x_column)[rim_l:rim_l + len(self)]
+
+
+class PartitionedRows(object):
+  # SortedRows per value of column PARTITION_COLUMN (score, room, ...)
+  def __init__(self, num_columns, key_column, partition_column):
+    self.num_columns = num_columns
+    self.key_column = key_column
+    self.partition_column = partition_column
+    self.partitions = {}
+    self.starts = {} # partition -> first changed index since last take_starts()
+
+  def keys(self):
+    return sorted(self.partitions.keys())
+
+  def __getitem__(self, key):
+    return self.partitions[key]
+
+  def add(self, rows):
+    rows = np.asarray(rows, dtype=np.float64)
+    if len(rows) == 0:
+      return
+    keys = rows[:, self.partition_column]
+    for key in np.unique(keys):
+      key = key.item()
+      partition = self.partitions.get(key)
+      if partition is None:
+        partition = SortedRows(self.num_columns, self.key_column)
+        self.partitions[key] = partition
+      start = partition.add(rows[keys == key])
+      self.starts[key] = min(start, self.starts.get(key, start))
+
+  def take_starts(self):
+    starts = self.starts
+    self.starts = {}
+    return starts
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import unittest
+import numpy as np
+from operator import itemgetter
+
+from log_store import SortedRows, MovingAverage, PartitionedRows
+
+class TestLogStore(unittest.TestCase):
+  def test_incremental_moving_average(self):
+    rng = np.random.RandomState(0)
+    rows = SortedRows(3, 1)
+    moving_average = MovingAverage(rows, 2)
+    data = []
+    for i in range(30):
+      # rows of threads arrive almost in order of s
+      new_data = [[rng.rand(), i * 100 + rng.randint(-150, 100), rng.randint(0, 400)]
+                  for _ in range(rng.randint(0, 80))]
+      data.extend(new_data)
+      start = rows.add(new_data)
+      if len(data) < 5:
+        continue
+      ans = min(50, len(data) - 1)
+      moving_average.update(start, ans)
+
+      expected = np.array(sorted(data, key=itemgetter(1)))
+      self.assertTrue((expected[:, 1] == rows.column(1)).all())
+      y_average = np.convolve(expected[:, 2], np.ones(ans) / ans, 'valid')
+      self.assertTrue(np.allclose(y_average, moving_average.average()))
+      rim_l = (ans - 1) // 2
+      self.assertTrue((expected[rim_l:rim_l + len(y_average), 1] ==
+                       moving_average.x(1)).all())
+      self.assertEqual(expected[:, 2].max(), rows.max[2])
+
+  def test_partitions(self):
+    partitions = PartitionedRows(3, 1, 0)
+    partitions.add([[100, 5, 1], [0, 3, 2], [100, 1, 3]])
+    partitions.add([[100, 2, 4]])
+    self.assertEqual([0, 100], partitions.keys())
+    self.assertEqual([1, 2, 5], list(partitions[100].column(1)))
+    self.assertEqual({0: 0, 100: 0}, partitions.take_starts())
+    self.assertEqual({}, partitions.take_starts())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import sys
+from collections import OrderedDict, deque
+
+import numpy as np
+from sortedcontainers import SortedList
+
+# Memory accounting of major structures of each training thread
+# (--memory-accounting=True).
+# Each thread measures its own structures at every performance log interval
+# (so they are not read while being modified), logs the breakdown and warns
+# if a structure exceeds its budget given by --memory-budgets, e.g.
+#   --memory-budgets="episode_history=500,psc_vcount=200" (MB per thread)
+# Sizes are estimates: NumPy data and Python objects are counted once
+# (objects shared by structures of one thread are not counted twice).
+
+STRUCTURES = ["episode_history", "episode_screens", "psc_vcount", "episode_scores",
+              "policy_cache", "graph_variables"]
+
+MB = 1e6
+ARRAY_HEADER = sys.getsizeof(np.empty(0)) # bytes of ndarray object without data
+
+def nbytes(obj, seen=None):
+  # estimated size (bytes) of obj and objects referred by it
+  if seen is None:
+    seen = set()
+  if id(obj) in seen:
+    return 0
+  seen.add(id(obj))
+  if isinstance(obj, np.ndarray):
+    return obj.nbytes + ARRAY_HEADER
+  size = sys.getsizeof(obj)
+  if isinstance(obj, (list, tuple, deque, set, frozenset, SortedList)):
+    size += sum(nbytes(item, seen) for item in obj)
+  elif isinstance(obj, dict):
+    size += sum(nbytes(k, seen) + nbytes(v, seen) for k, v in obj.items())
+  return size
+
+def variables_bytes(variables):
+  # size of tf.Variables
+  size = 0
+  for var in variables:
+    shape = var.get_shape().as_list()
+    size += int(np.prod(shape)) * var.dtype.base_dtype.size
+  return size
+
+def thread_breakdown(training_thread):
+  # OrderedDict of structure name => bytes of A3CTrainingThread
+  seen = set()
+  breakdown = OrderedDict((name, 0) for name in STRUCTURES)
+  if training_thread.tes > 0:
+    breakdown["episode_history"] = nbytes([training_thread.episode_states,
+                                           training_thread.episode_actions,
+                                           training_thread.episode_rewards,
+                                           training_thread.episode_values,
+                                           training_thread.episode_liveses], seen)
+    breakdown["episode_scores"] = nbytes(training_thread.episode_scores.episode_scores, seen) + \
+                                  nbytes(training_thread.episode_scores.sorted_scores, seen)
+  if hasattr(training_thread, "episode_screens"):
+    breakdown["episode_screens"] = nbytes(training_thread.episode_screens, seen)
+  game_state = training_thread.game_state
+  if game_state.psc_use:
+    breakdown["psc_vcount"] = nbytes(game_state.psc_vcount, seen) + nbytes(game_state.psc_n, seen)
+  if training_thread.policy_cache is not None:
+    breakdown["policy_cache"] = nbytes(training_thread.policy_cache._entries, seen)
+  breakdown["graph_variables"] = training_thread.variable_bytes
+  return breakdown
+
+def parse_budgets(spec):
+  # "episode_history=500,psc_vcount=200" -> {"episode_history": 500.0, "psc_vcount": 200.0} (MB)
+  budgets = {}
+  if spec is None:
+    return budgets
+  for item in spec.split(","):
+    item = item.strip()
+    if item == "":
+      continue
+    name, mb = item.split("=")
+    name = name.strip()
+    if name not in STRUCTURES:
+      raise ValueError("unknown structure in memory budgets: {}".format(name))
+    budgets[name] = float(mb)
+  return budgets
+
+def over_budgets(breakdown, budgets):
+  # list of (name, MB, budget MB) of structures which exceed budgets
+  return [(name, breakdown[name] / MB, budgets[name])
+          for name in breakdown if name in budgets and breakdown[name] / MB > budgets[name]]
+
+def format_breakdown(breakdown):
+  total = sum(breakdown.values())
+  return " ".join("{}={:.1f}MB".format(name, size / MB) for name, size in breakdown.items()) + \
+         " total={:.1f}MB".format(total / MB)
+
+def format_table(breakdowns, rss_mb=None):
+  # table of breakdowns (thread_index => breakdown) in MB
+  lines = ["### Memory : {:6s} ".format("thread") +
+           " ".join("{:>16s}".format(name) for name in STRUCTURES) + " {:>10s}".format("total")]
+  totals = OrderedDict((name, 0) for name in STRUCTURES)
+  for thread_index in sorted(breakdowns.keys()):
+    breakdown = breakdowns[thread_index]
+    lines.append("### Memory : {:6s} ".format("th{}".format(thread_index)) +
+                 " ".join("{:16.1f}".format(breakdown[name] / MB) for name in STRUCTURES) +
+                 " {:10.1f}".format(sum(breakdown.values()) / MB))
+    for name in STRUCTURES:
+      totals[name] += breakdown[name]
+  lines.append("### Memory : {:6s} ".format("all") +
+               " ".join("{:16.1f}".format(totals[name] / MB) for name in STRUCTURES) +
+               " {:10.1f}".format(sum(totals.values()) / MB))
+  if rss_mb is not None:
+    lines.append("### Memory : process RSS {:.1f} MB".format(rss_mb))
+  return "\n".join(lines)
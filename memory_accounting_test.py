@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import unittest
+from collections import OrderedDict, deque
+
+import numpy as np
+
+import memory_accounting
+from memory_accounting import nbytes, parse_budgets, over_budgets, format_table
+
+class TestMemoryAccounting(unittest.TestCase):
+  def test_nbytes(self):
+    a = np.zeros((100, 100), dtype=np.float32)
+    self.assertGreaterEqual(nbytes(a), 40000)
+    self.assertLess(nbytes(a), 41000)
+    # shared array is counted once
+    self.assertLess(nbytes([a, a, a]), 42000)
+    self.assertGreater(nbytes(deque([a, a.copy()])), 80000)
+    self.assertGreater(nbytes({"x": a}), 40000)
+    self.assertGreater(nbytes([b"x" * 1000]), 1000)
+
+  def test_budgets(self):
+    budgets = parse_budgets("episode_history=1, psc_vcount=0.5")
+    self.assertEqual({"episode_history": 1.0, "psc_vcount": 0.5}, budgets)
+    self.assertEqual({}, parse_budgets(""))
+    with self.assertRaises(ValueError):
+      parse_budgets("nothing=1")
+    breakdown = OrderedDict((name, 0) for name in memory_accounting.STRUCTURES)
+    breakdown["episode_history"] = 2e6
+    breakdown["psc_vcount"] = 1e5
+    self.assertEqual([("episode_history", 2.0, 1.0)], over_budgets(breakdown, budgets))
+
+  def test_format_table(self):
+    breakdown = OrderedDict((name, 1e6) for name in memory_accounting.STRUCTURES)
+    lines = format_table({0: breakdown, 1: breakdown}, rss_mb=100.0).split("\n")
+    self.assertEqual(5, len(lines))
+    self.assertEqual("all", lines[3].split()[3])
+    self.assertAlmostEqual(2.0 * len(memory_accounting.STRUCTURES), float(lines[3].split()[-1]))
+
+if __name__ == '__main__':
+  unittest.main()
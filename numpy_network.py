@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Actor-Critic Network evaluated with NumPy only
+# (forward propagation of GameACFFNetwork / GameACLSTMNetwork with weights
+#  read by checkpoint_reader, for display and evaluation tools)
+class NumpyACNetwork(object):
+  def __init__(self, weights):
+    self._weights = weights
+    self.W_conv1 = weights["W_conv1"]
+    self.b_conv1 = weights["b_conv1"]
+    self.W_conv2 = weights["W_conv2"]
+    self.b_conv2 = weights["b_conv2"]
+    self.W_fc1 = weights["W_fc1"]
+    self.b_fc1 = weights["b_fc1"]
+    self.W_fc2 = weights["W_fc2"]
+    self.b_fc2 = weights["b_fc2"]
+    self.W_fc3 = weights["W_fc3"]
+    self.b_fc3 = weights["b_fc3"]
+
+    self.use_lstm = "lstm_matrix" in weights
+    if self.use_lstm:
+      self.lstm_matrix = weights["lstm_matrix"]
+      self.lstm_bias = weights["lstm_bias"]
+      self._num_units = self.lstm_matrix.shape[1] // 4
+      self._forget_bias = 1.0
+    self.reset_state()
+
+  def reset_state(self):
+    if self.use_lstm:
+      self.lstm_state_out = np.zeros([1, 2 * self._num_units], dtype=np.float32)
+
+  def _conv2d(self, x, W, stride):
+    # "VALID" padding convolution of x (h, w, c) by W (kh, kw, c, out_c)
+    kh, kw, _, _ = W.shape
+    h, w, c = x.shape
+    oh = (h - kh) // stride + 1
+    ow = (w - kw) // stride + 1
+    sh, sw, sc = x.strides
+    patches = as_strided(x, shape=(oh, ow, kh, kw, c),
+                         strides=(sh * stride, sw * stride, sh, sw, sc))
+    return np.tensordot(patches, W, axes=([2, 3, 4], [0, 1, 2]))
+
+  def _lstm(self, x):
+    c, h = np.split(self.lstm_state_out, 2, axis=1)
+    concat = np.dot(np.concatenate([x, h], axis=1), self.lstm_matrix) + self.lstm_bias
+    # i = input_gate, j = new_input, f = forget_gate, o = output_gate
+    i, j, f, o = np.split(concat, 4, axis=1)
+    new_c = c * _sigmoid(f + self._forget_bias) + _sigmoid(i) * np.tanh(j)
+    new_h = np.tanh(new_c) * _sigmoid(o)
+    return new_h, np.concatenate([new_c, new_h], axis=1)
+
+  def _forward(self, s_t):
+    x = np.asarray(s_t, dtype=np.float32)
+    h_conv1 = np.maximum(self._conv2d(x, self.W_conv1, 4) + self.b_conv1, 0.0)
+    h_conv2 = np.maximum(self._conv2d(h_conv1, self.W_conv2, 2) + self.b_conv2, 0.0)
+    h_conv2_flat = h_conv2.reshape([1, -1])
+    h = np.maximum(np.dot(h_conv2_flat, self.W_fc1) + self.b_fc1, 0.0)
+    lstm_state = None
+    if self.use_lstm:
+      h, lstm_state = self._lstm(h)
+    logits = np.dot(h, self.W_fc2) + self.b_fc2
+    logits -= logits.max()
+    pi = np.exp(logits)
+    pi /= pi.sum()
+    v = np.dot(h, self.W_fc3) + self.b_fc3
+    return pi[0], v[0, 0], lstm_state
+
+  # same interface as GameACNetwork (sess is not used)
+  def run_policy_and_value(self, sess, s_t):
+    pi, v, lstm_state = self._forward(s_t)
+    if self.use_lstm:
+      self.lstm_state_out = lstm_state
+    return (pi, v)
+
+  def run_policy(self, sess, s_t):
+    pi, _ = self.run_policy_and_value(sess, s_t)
+    return pi
+
+  def run_value(self, sess, s_t):
+    # don't update LSTM state (see GameACLSTMNetwork.run_value())
+    _, v, _ = self._forward(s_t)
+    return v
+
+def _sigmoid(x):
+  return 1.0 / (1.0 + np.exp(-x))
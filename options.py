@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import argparse
+import json
+import os
 import sys
 
 LOCAL_T_MAX = 5 # repeat step size
+BOOTSTRAP_PASS = "separate" # forward pass for bootstrap V: separate, pre-update or post-sync (see A3CTrainingThread)
 RMSP_ALPHA = 0.99 # decay parameter for RMSProp
 RMSP_EPSILON = 0.1 # epsilon parameter for RMSProp
 CHECKPOINT_DIR = 'checkpoints'
@@ -14,6 +17,7 @@ PARALLEL_SIZE = 8 # parallel thread size
 ROM = "breakout.bin"     # action size = 3
 GYM_ENV = "MontezumaRevenge-v0" # openAI gym environment
 USE_GYM = False # use openAI gym
+FAKE_ALE = None # Recording (.npz) or "synthetic" replayed instead of ROM by fake ALE (fake_ale.py)
 
 INITIAL_ALPHA_LOG_RATE = 0.4226 # log_uniform interpolate rate for learning rate (around 7 * 10^-4)
 GAMMA = 0.99 # discount factor for rewards
@@ -24,10 +28,24 @@ SAVE_MEGA_INTERVAL = 3 # save interval (in Mega step)
 SAVE_BEST_AVG_ONLY = False # save only when best average score
 MAX_TO_KEEP = None # maximum number of recent checkpoint files to keep (None means no-limit)
 SYNC_THREAD = False # save with syncronization among thread
+PREEMPTION_DEADLINE = 0 # Deadline (sec) of checkpoint after SIGTERM/SIGINT (e.g. 25 on preemptible VM, 0 means no deadline)
+ACTOR_SNAPSHOTS = False # Save state of actors (ALE, frames, LSTM, episode history) at stop to continue episodes on resume
+PBT_INTERVAL = 0 # Interval (global steps) of population-based training over threads (0 disables; see pbt.py)
+PBT_FRACTION = 0.25 # Fraction of threads replaced by (and copied from) at each PBT step
+PBT_PERTURB = 0.2 # Copied hyperparameters are multiplied by 1 +/- PBT_PERTURB
+PBT_READY_EPISODES = 20 # Episodes played since last change before thread is ranked
+PBT_COPY_PSC = True # Copy pseudo-count tables with hyperparameters
 
 GRAD_NORM_CLIP = 40.0 # gradient norm clipping
 USE_GPU = True # To use GPU, set True
 USE_LSTM = False # True for A3C LSTM, False for A3C FF
+SHARED_GRAPH = False # Build per-thread graph once and share it among threads (A3C variant without local copies of weights; see shared_graph.py)
+POLICY_CACHE_SIZE = 0 # Entries of per-thread cache of pi, V for repeated states (FF only, 0 disables; see policy_cache.py)
+SUMMARY_BATCH_EPISODES = 10 # Episodes buffered per thread before summaries are written (see summary_recorder.py)
+STATUS_PORT = None # Port of local HTTP/JSON status endpoint (see status_server.py)
+STATUS_HOST = "127.0.0.1" # Address of status endpoint ("0.0.0.0" to serve to other hosts)
+MEMORY_ACCOUNTING = False # Log memory breakdown of each thread at performance log interval (see memory_accounting.py)
+MEMORY_BUDGETS = "" # Budgets (MB per thread) of structures, e.g. "episode_history=500,psc_vcount=200"
 
 MAX_PLAY_TIME  = 300 # Max play time in seconds
 
@@ -81,6 +99,14 @@ LOG_INTERVAL = 900 # Log output interval (steps)
 SCORE_LOG_INTERVAL = 900 # Score log output interval (steps)
 PERFORMANCE_LOG_INTERVAL = 1500 # Performance log output interval (steps)
 AVERAGE_SCORE_LOG_INTERVAL = 10 # Average score log output interval (eipsode)
+LOG_SINK = True # Actor threads write log through non-blocking buffered sink (log_sink.py)
+LOG_RATE_LIMITS = "" # Minimum interval (sec) of log records per kind and thread (ex. "new_score=1.0,lives_lost=1.0")
+EVENT_LOG = None # Output file of structured event stream (JSON lines) for analytics tools
+PHASE_TIMING = False # Measure time of each phase in hot path (output at performance log and save)
+PROFILER_DIR = None # Output directory of sampling profiler (None means no profiler)
+PROFILER_HZ = 100 # Sampling rate of sampling profiler
+PROFILER_TOP = 30 # Number of hot functions in summary of sampling profiler
+PROFILER_CONTROL_FILE = None # Sampling profiler is active while this file exists (SIGUSR1 also toggles it)
 
 NUM_EPISODE_RECORD = 20 # Number of episode to record
 RECORD_SCREEN_DIR = None # Game screen (output of ALE) record directory 
@@ -114,6 +140,8 @@ def sec_to_steps(args, sec):
 # arguments
 parser = argparse.ArgumentParser()
 parser.add_argument('--local-t-max', type=int, default=LOCAL_T_MAX)
+parser.add_argument('--bootstrap-pass', type=str, default=BOOTSTRAP_PASS,
+                    choices=["separate", "pre-update", "post-sync"])
 parser.add_argument('--rmsp-alpha', type=float, default=RMSP_ALPHA)
 parser.add_argument('--rmsp-epsilon', type=float, default=RMSP_EPSILON)
 parser.add_argument('--checkpoint-dir', type=str, default=CHECKPOINT_DIR)
@@ -125,6 +153,7 @@ parser.add_argument('--parallel-size', type=int, default=PARALLEL_SIZE)
 parser.add_argument('--rom', type=str, default=ROM)
 parser.add_argument('--gym-env', type=str, default=GYM_ENV)
 parser.add_argument('--use-gym', type=str, default=str(USE_GYM))
+parser.add_argument('--fake-ale', type=str, default=FAKE_ALE)
 parser.add_argument('--action-size', type=int, default=None)
 
 parser.add_argument('--initial-alpha-log-rate', type=float, default=INITIAL_ALPHA_LOG_RATE)
@@ -139,10 +168,24 @@ parser.add_argument('--save-time-interval', type=int, default=None)
 parser.add_argument('--save-best-avg-only', type=str, default=str(SAVE_BEST_AVG_ONLY))
 parser.add_argument('--max-to-keep', type=int, default=MAX_TO_KEEP)
 parser.add_argument('--sync-thread', type=str, default=str(SYNC_THREAD))
+parser.add_argument('--preemption-deadline', type=float, default=PREEMPTION_DEADLINE)
+parser.add_argument('--actor-snapshots', type=str, default=str(ACTOR_SNAPSHOTS))
+parser.add_argument('--pbt-interval', type=int, default=PBT_INTERVAL)
+parser.add_argument('--pbt-fraction', type=float, default=PBT_FRACTION)
+parser.add_argument('--pbt-perturb', type=float, default=PBT_PERTURB)
+parser.add_argument('--pbt-ready-episodes', type=int, default=PBT_READY_EPISODES)
+parser.add_argument('--pbt-copy-psc', type=str, default=str(PBT_COPY_PSC))
 
 parser.add_argument('--grad-norm-clip', type=float, default=GRAD_NORM_CLIP)
 parser.add_argument('--use-gpu', type=str, default=str(USE_GPU))
 parser.add_argument('--use-lstm', type=str, default=str(USE_LSTM))
+parser.add_argument('--shared-graph', type=str, default=str(SHARED_GRAPH))
+parser.add_argument('--policy-cache-size', type=int, default=POLICY_CACHE_SIZE)
+parser.add_argument('--summary-batch-episodes', type=int, default=SUMMARY_BATCH_EPISODES)
+parser.add_argument('--status-port', type=int, default=STATUS_PORT)
+parser.add_argument('--status-host', type=str, default=STATUS_HOST)
+parser.add_argument('--memory-accounting', type=str, default=str(MEMORY_ACCOUNTING))
+parser.add_argument('--memory-budgets', type=str, default=MEMORY_BUDGETS)
 
 parser.add_argument('--max-play-time', type=int, default=MAX_PLAY_TIME)
 parser.add_argument('--max-play-steps', type=int, default=None)
@@ -198,8 +241,16 @@ parser.add_argument('--log-interval', type=int, default=LOG_INTERVAL)
 parser.add_argument('--score-log-interval', type=int, default=SCORE_LOG_INTERVAL)
 parser.add_argument('--performance-log-interval', type=int, default=PERFORMANCE_LOG_INTERVAL)
 parser.add_argument('--average-score-log-interval', type=int, default=AVERAGE_SCORE_LOG_INTERVAL)
-
-parser.add_argument('--num-episode-record', type=str, default=NUM_EPISODE_RECORD)
+parser.add_argument('--log-sink', type=str, default=str(LOG_SINK))
+parser.add_argument('--log-rate-limits', type=str, default=LOG_RATE_LIMITS)
+parser.add_argument('--event-log', type=str, default=EVENT_LOG)
+parser.add_argument('--phase-timing', type=str, default=str(PHASE_TIMING))
+parser.add_argument('--profiler-dir', type=str, default=PROFILER_DIR)
+parser.add_argument('--profiler-hz', type=float, default=PROFILER_HZ)
+parser.add_argument('--profiler-top', type=int, default=PROFILER_TOP)
+parser.add_argument('--profiler-control-file', type=str, default=PROFILER_CONTROL_FILE)
+
+parser.add_argument('--num-episode-record', type=int, default=NUM_EPISODE_RECORD)
 parser.add_argument('--record-screen-dir', type=str, default=RECORD_SCREEN_DIR)
 parser.add_argument('--record-gs-screen-dir', type=str, default=RECORD_GS_SCREEN_DIR)
 parser.add_argument('--record-new-record-dir', type=str, default=RECORD_NEW_RECORD_DIR)
@@ -215,175 +266,254 @@ parser.add_argument('--gym-eval', type=str, default=str(GYM_EVAL))
 
 parser.add_argument('--yaml', type=str, default=None)
 
-args = parser.parse_args()
-
-convert_boolean_arg(args, "save_best_avg_only")
-convert_boolean_arg(args, "sync_thread")
-convert_boolean_arg(args, "use_gym")
-convert_boolean_arg(args, "use_gpu")
-convert_boolean_arg(args, "use_lstm")
-convert_boolean_arg(args, "terminate_on_lives_lost")
-convert_boolean_arg(args, "train_in_eval")
-convert_boolean_arg(args, "psc_use")
-convert_boolean_arg(args, "psc_multi")
-convert_boolean_arg(args, "color_averaging_in_ale")
-convert_boolean_arg(args, "color_maximizing_in_gs")
-convert_boolean_arg(args, "color_averaging_in_gs")
-convert_boolean_arg(args, "color_no_change_in_gs")
-convert_boolean_arg(args, "stack_frames_in_gs")
-convert_boolean_arg(args, "crop_frame")
-convert_boolean_arg(args, "compress_frame")
-convert_boolean_arg(args, "reset_max_reward")
-convert_boolean_arg(args, "tes_extend")
-convert_boolean_arg(args, "clear_history_on_death")
-convert_boolean_arg(args, "clear_history_after_ohl")
-convert_boolean_arg(args, "record_all_non0_record")
-convert_boolean_arg(args, "display")
-convert_boolean_arg(args, "verbose")
-convert_boolean_arg(args, "gym_eval")
-
-# Read in options in yaml file
-if args.yaml is not None:
-  print("yaml=", args.yaml)
-  options_str = open(args.yaml).read()
-  print("content of yaml file:")
-  print(options_str)
-  print("")
-
-  import yaml
-  options_yaml = yaml.load(options_str)
-  if 'psc_beta_list' in options_yaml.keys():
-    args.psc_beta_list = options_yaml['psc_beta_list']
-  if 'psc_pow_list' in options_yaml.keys():
-    args.psc_pow_list = options_yaml['psc_pow_list']
-  if 'tes_list' in options_yaml.keys():
-    args.tes_list = options_yaml['tes_list']
-
-if args.psc_beta_list is not None:
-  args.psc_beta_list = [float(s) for s in args.psc_beta_list.split(",")]
-  if len(args.psc_beta_list) == 1:
-    args.psc_beta_list = args.psc_beta_list * args.parallel_size
-  elif len(args.psc_beta_list) != args.parallel_size:
-    print("len(psc_beta_list) != parallel_size: psc_beta_list=", args.psc_beta_list)
-    sys.exit(1)
-  print("psc_beta_list=", args.psc_beta_list)
-
-if args.psc_pow_list is not None:
-  args.psc_pow_list = [float(s) for s in args.psc_pow_list.split(",")]
-  if len(args.psc_pow_list) == 1:
-    args.psc_pow_list = args.psc_pow_list * args.parallel_size
-  elif len(args.psc_pow_list) != args.parallel_size:
-    print("len(psc_pow_list) != parallel_size: psc_pow_list=", args.psc_pow_list)
-    sys.exit(1)
-  print("psc_pow_list=", args.psc_pow_list)
-
-if args.tes_list is not None:
-  args.tes_list = [int(s) for s in args.tes_list.split(",")]
-  if len(args.tes_list) == 1:
-    args.tes_list = args.tes_list * args.parallel_size
-  elif len(args.tes_list) != args.parallel_size:
-    print("len(tes_list) != parallel_size: tes_list=", args.tes_list)
-    sys.exit(1)
-  print("tes_list=", args.tes_list)
-
-if args.gym_eval:
-  if args.record_screen_dir is None:
-    print("add --record-screen-dir=RECORD_SCREEN_DIR when --gym-eval=True")
-    sys.exit(1)
-
-if args.use_gym:
-  args.rom = args.gym_env
-  args.color_averaging_in_ale = False
-  args.color_averaging_in_gs = False
-  args.color_maximizing_in_gs = False
-  args.color_no_change_in_gs = True
-  if args.stack_frames_in_gs:
-    print("Can not specify stack-frames-in-gs because OpenAI Gym skips 2 - 4 frames randomly")
-    sys.exit(1)
-  # Requirement for OpenAI Gym
-  args.terminate_on_lives_lost = False
-  args.tes_extend = False
-  args.clear_history_on_death = False
-
-num_color_options = 0
-if args.color_averaging_in_ale:
-  num_color_options += 1
-if args.color_maximizing_in_gs:
-  num_color_options += 1
-if args.color_averaging_in_gs:
-  num_color_options += 1
-if args.color_no_change_in_gs:
-  num_color_options += 1
-if num_color_options != 1:
-  print("Specify just one of color-averaging-in-ale, color-maximizing-in-gs, color-maximizing-in-gs, color-no-change-in-gs")
-  sys.exit(1)
-
-if args.stack_frames_in_gs:
-  if args.frames_skip_in_gs is None:
-    args.frames_skip_in_gs = 4
-  args.frames_skip_in_ale = 1
-elif args.color_averaging_in_ale:
-  if args.frames_skip_in_ale is None:
-    args.frames_skip_in_ale = 4
-  args.frames_skip_in_gs = 1
-elif args.color_maximizing_in_gs:
-  if args.frames_skip_in_gs is None:
-    args.frames_skip_in_gs = 4
-  args.frames_skip_in_ale = 1
-elif args.color_averaging_in_gs:
-  if args.frames_skip_in_gs is None:
-    args.frames_skip_in_gs = 4
-  args.frames_skip_in_ale = 1
-elif args.color_no_change_in_gs:
-  if args.frames_skip_in_gs is None:
-    args.frames_skip_in_gs = 1 # Actually OpenAI Gym skip 2 - 4 frames randomly
-  args.frames_skip_in_ale = 1
-else:
-  print("Internal Error in option.py")
-  sys.exit(1)
-
-if args.max_time_step is None:
-  args.max_time_step = args.max_mega_step * 10**6
-if args.end_time_step is None:
-  args.end_time_step = args.end_mega_step * 10**6
-if args.save_time_interval is None:
-  args.save_time_interval = args.save_mega_interval * 10**6
-
-if args.max_play_steps is None:
-  args.max_play_steps = sec_to_steps(args, args.max_play_time)
-
-if args.basic_income is None:
-  args.basic_income = 1.0 / sec_to_steps(args, args.basic_income_time)
-if args.basic_income < 1e-10:
-  args.basic_income = 0.0
-
-if args.no_reward_steps is None:
-  args.no_reward_steps = sec_to_steps(args, args.no_reward_time)
-
-if args.randomness_steps is None:
-  args.randomness_steps = sec_to_steps(args, args.randomness_time)
-if args.randomness is None:
-  args.randomness = 1.0 / args.randomness_steps
-if args.randomness_log_interval is None:
-  args.randomness_log_interval = args.randomness_steps / args.randomness_log_num
-
-def peekActionSize(rom):
+class Options(argparse.Namespace):
+  # action_size is looked up (and cached) at first access, because it needs
+  # ALE and ROM (or gym)
+  @property
+  def action_size(self):
+    if self._action_size is None:
+      self._action_size = get_action_size(self)
+    return self._action_size
+
+  @action_size.setter
+  def action_size(self, value):
+    self._action_size = value
+
+# cache of action set sizes: key of ROM or env -> action size
+ACTION_SIZE_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache",
+                                      "async_deep_reinforce", "action_size.json")
+_action_sizes = {}
+
+def _action_size_key(args):
+  if args.use_gym:
+    return "gym:" + args.gym_env
+  elif args.fake_ale is not None:
+    return "fake_ale:" + _file_key(args.fake_ale)
+  else:
+    return "rom:" + _file_key(args.rom)
+
+def _file_key(path):
+  # key changes when file is replaced
+  if not os.path.exists(path):
+    return path
+  stat = os.stat(path)
+  return "{}:{}:{}".format(os.path.abspath(path), stat.st_size, int(stat.st_mtime))
+
+def _load_action_size_cache():
+  try:
+    with open(ACTION_SIZE_CACHE_FILE) as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return {}
+
+def _save_action_size_cache(cache):
+  try:
+    cache_dir = os.path.dirname(ACTION_SIZE_CACHE_FILE)
+    if not os.path.exists(cache_dir):
+      os.makedirs(cache_dir)
+    with open(ACTION_SIZE_CACHE_FILE + ".tmp", "w") as f:
+      json.dump(cache, f, indent=2)
+    os.replace(ACTION_SIZE_CACHE_FILE + ".tmp", ACTION_SIZE_CACHE_FILE)
+  except (IOError, OSError):
+    pass # cache is optional
+
+def get_action_size(args):
+  key = _action_size_key(args)
+  if key not in _action_sizes:
+    cache = _load_action_size_cache()
+    if key not in cache:
+      cache[key] = peek_action_size(args)
+      _save_action_size_cache(cache)
+    _action_sizes[key] = cache[key]
+  return _action_sizes[key]
+
+def peek_action_size(args):
   if args.use_gym:
     import gym
     env = gym.make(args.gym_env)
     return env.action_space.n
+  elif args.fake_ale is not None:
+    from fake_ale import FakeALEInterface
+    return len(FakeALEInterface(args.fake_ale).getMinimalActionSet())
   else:
     from ale_python_interface import ALEInterface
     ale = ALEInterface()
-    ale.loadROM(rom.encode('ascii'))
+    ale.loadROM(args.rom.encode('ascii'))
     return len(ale.getMinimalActionSet())
 
-args.action_size = peekActionSize(args.rom)
+def parse_options(argv=None):
+  # options from ARGV (sys.argv[1:] if None)
+  # parse_options([]) makes options with default values
+  args = parser.parse_args(argv, namespace=Options())
+
+  convert_boolean_arg(args, "save_best_avg_only")
+  convert_boolean_arg(args, "sync_thread")
+  convert_boolean_arg(args, "use_gym")
+  convert_boolean_arg(args, "use_gpu")
+  convert_boolean_arg(args, "use_lstm")
+  convert_boolean_arg(args, "terminate_on_lives_lost")
+  convert_boolean_arg(args, "train_in_eval")
+  convert_boolean_arg(args, "psc_use")
+  convert_boolean_arg(args, "psc_multi")
+  convert_boolean_arg(args, "color_averaging_in_ale")
+  convert_boolean_arg(args, "color_maximizing_in_gs")
+  convert_boolean_arg(args, "color_averaging_in_gs")
+  convert_boolean_arg(args, "color_no_change_in_gs")
+  convert_boolean_arg(args, "stack_frames_in_gs")
+  convert_boolean_arg(args, "crop_frame")
+  convert_boolean_arg(args, "compress_frame")
+  convert_boolean_arg(args, "reset_max_reward")
+  convert_boolean_arg(args, "tes_extend")
+  convert_boolean_arg(args, "clear_history_on_death")
+  convert_boolean_arg(args, "clear_history_after_ohl")
+  convert_boolean_arg(args, "record_all_non0_record")
+  convert_boolean_arg(args, "phase_timing")
+  convert_boolean_arg(args, "log_sink")
+  convert_boolean_arg(args, "shared_graph")
+  convert_boolean_arg(args, "memory_accounting")
+  convert_boolean_arg(args, "actor_snapshots")
+  convert_boolean_arg(args, "pbt_copy_psc")
+  convert_boolean_arg(args, "display")
+  convert_boolean_arg(args, "verbose")
+  convert_boolean_arg(args, "gym_eval")
+
+  # Read in options in yaml file
+  if args.yaml is not None:
+    print("yaml=", args.yaml)
+    options_str = open(args.yaml).read()
+    print("content of yaml file:")
+    print(options_str)
+    print("")
+
+    import yaml
+    options_yaml = yaml.load(options_str)
+    if 'psc_beta_list' in options_yaml.keys():
+      args.psc_beta_list = options_yaml['psc_beta_list']
+    if 'psc_pow_list' in options_yaml.keys():
+      args.psc_pow_list = options_yaml['psc_pow_list']
+    if 'tes_list' in options_yaml.keys():
+      args.tes_list = options_yaml['tes_list']
+
+  if args.psc_beta_list is not None:
+    args.psc_beta_list = [float(s) for s in args.psc_beta_list.split(",")]
+    if len(args.psc_beta_list) == 1:
+      args.psc_beta_list = args.psc_beta_list * args.parallel_size
+    elif len(args.psc_beta_list) != args.parallel_size:
+      print("len(psc_beta_list) != parallel_size: psc_beta_list=", args.psc_beta_list)
+      sys.exit(1)
+    print("psc_beta_list=", args.psc_beta_list)
+
+  if args.psc_pow_list is not None:
+    args.psc_pow_list = [float(s) for s in args.psc_pow_list.split(",")]
+    if len(args.psc_pow_list) == 1:
+      args.psc_pow_list = args.psc_pow_list * args.parallel_size
+    elif len(args.psc_pow_list) != args.parallel_size:
+      print("len(psc_pow_list) != parallel_size: psc_pow_list=", args.psc_pow_list)
+      sys.exit(1)
+    print("psc_pow_list=", args.psc_pow_list)
+
+  if args.tes_list is not None:
+    args.tes_list = [int(s) for s in args.tes_list.split(",")]
+    if len(args.tes_list) == 1:
+      args.tes_list = args.tes_list * args.parallel_size
+    elif len(args.tes_list) != args.parallel_size:
+      print("len(tes_list) != parallel_size: tes_list=", args.tes_list)
+      sys.exit(1)
+    print("tes_list=", args.tes_list)
+
+  if args.gym_eval:
+    if args.record_screen_dir is None:
+      print("add --record-screen-dir=RECORD_SCREEN_DIR when --gym-eval=True")
+      sys.exit(1)
+
+  if args.use_gym:
+    args.rom = args.gym_env
+    args.color_averaging_in_ale = False
+    args.color_averaging_in_gs = False
+    args.color_maximizing_in_gs = False
+    args.color_no_change_in_gs = True
+    if args.stack_frames_in_gs:
+      print("Can not specify stack-frames-in-gs because OpenAI Gym skips 2 - 4 frames randomly")
+      sys.exit(1)
+    # Requirement for OpenAI Gym
+    args.terminate_on_lives_lost = False
+    args.tes_extend = False
+    args.clear_history_on_death = False
+
+  num_color_options = 0
+  if args.color_averaging_in_ale:
+    num_color_options += 1
+  if args.color_maximizing_in_gs:
+    num_color_options += 1
+  if args.color_averaging_in_gs:
+    num_color_options += 1
+  if args.color_no_change_in_gs:
+    num_color_options += 1
+  if num_color_options != 1:
+    print("Specify just one of color-averaging-in-ale, color-maximizing-in-gs, color-maximizing-in-gs, color-no-change-in-gs")
+    sys.exit(1)
+
+  if args.stack_frames_in_gs:
+    if args.frames_skip_in_gs is None:
+      args.frames_skip_in_gs = 4
+    args.frames_skip_in_ale = 1
+  elif args.color_averaging_in_ale:
+    if args.frames_skip_in_ale is None:
+      args.frames_skip_in_ale = 4
+    args.frames_skip_in_gs = 1
+  elif args.color_maximizing_in_gs:
+    if args.frames_skip_in_gs is None:
+      args.frames_skip_in_gs = 4
+    args.frames_skip_in_ale = 1
+  elif args.color_averaging_in_gs:
+    if args.frames_skip_in_gs is None:
+      args.frames_skip_in_gs = 4
+    args.frames_skip_in_ale = 1
+  elif args.color_no_change_in_gs:
+    if args.frames_skip_in_gs is None:
+      args.frames_skip_in_gs = 1 # Actually OpenAI Gym skip 2 - 4 frames randomly
+    args.frames_skip_in_ale = 1
+  else:
+    print("Internal Error in option.py")
+    sys.exit(1)
 
-options = args
-if options.verbose:
-  print("******************** options ********************")
-  print(options)
-  print("*************************************************")
+  if args.max_time_step is None:
+    args.max_time_step = args.max_mega_step * 10**6
+  if args.end_time_step is None:
+    args.end_time_step = args.end_mega_step * 10**6
+  if args.save_time_interval is None:
+    args.save_time_interval = args.save_mega_interval * 10**6
+
+  if args.max_play_steps is None:
+    args.max_play_steps = sec_to_steps(args, args.max_play_time)
+
+  if args.basic_income is None:
+    args.basic_income = 1.0 / sec_to_steps(args, args.basic_income_time)
+  if args.basic_income < 1e-10:
+    args.basic_income = 0.0
+
+  if args.no_reward_steps is None:
+    args.no_reward_steps = sec_to_steps(args, args.no_reward_time)
+
+  if args.randomness_steps is None:
+    args.randomness_steps = sec_to_steps(args, args.randomness_time)
+  if args.randomness is None:
+    args.randomness = 1.0 / args.randomness_steps
+  if args.randomness_log_interval is None:
+    args.randomness_log_interval = args.randomness_steps / args.randomness_log_num
+  return args
+
+# options of command line (parsed by first get_options() of entry point)
+_options = None
+
+def get_options():
+  global _options
+  if _options is None:
+    _options = parse_options()
+    if _options.verbose:
+      print("******************** options ********************")
+      print(_options)
+      print("*************************************************")
+  return _options
 
 
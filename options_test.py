@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+import options
+
+class TestOptions(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.cache_file = options.ACTION_SIZE_CACHE_FILE
+    options.ACTION_SIZE_CACHE_FILE = os.path.join(self.dir, "action_size.json")
+    options._action_sizes.clear()
+
+  def tearDown(self):
+    options.ACTION_SIZE_CACHE_FILE = self.cache_file
+    options._action_sizes.clear()
+    shutil.rmtree(self.dir)
+
+  def test_parse_options(self):
+    default = options.parse_options([])
+    self.assertEqual(options.LOCAL_T_MAX, default.local_t_max)
+    self.assertEqual(4, default.frames_skip_in_ale)
+    lstm = options.parse_options(["--use-lstm=True", "--local-t-max=20"])
+    self.assertTrue(lstm.use_lstm)
+    self.assertEqual(20, lstm.local_t_max)
+    self.assertFalse(default.use_lstm)
+
+  def test_action_size_cache(self):
+    args = options.parse_options(["--fake-ale=synthetic"])
+    self.assertFalse(os.path.exists(options.ACTION_SIZE_CACHE_FILE))
+    self.assertEqual(18, args.action_size)
+    self.assertTrue(os.path.exists(options.ACTION_SIZE_CACHE_FILE))
+    # looked up from cache file in new process
+    options._action_sizes.clear()
+    peek_action_size = options.peek_action_size
+    options.peek_action_size = None
+    try:
+      self.assertEqual(18, options.parse_options(["--fake-ale=synthetic"]).action_size)
+    finally:
+      options.peek_action_size = peek_action_size
+
+  def test_action_size_option(self):
+    self.assertEqual(6, options.parse_options(["--action-size=6"]).action_size)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# Population-based training over actor threads (--pbt-interval > 0).
+# Every pbt_interval global steps, threads which played at least
+# --pbt-ready-episodes episodes since their last change are ranked by
+# Episode_scores average. Each thread in the bottom --pbt-fraction copies
+# hyperparameters (tes, psc_beta, psc_pow) of a random thread in the top
+# fraction, each multiplied by 1 +/- --pbt-perturb (explore), and with
+# --pbt-copy-psc also its pseudo-count tables. Weights are already shared by all
+# threads (global network), so only hyperparameters and per-thread state are
+# copied. Copies are logged as [PBT] lines and "pbt" events, and kept in
+# history, so lineage of hyperparameters of each thread can be traced.
+# Threads are changed by thread 0 without lock; other threads see new values
+# from their next step (a few updates of pseudo-count of the old table can be
+# lost).
+
+HYPERPARAMETERS = ("tes", "psc_beta", "psc_pow")
+# rounded, and at least 1
+INTEGER_HYPERPARAMETERS = ("tes",)
+
+def exploit_pairs(scores, fraction, rng):
+  # (loser, winner) indices: each of bottom FRACTION of SCORES copies one of top
+  n = len(scores)
+  k = min(max(1, int(n * fraction)), n // 2)
+  order = sorted(range(n), key=lambda i: scores[i], reverse=True)
+  top = order[:k]
+  bottom = order[n - k:]
+  return [(loser, top[rng.randint(len(top))]) for loser in bottom]
+
+def perturb(hyperparameters, factor, rng, names=HYPERPARAMETERS):
+  new = dict(hyperparameters)
+  for name in names:
+    if name not in new:
+      continue
+    value = new[name] * (1.0 + factor if rng.randint(2) == 0 else 1.0 - factor)
+    if name in INTEGER_HYPERPARAMETERS:
+      value = max(1, int(round(value)))
+    new[name] = value
+  return new
+
+
+class PBTScheduler(object):
+  def __init__(self, interval, fraction=0.25, perturb_factor=0.2, ready_episodes=20,
+               copy_psc=True, names=HYPERPARAMETERS, seed=0):
+    self.interval = interval
+    self.fraction = fraction
+    self.perturb_factor = perturb_factor
+    self.ready_episodes = ready_episodes
+    self.copy_psc = copy_psc
+    self.names = names
+    self.rng = np.random.RandomState(seed)
+    self.next_step = interval
+    # list of (global_t, thread, parent)
+    self.history = []
+
+  def step(self, global_t, threads):
+    """Exploit and explore among THREADS (A3CTrainingThread).
+
+    Returns list of records (dict) of copies.
+    """
+    self.next_step = (global_t // self.interval + 1) * self.interval
+    ready = [thread for thread in threads
+             if thread.episode_scores.num_episode >= self.ready_episodes]
+    if len(ready) < 2:
+      return []
+    scores = [thread.episode_scores.average() for thread in ready]
+    records = []
+    for loser_index, winner_index in exploit_pairs(scores, self.fraction, self.rng):
+      loser = ready[loser_index]
+      winner = ready[winner_index]
+      old = loser.get_hyperparameters()
+      new = perturb(winner.get_hyperparameters(), self.perturb_factor, self.rng, self.names)
+      loser.set_hyperparameters(new)
+      if self.copy_psc:
+        loser.copy_state_from(winner)
+      loser.reset_episode_scores()
+      self.history.append((global_t, loser.thread_index, winner.thread_index))
+      records.append({"s": global_t, "th": loser.thread_index, "parent": winner.thread_index,
+                      "score": scores[loser_index], "parent_score": scores[winner_index],
+                      "old": old, "new": new})
+    return records
+
+  def ancestry(self, thread_index):
+    # [(global_t, parent), ...] of hyperparameters of thread (latest first)
+    ancestors = []
+    global_t = None
+    for s, th, parent in reversed(self.history):
+      if th == thread_index and (global_t is None or s < global_t):
+        ancestors.append((s, parent))
+        thread_index = parent
+        global_t = s
+    return ancestors
+
+  def state(self, threads):
+    # saved with checkpoint (pbt.STEP)
+    return {"next_step": self.next_step,
+            "history": self.history,
+            "hyperparameters": [thread.get_hyperparameters() for thread in threads]}
+
+  def load_state(self, state, threads):
+    self.next_step = state["next_step"]
+    self.history = [tuple(record) for record in state["history"]]
+    if len(state["hyperparameters"]) == len(threads):
+      for thread, hyperparameters in zip(threads, state["hyperparameters"]):
+        thread.set_hyperparameters(hyperparameters)
+
+
+def format_record(record):
+  new = record["new"]
+  return "[PBT]s={:9d},th={}<th={}:score={:.1f}<{:.1f},{}".format(
+    record["s"], record["th"], record["parent"], record["score"], record["parent_score"],
+    ",".join("{}={:.4g}".format(name, new[name]) for name in HYPERPARAMETERS if name in new))
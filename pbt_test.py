@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+import numpy as np
+
+import pbt
+from pbt import PBTScheduler
+
+class FakeScores(object):
+  def __init__(self, average, num_episode):
+    self._average = average
+    self.num_episode = num_episode
+
+  def average(self):
+    return self._average
+
+class FakeThread(object):
+  # interface of A3CTrainingThread used by PBTScheduler
+  def __init__(self, thread_index, average, num_episode=100):
+    self.thread_index = thread_index
+    self.episode_scores = FakeScores(average, num_episode)
+    self.hyperparameters = {"tes": 30 + thread_index, "psc_beta": 0.01 * (thread_index + 1),
+                            "psc_pow": 2.0}
+    self.psc_vcount = np.full(3, float(thread_index))
+
+  def get_hyperparameters(self):
+    return dict(self.hyperparameters)
+
+  def set_hyperparameters(self, hyperparameters):
+    self.hyperparameters = dict(hyperparameters)
+
+  def copy_state_from(self, thread):
+    self.psc_vcount = thread.psc_vcount.copy()
+
+  def reset_episode_scores(self):
+    self.episode_scores = FakeScores(0.0, 0)
+
+class TestPBT(unittest.TestCase):
+  def test_exploit_pairs(self):
+    rng = np.random.RandomState(0)
+    scores = [5.0, 1.0, 8.0, 0.0, 3.0, 9.0, 2.0, 4.0]
+    pairs = pbt.exploit_pairs(scores, 0.25, rng)
+    self.assertEqual([1, 3], sorted(loser for loser, _ in pairs))
+    self.assertTrue(all(winner in [2, 5] for _, winner in pairs))
+    # at most half of threads are replaced
+    self.assertEqual(1, len(pbt.exploit_pairs([1.0, 2.0, 3.0], 0.9, rng)))
+
+  def test_perturb(self):
+    rng = np.random.RandomState(0)
+    for _ in range(10):
+      new = pbt.perturb({"tes": 30, "psc_beta": 0.02, "psc_pow": 2.0}, 0.2, rng)
+      self.assertIn(new["tes"], [24, 36])
+      self.assertTrue(np.isclose(new["psc_beta"], 0.016) or np.isclose(new["psc_beta"], 0.024))
+      self.assertTrue(np.isclose(new["psc_pow"], 1.6) or np.isclose(new["psc_pow"], 2.4))
+    self.assertEqual({"tes": 1}, pbt.perturb({"tes": 1}, 0.2, rng))
+
+  def test_step(self):
+    threads = [FakeThread(i, average) for i, average in enumerate([10.0, 0.0, 50.0, 5.0])]
+    threads[3].episode_scores.num_episode = 5 # not ready
+    scheduler = PBTScheduler(1000, fraction=0.25, perturb_factor=0.2, ready_episodes=20)
+    records = scheduler.step(1500, threads)
+    self.assertEqual(2000, scheduler.next_step)
+    self.assertEqual(1, len(records))
+    record = records[0]
+    self.assertEqual((1, 2), (record["th"], record["parent"]))
+    self.assertEqual((0.0, 50.0), (record["score"], record["parent_score"]))
+    self.assertIn(threads[1].hyperparameters["tes"], [26, 38])
+    self.assertEqual([2.0, 2.0, 2.0], threads[1].psc_vcount.tolist())
+    self.assertEqual(0, threads[1].episode_scores.num_episode)
+    self.assertIn("[PBT]s=     1500,th=1<th=2:score=0.0<50.0,tes=", pbt.format_record(record))
+    # replaced thread is not ready
+    threads[0].episode_scores._average = -1.0
+    self.assertEqual([(0, 2)], [(r["th"], r["parent"]) for r in scheduler.step(2000, threads)])
+
+  def test_ancestry_and_state(self):
+    threads = [FakeThread(i, 0.0) for i in range(3)]
+    scheduler = PBTScheduler(100)
+    scheduler.history = [(100, 1, 0), (200, 2, 1), (300, 1, 2), (400, 0, 2)]
+    self.assertEqual([(400, 2), (200, 1), (100, 0)], scheduler.ancestry(0))
+    self.assertEqual([(300, 2), (200, 1), (100, 0)], scheduler.ancestry(1))
+    self.assertEqual([], PBTScheduler(100).ancestry(1))
+
+    threads[2].hyperparameters["tes"] = 99
+    state = json.loads(json.dumps(scheduler.state(threads)))
+    loaded = [FakeThread(i, 0.0) for i in range(3)]
+    scheduler2 = PBTScheduler(100)
+    scheduler2.load_state(state, loaded)
+    self.assertEqual(99, loaded[2].hyperparameters["tes"])
+    self.assertEqual(scheduler.history, scheduler2.history)
+    self.assertEqual(scheduler.next_step, scheduler2.next_step)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+
+# Per-thread timers of phases in hot path (A3CTrainingThread.process() and
+# GameState.process()).
+# lap(phase) adds the time since previous lap to phase, so consecutive laps
+# partition the time of process() into phases.
+# Times are aggregated into histograms with buckets of 1us * 2^k.
+# stats are cumulative since start (table printed at checkpoint), and
+# interval_stats are reset at each write of TensorBoard summaries, so the
+# histograms of summaries cover the last interval only.
+
+NUM_BUCKETS = 26 # up to 2^25 us (about 33 sec)
+BUCKET_LIMITS = [1e-6 * (2 ** k) for k in range(NUM_BUCKETS)]
+
+class PhaseStats(object):
+  # histogram of values with buckets of unit * 2^k (unit=1e-6 for times)
+  def __init__(self, unit=1e-6):
+    self.unit = unit
+    if unit == 1e-6:
+      self.bucket_limits = BUCKET_LIMITS
+    else:
+      self.bucket_limits = [unit * (2 ** k) for k in range(NUM_BUCKETS)]
+    self.num = 0
+    self.sum = 0.0
+    self.sum_squares = 0.0
+    self.min = float("inf")
+    self.max = 0.0
+    self.buckets = [0] * NUM_BUCKETS
+
+  def add(self, dt):
+    self.num += 1
+    self.sum += dt
+    self.sum_squares += dt * dt
+    if dt < self.min:
+      self.min = dt
+    if dt > self.max:
+      self.max = dt
+    # dt < unit * 2^k
+    k = math.frexp(dt / self.unit)[1]
+    if k < 0:
+      k = 0
+    elif k >= NUM_BUCKETS:
+      k = NUM_BUCKETS - 1
+    self.buckets[k] += 1
+
+  def merge(self, other):
+    self.num += other.num
+    self.sum += other.sum
+    self.sum_squares += other.sum_squares
+    self.min = min(self.min, other.min)
+    self.max = max(self.max, other.max)
+    self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+  def percentile(self, q):
+    # upper limit of bucket which includes q-th percentile
+    if self.num == 0:
+      return 0.0
+    threshold = self.num * q / 100.0
+    count = 0
+    for k, n in enumerate(self.buckets):
+      count += n
+      if count >= threshold:
+        return min(self.bucket_limits[k], self.max)
+    return self.max
+
+  def histogram_proto(self):
+    import tensorflow as tf
+    histo = tf.HistogramProto(min=self.min, max=self.max, num=self.num,
+                              sum=self.sum, sum_squares=self.sum_squares)
+    # skip empty buckets at both ends
+    used = [k for k, n in enumerate(self.buckets) if n > 0]
+    for k in range(used[0], used[-1] + 1):
+      histo.bucket_limit.append(self.bucket_limits[k])
+      histo.bucket.append(self.buckets[k])
+    return histo
+
+
+class PhaseTimer(object):
+  enabled = True
+
+  def __init__(self, thread_index):
+    self.thread_index = thread_index
+    self.phases = [] # phases in order of first lap
+    self.stats = {}
+    self.interval_stats = {}
+    self.mark = time.time()
+
+  def start(self):
+    self.mark = time.time()
+
+  def lap(self, phase):
+    now = time.time()
+    stats = self.stats.get(phase)
+    if stats is None:
+      stats = PhaseStats()
+      self.stats[phase] = stats
+      self.interval_stats[phase] = PhaseStats()
+      self.phases.append(phase)
+    dt = now - self.mark
+    stats.add(dt)
+    self.interval_stats[phase].add(dt)
+    self.mark = now
+
+  def take_interval_stats(self):
+    # [(phase, stats since previous call)] (stats are reset)
+    interval = []
+    for phase in list(self.phases):
+      stats = self.interval_stats[phase]
+      if stats.num > 0:
+        interval.append((phase, stats))
+        self.interval_stats[phase] = PhaseStats()
+    return interval
+
+  def write_summaries(self, summary_writer, global_t):
+    import tensorflow as tf
+    values = []
+    for phase, stats in self.take_interval_stats():
+      tag = "timing/th{}/{}".format(self.thread_index, phase)
+      values.append(tf.Summary.Value(tag=tag, histo=stats.histogram_proto()))
+    if len(values) > 0:
+      summary_writer.add_summary(tf.Summary(value=values), global_t)
+
+
+# timer used when --phase-timing=False
+class NullPhaseTimer(object):
+  enabled = False
+
+  def start(self):
+    pass
+
+  def lap(self, phase):
+    pass
+
+  def write_summaries(self, summary_writer, global_t):
+    pass
+
+
+def format_table(timers):
+  # table of phase times aggregated over all threads (cumulative since start)
+  phases = []
+  total = {}
+  for timer in timers:
+    if not timer.enabled:
+      continue
+    for phase in list(timer.phases):
+      if phase not in total:
+        total[phase] = PhaseStats()
+        phases.append(phase)
+      total[phase].merge(timer.stats[phase])
+
+  sum_all = sum(stats.sum for stats in total.values())
+  if sum_all == 0.0:
+    sum_all = 1.0
+  lines = ["### Timing : cumulative since start, all threads",
+           "### Timing : {:14s} {:>10s} {:>10s} {:>6s} {:>10s} {:>10s} {:>10s}".format(
+           "phase", "count", "total(s)", "%", "mean(us)", "p50(us)", "p99(us)")]
+  for phase in phases:
+    stats = total[phase]
+    lines.append("### Timing : {:14s} {:10d} {:10.1f} {:6.2f} {:10.1f} {:10.1f} {:10.1f}".format(
+                 phase, stats.num, stats.sum, stats.sum * 100.0 / sum_all,
+                 stats.sum * 1e6 / max(stats.num, 1),
+                 stats.percentile(50) * 1e6, stats.percentile(99) * 1e6))
+  return "\n".join(lines)
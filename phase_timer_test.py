@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from phase_timer import PhaseTimer, format_table
+
+class TestPhaseTimer(unittest.TestCase):
+  def test_interval_stats(self):
+    timer = PhaseTimer(0)
+    for _ in range(3):
+      timer.start()
+      timer.lap("sync")
+      timer.lap("inference")
+    interval = timer.take_interval_stats()
+    self.assertEqual(["sync", "inference"], [phase for phase, _ in interval])
+    self.assertEqual([3, 3], [stats.num for _, stats in interval])
+
+    # reset after report, cumulative stats are kept
+    timer.start()
+    timer.lap("inference")
+    interval = timer.take_interval_stats()
+    self.assertEqual([("inference", 1)], [(phase, stats.num) for phase, stats in interval])
+    self.assertEqual([], timer.take_interval_stats())
+    self.assertEqual(3, timer.stats["sync"].num)
+    self.assertEqual(4, timer.stats["inference"].num)
+
+    lines = format_table([timer]).split("\n")
+    self.assertIn("cumulative", lines[0])
+    self.assertEqual(4, len(lines))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,9 +1,10 @@
-import numpy as np
 import argparse
 import time
 import re
 import sys
-from operator import itemgetter
+from log_store import SortedRows, MovingAverage, PartitionedRows
+from event_log import EventReader
+from log_index import LogIndex
 
 parser = argparse.ArgumentParser(description="plot data in A3C log file and update it periodically")
 parser.add_argument('filename')
@@ -29,8 +30,14 @@ parser.add_argument('--save', action='store_true',
                     help="save graph to file 'filename.png' and don't display it")
 parser.add_argument('-i', '--info', choices=["r", "lives", "s", "tes", "v", "pr"], default="r",
                     help="information in y-axis : r (reward), lives (OHL), s (OHL) tes (OHL), v, pr (psc-reward)")
+parser.add_argument('--events', action='store_true',
+                    help="FILENAME is structured event stream (--event-log) instead of log")
+parser.add_argument('--index', action='store_true',
+                    help="read FILENAME through columnar index FILENAME.index (see log_index.py)")
 
 def read_data(f):
+  if args.events or args.index:
+    return reader.read_info(info, args.endmark)
   data = []
   line = f.readline()
   while line != "":
@@ -43,23 +50,18 @@ def read_data(f):
     line = f.readline()
   return data
 
-def draw_graph(ax, data):
+def draw_graph(ax, rows, start):
   ans = args.ans
-  if len(data) < 5:
+  if len(rows) < 5:
     return
-  elif len(data) < args.ans:
-    ans = len(data) - 1
-
-# sort data along args.x_column and make it np.array again
-  data = sorted(data, key=itemgetter(args.x_column))
-  data = np.array(data)
-
-  x = data[:, args.x_column]
-  y = data[:, args.y_column]
-  x_max = np.max(x)
-  x_min = np.min(x)
-  y_max = np.max(y)
-  y_min = np.min(y)
+  elif len(rows) < args.ans:
+    ans = len(rows) - 1
+
+  x = rows.column(args.x_column)
+  y = rows.column(args.y_column)
+  x_max = rows.max[args.x_column]
+  y_max = rows.max[args.y_column]
+  y_min = rows.min[args.y_column]
   # print("ymax=", y_max, "ymin=", y_min)
   y_width = y_max - y_min
   if y_width == 0:
@@ -76,33 +78,21 @@ def draw_graph(ax, data):
   x = x / args.scale
   ax.plot(x, y, ',')
 
-  weight = np.ones(ans, dtype=np.float)/ans
-  y_average = np.convolve(y, weight, 'valid')
-  rim = ans - 1
-  rim_l = rim // 2
-  rim_r = rim - rim_l
-  ax.plot(x[rim_l:-rim_r], y_average)
+  moving_average.update(start, ans)
+  ax.plot(moving_average.x(args.x_column) / args.scale, moving_average.average())
 
   ax.set_xlabel(args.xlabel)
   ax.set_ylabel(args.ylabel)
 
   ax.grid(linewidth=1, linestyle="-", alpha=0.1)
 
-def draw_ohl_graph(ax, data):
-
-# sort data along args.x_column and make it np.array again
-  all_data = sorted(data, key=itemgetter(args.x_column))
-  scores = list({e[0] for e in all_data})
-  scores.sort()
+def draw_ohl_graph(ax, partitions):
+  scores = partitions.keys()
   print("scores=", scores)
 
-  np_all_data = np.array(all_data)
-  all_x = np_all_data[:, args.x_column]
-  all_y = np_all_data[:, args.y_column]
-  x_max = np.max(all_x)
-  x_min = np.min(all_x)
-  y_max = np.max(all_y)
-  y_min = np.min(all_y)
+  x_max = max(partitions[score].max[args.x_column] for score in scores)
+  y_max = max(partitions[score].max[args.y_column] for score in scores)
+  y_min = min(partitions[score].min[args.y_column] for score in scores)
   # print("ymax=", y_max, "ymin=", y_min)
   y_width = y_max - y_min
   if y_width == 0:
@@ -116,32 +106,30 @@ def draw_ohl_graph(ax, data):
   ax.set_ylim(ymax = y_max + y_width * 0.05)
   ax.set_ylim(ymin = y_min - y_width * 0.05)
 
+  starts = partitions.take_starts()
   for score in scores:
     # print("score=", score)
-    data = list(filter(lambda e: e[0] == score, all_data))
-
-    data = np.array(data)
-
-    x = data[:, args.x_column]
-    y = data[:, args.y_column]
-    x = x / args.scale
+    rows = partitions[score]
+    x = rows.column(args.x_column) / args.scale
+    y = rows.column(args.y_column)
 
     ans = args.ans
-    if len(data) < 5:
+    if len(rows) < 5:
       ax.plot(x, y, '.', label=str(score))
       continue
-    elif len(data) * 0.1 < args.ans:
-      ans = int(len(data) * 0.1)
+    elif len(rows) * 0.1 < args.ans:
+      ans = int(len(rows) * 0.1)
       if ans < 4:
         ans = 4
     # print("ans=", ans)
 
-    weight = np.ones(ans, dtype=np.float)/ans
-    y_average = np.convolve(y, weight, 'valid')
-    rim = ans - 1
-    rim_l = rim // 2
-    rim_r = rim - rim_l
-    ax.plot(x[rim_l:-rim_r], y_average, label=str(score))
+    moving_average = moving_averages.get(score)
+    if moving_average is None:
+      moving_average = MovingAverage(rows, args.y_column)
+      moving_averages[score] = moving_average
+    moving_average.update(starts.get(score, len(rows)), ans)
+    ax.plot(moving_average.x(args.x_column) / args.scale, moving_average.average(),
+            label=str(score))
 
   ax.legend(loc=2)
   ax.set_xlabel(args.xlabel)
@@ -186,23 +174,35 @@ if args.save:
   mpl.use('Agg')
 import matplotlib.pyplot as plt
 
+info = args.info
+if args.events:
+  reader = EventReader(args.filename)
+elif args.index:
+  reader = LogIndex(args.filename)
 f = open(args.filename, "r")
 prog = re.compile(pattern)
 
-data = []
+if ohl:
+  partitions = PartitionedRows(3, args.x_column, 0)
+  moving_averages = {}
+else:
+  rows = SortedRows(3, args.x_column)
+  moving_average = MovingAverage(rows, args.y_column)
+
 fig = plt.figure(args.title)
 ax = fig.add_subplot(111)
 while True:
   new_data = read_data(f)
   print(len(new_data), "data added.")
   if (len(new_data) > 0):
-      data.extend(new_data)
       ax.clear()
       ax.set_title(args.title)
       if ohl:
-        draw_ohl_graph(ax, data)
+        partitions.add(new_data)
+        draw_ohl_graph(ax, partitions)
       else:
-        draw_graph(ax, data)
+        start = rows.add(new_data)
+        draw_graph(ax, rows, start)
   if args.save:
     savefilename = args.title + ".png"
     plt.savefig(savefilename)
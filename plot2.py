@@ -3,7 +3,9 @@ import argparse
 import time
 import re
 import sys
-from operator import itemgetter
+from log_store import SortedRows, MovingAverage, PartitionedRows
+from event_log import EventReader
+from log_index import LogIndex
 
 parser = argparse.ArgumentParser(description="plot data in A3C log file and update it periodically")
 parser.add_argument('filename')
@@ -41,8 +43,14 @@ parser.add_argument('-uc', '--unit-of-class', type=int, default=100000,
                     help="unit of class in x-axis for -i RO, -i k , -i R")
 parser.add_argument('-er', '--except-rooms', default="0, 1",
                     help="rooms except EXCEPT-ROOMS")
+parser.add_argument('--events', action='store_true',
+                    help="FILENAME is structured event stream (--event-log) instead of log")
+parser.add_argument('--index', action='store_true',
+                    help="read FILENAME through columnar index FILENAME.index (see log_index.py)")
 
 def read_data(f):
+  if args.events or args.index:
+    return reader.read_info(info, args.endmark)
   data = []
   line = f.readline()
   while line != "":
@@ -55,23 +63,18 @@ def read_data(f):
     line = f.readline()
   return data
 
-def draw_graph(ax, data):
+def draw_graph(ax, rows, start):
   ans = args.ans
-  if len(data) < 5:
+  if len(rows) < 5:
     return
-  elif len(data) < args.ans:
-    ans = len(data) - 1
-
-# sort data along args.x_column and make it np.array again
-  data = sorted(data, key=itemgetter(args.x_column))
-  data = np.array(data)
-
-  x = data[:, args.x_column]
-  y = data[:, args.y_column]
-  x_max = np.max(x)
-  x_min = np.min(x)
-  y_max = np.max(y)
-  y_min = np.min(y)
+  elif len(rows) < args.ans:
+    ans = len(rows) - 1
+
+  x = rows.column(args.x_column)
+  y = rows.column(args.y_column)
+  x_max = rows.max[args.x_column]
+  y_max = rows.max[args.y_column]
+  y_min = rows.min[args.y_column]
   # print("ymax=", y_max, "ymin=", y_min)
   y_width = y_max - y_min
   if y_width == 0:
@@ -89,33 +92,21 @@ def draw_graph(ax, data):
   ax.plot(x, y, ',')
 
   if args.info != "RO":
-    weight = np.ones(ans, dtype=np.float)/ans
-    y_average = np.convolve(y, weight, 'valid')
-    rim = ans - 1
-    rim_l = rim // 2
-    rim_r = rim - rim_l
-    ax.plot(x[rim_l:-rim_r], y_average)
+    moving_average.update(start, ans)
+    ax.plot(moving_average.x(args.x_column) / args.scale, moving_average.average())
 
   ax.set_xlabel(args.xlabel)
   ax.set_ylabel(args.ylabel)
 
   ax.grid(linewidth=1, linestyle="-", alpha=0.1)
 
-def draw_ohl_graph(ax, data):
-
-# sort data along args.x_column and make it np.array again
-  all_data = sorted(data, key=itemgetter(args.x_column))
-  scores = list({e[0] for e in all_data})
-  scores.sort()
+def draw_ohl_graph(ax, partitions):
+  scores = partitions.keys()
   print("scores=", scores)
 
-  np_all_data = np.array(all_data)
-  all_x = np_all_data[:, args.x_column]
-  all_y = np_all_data[:, args.y_column]
-  x_max = np.max(all_x)
-  x_min = np.min(all_x)
-  y_max = np.max(all_y)
-  y_min = np.min(all_y)
+  x_max = max(partitions[score].max[args.x_column] for score in scores)
+  y_max = max(partitions[score].max[args.y_column] for score in scores)
+  y_min = min(partitions[score].min[args.y_column] for score in scores)
   # print("ymax=", y_max, "ymin=", y_min)
   y_width = y_max - y_min
   if y_width == 0:
@@ -129,32 +120,30 @@ def draw_ohl_graph(ax, data):
   ax.set_ylim(ymax = y_max + y_width * 0.05)
   ax.set_ylim(ymin = y_min - y_width * 0.05)
 
+  starts = partitions.take_starts()
   for score in scores:
     # print("score=", score)
-    data = list(filter(lambda e: e[0] == score, all_data))
-
-    data = np.array(data)
-
-    x = data[:, args.x_column]
-    y = data[:, args.y_column]
-    x = x / args.scale
+    rows = partitions[score]
+    x = rows.column(args.x_column) / args.scale
+    y = rows.column(args.y_column)
 
     ans = args.ans
-    if len(data) < 5:
+    if len(rows) < 5:
       ax.plot(x, y, '.', label=str(score))
       continue
-    elif len(data) * 0.1 < args.ans:
-      ans = int(len(data) * 0.1)
+    elif len(rows) * 0.1 < args.ans:
+      ans = int(len(rows) * 0.1)
       if ans < 4:
         ans = 4
     # print("ans=", ans)
 
-    weight = np.ones(ans, dtype=np.float)/ans
-    y_average = np.convolve(y, weight, 'valid')
-    rim = ans - 1
-    rim_l = rim // 2
-    rim_r = rim - rim_l
-    ax.plot(x[rim_l:-rim_r], y_average, label=str(score))
+    moving_average = moving_averages.get(score)
+    if moving_average is None:
+      moving_average = MovingAverage(rows, args.y_column)
+      moving_averages[score] = moving_average
+    moving_average.update(starts.get(score, len(rows)), ans)
+    ax.plot(moving_average.x(args.x_column) / args.scale, moving_average.average(),
+            label=str(score))
 
   ax.legend(loc=0, fontsize="small")
   ax.set_xlabel(args.xlabel)
@@ -163,17 +152,11 @@ def draw_ohl_graph(ax, data):
   ax.grid(linewidth=1, linestyle="-", alpha=0.1)
 
 
-def draw_room_graph(ax, data):
-
-# sort data along args.x_column and make it np.array again
-  all_data = sorted(data, key=itemgetter(args.x_column))
-  rooms = list({int(e[2]) for e in all_data}.difference(except_rooms))
-  rooms.sort()
+def draw_room_graph(ax, partitions):
+  rooms = sorted(set(int(room) for room in partitions.keys()).difference(except_rooms))
   print("rooms=", rooms)
 
-  np_all_data = np.array(all_data)
-  all_x = np_all_data[:, args.x_column]
-  x_max = np.max(all_x)
+  x_max = max(partitions[room].max[args.x_column] for room in partitions.keys())
 
   ax.set_xlim(xmax = x_max / args.scale)
   ax.set_xlim(xmin = 0)
@@ -185,15 +168,13 @@ def draw_room_graph(ax, data):
 
   for room in rooms:
     # print("room=", room)
-    data = list(filter(lambda e: e[2] == room, all_data))
+    x = partitions[room].column(args.x_column)
 
-    data = np.array(data)
-
-    x = data[:, args.x_column]
-
-    # http://stackoverflow.com/questions/28663856/how-to-count-the-occurrence-of-certain-item-in-an-ndarray-in-python 
-    class_index = x // d
-    unique, count = np.unique(class_index, return_counts = True)
+    # number of rows in each class [i * d, (i + 1) * d) of sorted x
+    edges = np.arange(0, x[-1] // d + 2) * d
+    count = np.diff(np.searchsorted(x, edges, side="left"))
+    unique = np.nonzero(count)[0]
+    count = count[unique]
     x = unique * d
 
     x = x / args.scale
@@ -262,10 +243,23 @@ if args.no_display:
   mpl.use('Agg')
 import matplotlib.pyplot as plt
 
+info = args.info
+if args.events:
+  reader = EventReader(args.filename)
+elif args.index:
+  reader = LogIndex(args.filename)
 f = open(args.filename, "r")
 prog = re.compile(pattern)
 
-data = []
+if ohl:
+  partitions = PartitionedRows(3, args.x_column, 0)
+  moving_averages = {}
+elif room:
+  partitions = PartitionedRows(3, args.x_column, 2)
+else:
+  rows = SortedRows(3, args.x_column)
+  moving_average = MovingAverage(rows, args.y_column)
+
 if args.sx is not None:
   fig = plt.figure(args.title, figsize=(args.sx, args.sy))
 else:
@@ -275,15 +269,17 @@ while True:
   new_data = read_data(f)
   print(len(new_data), "data added.")
   if (len(new_data) > 0):
-      data.extend(new_data)
       ax.clear()
       ax.set_title(args.title)
       if ohl:
-        draw_ohl_graph(ax, data)
+        partitions.add(new_data)
+        draw_ohl_graph(ax, partitions)
       elif room:
-        draw_room_graph(ax, data)
+        partitions.add(new_data)
+        draw_room_graph(ax, partitions)
       else:
-        draw_graph(ax, data)
+        start = rows.add(new_data)
+        draw_graph(ax, rows, start)
   if args.save:
     savefilename = args.title + ".png"
     plt.savefig(savefilename)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Per-thread cache of outputs (pi, V) of FF network for repeated states
+# (--policy-cache-size > 0).
+# In Montezuma's Revenge etc. the agent often sees pixel-identical states
+# (death animations, waiting on ropes, no-ops of GameState.reset()), so the
+# forward pass of the same state can be skipped. Key is digest of the state,
+# and the cache is cleared when weights of local network change (sync), so
+# cached outputs are always those of current weights. Entries can't be kept
+# across syncs: the thread applies its own gradients between two syncs, so
+# weights always change. Hit rate (and break-even hit rate, cost of digest /
+# cost of forward pass) is measured by bench_policy_cache() of benchmark.py.
+# Not used with LSTM (output depends on LSTM state).
+
+def state_digest(s_t):
+  return hashlib.blake2b(np.ascontiguousarray(s_t), digest_size=16).digest()
+
+class PolicyCache(object):
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self._entries = OrderedDict()
+    self.hits = 0
+    self.lookups = 0
+
+  def invalidate(self):
+    # weights changed
+    self._entries.clear()
+
+  def run_policy_and_value(self, network, sess, s_t):
+    # same as network.run_policy_and_value(sess, s_t), but cached
+    self.lookups += 1
+    key = state_digest(s_t)
+    entry = self._entries.get(key)
+    if entry is not None:
+      self.hits += 1
+      self._entries.move_to_end(key)
+      pi, v = entry
+    else:
+      pi, v = network.run_policy_and_value(sess, s_t)
+      self._entries[key] = (pi, v)
+      if len(self._entries) > self.max_size:
+        # least recently used
+        self._entries.popitem(last=False)
+    # pi is modified by A3CTrainingThread.choose_action()
+    return (pi.copy(), v)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def hit_rate(self):
+    if self.lookups == 0:
+      return 0.0
+    return self.hits / float(self.lookups)
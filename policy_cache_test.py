@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import unittest
+import numpy as np
+
+from policy_cache import PolicyCache
+
+class CountingNetwork(object):
+  def __init__(self):
+    self.passes = 0
+
+  def run_policy_and_value(self, sess, s_t):
+    self.passes += 1
+    return (np.array([0.25, 0.75], dtype=np.float32), float(s_t.sum()))
+
+class TestPolicyCache(unittest.TestCase):
+  def test_cache(self):
+    network = CountingNetwork()
+    cache = PolicyCache(2)
+    s1 = np.zeros((84, 84, 4), dtype=np.float32)
+    s2 = np.ones((84, 84, 4), dtype=np.float32)
+    s3 = np.full((84, 84, 4), 0.5, dtype=np.float32)
+
+    pi, v = cache.run_policy_and_value(network, None, s1)
+    pi -= 0.1 # modified by caller
+    pi, v = cache.run_policy_and_value(network, None, s1.copy())
+    self.assertEqual(1, network.passes)
+    self.assertAlmostEqual(0.25, pi[0])
+    self.assertEqual(0.0, v)
+
+    cache.run_policy_and_value(network, None, s2)
+    cache.run_policy_and_value(network, None, s1) # s1 is most recently used
+    cache.run_policy_and_value(network, None, s3) # s2 is evicted
+    self.assertEqual(2, len(cache))
+    cache.run_policy_and_value(network, None, s1)
+    self.assertEqual(3, network.passes)
+    cache.run_policy_and_value(network, None, s2)
+    self.assertEqual(4, network.passes)
+    self.assertEqual(3, cache.hits)
+    self.assertEqual(7, cache.lookups)
+
+    # weights changed by sync
+    cache.invalidate()
+    self.assertEqual(0, len(cache))
+    cache.run_policy_and_value(network, None, s1)
+    self.assertEqual(5, network.passes)
+    self.assertAlmostEqual(3.0 / 8.0, cache.hit_rate())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -3,22 +3,37 @@ import argparse
 import time
 import re
 import sys
+from event_log import EventReader
+from log_index import LogIndex
 
 parser = argparse.ArgumentParser(description="extract visited rooms in A3C")
 parser.add_argument('filename')
+parser.add_argument('--events', action='store_true',
+                    help="FILENAME is structured event stream (--event-log) instead of log")
+parser.add_argument('--index', action='store_true',
+                    help="read FILENAME through columnar index FILENAME.index (see log_index.py)")
 args = parser.parse_args()
 
-f = open(args.filename, "r")
-prog = re.compile(".*ROOM\((\d+)\)")
 rooms = np.zeros(24)
 
-line = f.readline()
-while line != "":
-  match = prog.match(line)
-  if match:
-    room_no =int(match.group(1))
-    rooms[room_no] += 1
+if args.events:
+  for room_no, in EventReader(args.filename).read_rows(["new_room"], ("room",)):
+    rooms[int(room_no)] += 1
+elif args.index:
+  index = LogIndex(args.filename)
+  index.update()
+  for room_no in index.column("room", "room"):
+    rooms[int(room_no)] += 1
+else:
+  f = open(args.filename, "r")
+  prog = re.compile(".*ROOM\((\d+)\)")
   line = f.readline()
+  while line != "":
+    match = prog.match(line)
+    if match:
+      room_no =int(match.group(1))
+      rooms[room_no] += 1
+    line = f.readline()
 
 visited_rooms = np.arange(24)[rooms != 0]
 print(visited_rooms)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Sampling profiler for running training process.
+# A background thread samples stacks of registered actor threads at HZ while
+# active. It is switched on and off by toggle() (SIGUSR1 in a3c.py) or by
+# creating and removing the control file.
+# When switched off, samples are written to OUTPUT_DIR:
+#   profile-NNN.thX.folded : folded stacks of thread X (input of flamegraph.pl)
+#   profile-NNN.top.txt    : top-N hot functions (self and inclusive samples)
+# A profile which is still active at process exit is written by stop()
+# (registered with atexit by start()).
+
+CONTROL_FILE_POLL_INTERVAL = 1.0 # sec
+
+def _frame_label(frame):
+  code = frame.f_code
+  return "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+class SamplingProfiler(object):
+  def __init__(self, output_dir, hz=100, top=30, control_file=None):
+    self.output_dir = output_dir
+    self.interval = 1.0 / hz
+    self.top = top
+    self.control_file = control_file
+    self.threads = {} # thread ident -> name
+    self.active = False
+    self.toggle_requested = False
+    self.num_dump = 0
+    self._reset()
+    self._control_file_exists = False
+    # held while sampling and while switching on/off (dump)
+    self._lock = threading.Lock()
+    self._thread = threading.Thread(target=self._run, name="sampling_profiler")
+    self._thread.daemon = True
+
+  def _reset(self):
+    self.samples = {} # name -> Counter of folded stack
+    self.num_samples = 0
+    self.start_time = time.time()
+
+  def register_thread(self, name):
+    # call from thread to be sampled
+    self.threads[threading.current_thread().ident] = name
+
+  def start(self):
+    if not os.path.exists(self.output_dir):
+      os.makedirs(self.output_dir)
+    atexit.register(self.stop)
+    self._thread.start()
+
+  def stop(self):
+    # write active profile (called at exit)
+    with self._lock:
+      self._set_active(False)
+
+  def toggle(self):
+    # only set flag because this is called in signal handler
+    self.toggle_requested = True
+
+  def _set_active(self, active):
+    if active == self.active:
+      return
+    if active:
+      self._reset()
+      print("### Profiler : started ({:.0f} Hz)".format(1.0 / self.interval))
+      self.active = True
+    else:
+      self.active = False
+      self.dump()
+
+  def _poll_control_file(self):
+    exists = os.path.exists(self.control_file)
+    if exists != self._control_file_exists:
+      self._control_file_exists = exists
+      self._set_active(exists)
+
+  def _run(self):
+    next_poll = 0.0
+    while True:
+      with self._lock:
+        if self.toggle_requested:
+          self.toggle_requested = False
+          self._set_active(not self.active)
+        now = time.time()
+        if self.control_file is not None and now >= next_poll:
+          self._poll_control_file()
+          next_poll = now + CONTROL_FILE_POLL_INTERVAL
+        active = self.active
+        if active:
+          self._sample()
+      if active:
+        time.sleep(self.interval)
+      else:
+        time.sleep(min(CONTROL_FILE_POLL_INTERVAL, 0.1))
+
+  def _sample(self):
+    frames = sys._current_frames()
+    for ident, name in list(self.threads.items()):
+      frame = frames.get(ident)
+      if frame is None:
+        continue
+      stack = []
+      while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+      stack.reverse()
+      counter = self.samples.get(name)
+      if counter is None:
+        counter = Counter()
+        self.samples[name] = counter
+      counter[";".join(stack)] += 1
+    self.num_samples += 1
+
+  def dump(self):
+    prefix = os.path.join(self.output_dir, "profile-{:03d}".format(self.num_dump))
+    self.num_dump += 1
+    elapsed_time = time.time() - self.start_time
+
+    self_count = Counter()
+    total_count = Counter()
+    num_stacks = 0
+    for name, counter in sorted(self.samples.items()):
+      with open("{}.{}.folded".format(prefix, name), "w") as f:
+        for stack, n in counter.most_common():
+          f.write("{} {}\n".format(stack, n))
+          frames = stack.split(";")
+          self_count[frames[-1]] += n
+          for frame in set(frames):
+            total_count[frame] += n
+          num_stacks += n
+
+    num_stacks = max(num_stacks, 1)
+    lines = ["{} samples of {} threads in {:.0f} sec".format(
+             self.num_samples, len(self.samples), elapsed_time),
+             "", "{:>7s} {:>7s}  function (self)".format("samples", "%")]
+    for frame, n in self_count.most_common(self.top):
+      lines.append("{:7d} {:7.2f}  {}".format(n, n * 100.0 / num_stacks, frame))
+    lines += ["", "{:>7s} {:>7s}  function (inclusive)".format("samples", "%")]
+    for frame, n in total_count.most_common(self.top):
+      lines.append("{:7d} {:7.2f}  {}".format(n, n * 100.0 / num_stacks, frame))
+    with open(prefix + ".top.txt", "w") as f:
+      f.write("\n".join(lines) + "\n")
+    print("### Profiler : stopped. profile saved to {}.*".format(prefix))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from sampling_profiler import SamplingProfiler
+
+def busy_loop(profiler, ready, done):
+  profiler.register_thread("busy")
+  ready.set()
+  n = 0
+  while not done.is_set():
+    n += 1
+
+class TestSamplingProfiler(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.stdout = sys.stdout
+    sys.stdout = io.StringIO()
+
+  def tearDown(self):
+    sys.stdout = self.stdout
+    shutil.rmtree(self.dir)
+
+  def test_stop_writes_active_profile(self):
+    profiler = SamplingProfiler(self.dir, hz=200, top=5)
+    ready = threading.Event()
+    done = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(profiler, ready, done))
+    thread.start()
+    try:
+      ready.wait()
+      profiler.start()
+      profiler.toggle()
+      deadline = time.time() + 5.0
+      while profiler.num_samples < 20 and time.time() < deadline:
+        time.sleep(0.05)
+      # as at exit: profile is still active
+      profiler.stop()
+    finally:
+      done.set()
+      thread.join()
+
+    self.assertFalse(profiler.active)
+    self.assertEqual(["profile-000.busy.folded", "profile-000.top.txt"],
+                     sorted(os.listdir(self.dir)))
+    with open(os.path.join(self.dir, "profile-000.busy.folded")) as f:
+      lines = f.read().splitlines()
+    self.assertGreater(len(lines), 0)
+    total = 0
+    for line in lines:
+      stack, n = line.rsplit(" ", 1)
+      self.assertIn("busy_loop (sampling_profiler_test.py:", stack)
+      total += int(n)
+    self.assertGreaterEqual(total, 20)
+    with open(os.path.join(self.dir, "profile-000.top.txt")) as f:
+      self.assertIn("busy_loop", f.read())
+
+    # second stop (atexit after explicit stop) writes nothing
+    profiler.stop()
+    self.assertEqual(2, len(os.listdir(self.dir)))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from event_log import EventReader
+
+# End-to-end throughput harness.
+# Runs short training sessions of a3c.py (with fake ALE by default) for each
+# configuration of a matrix of options and records steps/sec, CPU utilization
+# and peak RSS. Results can be saved and compared with a stored baseline.
+#   python scaling_harness.py --parallel-sizes=1,2,4,8 --output=baseline.json
+#   python scaling_harness.py --parallel-sizes=1,2,4,8 --baseline=baseline.json
+# Settings which change learning (e.g. --bootstrap-pass-list) are compared by
+# learning curve too (mean episode score in each tenth of the steps):
+#   python scaling_harness.py --parallel-sizes=8 --fake-ale=none --rom=breakout.bin \
+#     --bootstrap-pass-list=separate,pre-update,post-sync --steps=2000000
+# Other arguments are passed to a3c.py.
+
+parser = argparse.ArgumentParser(description="throughput scaling harness of A3C")
+parser.add_argument('--parallel-sizes', default="1,2,4,8",
+                    help="comma separated values of --parallel-size")
+parser.add_argument('--frames-skip-in-gs-list', default="1",
+                    help="comma separated values of --frames-skip-in-gs")
+parser.add_argument('--use-lstm-list', default="False",
+                    help="comma separated values of --use-lstm")
+parser.add_argument('--psc-use-list', default="False",
+                    help="comma separated values of --psc-use")
+parser.add_argument('--shared-graph-list', default="False",
+                    help="comma separated values of --shared-graph")
+parser.add_argument('--bootstrap-pass-list', default="separate",
+                    help="comma separated values of --bootstrap-pass")
+parser.add_argument('--steps', type=int, default=50000,
+                    help="global steps of each session")
+parser.add_argument('--fake-ale', default="synthetic",
+                    help="--fake-ale of sessions (\"none\" means real ALE)")
+parser.add_argument('--output', default=None,
+                    help="write results to json file")
+parser.add_argument('--baseline', default=None,
+                    help="compare results with json file written by --output")
+parser.add_argument('--threshold', type=float, default=0.1,
+                    help="regression if steps/sec is lower (or peak RSS is higher) than baseline by THRESHOLD (ratio)")
+parser.add_argument('--keep-dir', default=None,
+                    help="keep logs of sessions in KEEP_DIR")
+
+MATRIX = [("parallel_size", "parallel_sizes"),
+          ("frames_skip_in_gs", "frames_skip_in_gs_list"),
+          ("use_lstm", "use_lstm_list"),
+          ("psc_use", "psc_use_list"),
+          ("shared_graph", "shared_graph_list"),
+          ("bootstrap_pass", "bootstrap_pass_list")]
+# number of points of learning curve
+CURVE_POINTS = 10
+
+def config_name(config):
+  return ",".join("{}={}".format(name, config[name]) for name, _ in MATRIX if name in config)
+
+def steps_per_sec(events):
+  # throughput between first and last performance event (excludes startup)
+  performance = [values for event, values in events if event == "performance"]
+  if len(performance) == 0:
+    return None
+  first = performance[0]
+  last = performance[-1]
+  if last["t"] > first["t"]:
+    return (last["s"] - first["s"]) / (last["t"] - first["t"])
+  return last["steps_per_sec"]
+
+def learning_curve(events, steps, points=CURVE_POINTS):
+  # [(global step, mean score of episodes ended in (previous step, step])]
+  bins = [[] for _ in range(points)]
+  for event, values in events:
+    if event == "episode":
+      bins[min(values["s"] * points // steps, points - 1)].append(values["r"])
+  return [((i + 1) * steps // points, sum(scores) / len(scores) if scores else None)
+          for i, scores in enumerate(bins)]
+
+def session_argv(config, work_dir, steps, fake_ale="synthetic", extra_argv=()):
+  # command line of a3c.py for session of CONFIG (fake_ale "none": real ALE)
+  argv = [sys.executable, "a3c.py",
+          "--parallel-size={}".format(config["parallel_size"]),
+          "--frames-skip-in-gs={}".format(config["frames_skip_in_gs"]),
+          "--use-lstm={}".format(config["use_lstm"]),
+          "--psc-use={}".format(config["psc_use"]),
+          "--shared-graph={}".format(config["shared_graph"]),
+          "--bootstrap-pass={}".format(config["bootstrap_pass"]),
+          "--end-time-step={}".format(steps),
+          "--save-time-interval={}".format(steps * 10),
+          "--performance-log-interval=500",
+          "--checkpoint-dir={}".format(os.path.join(work_dir, "checkpoints")),
+          "--log-file={}".format(os.path.join(work_dir, "summary")),
+          "--event-log={}".format(os.path.join(work_dir, "events.jsonl"))]
+  if config["frames_skip_in_gs"] > 1:
+    # with default --color-averaging-in-ale=True, options.py resets
+    # frames_skip_in_gs to 1 (frames are skipped in ALE)
+    argv += ["--color-averaging-in-ale=False", "--color-maximizing-in-gs=True"]
+  if fake_ale != "none":
+    argv.append("--fake-ale={}".format(fake_ale))
+  return argv + list(extra_argv)
+
+def run_session(config, work_dir, steps, fake_ale="synthetic", extra_argv=()):
+  os.makedirs(work_dir)
+  event_log = os.path.join(work_dir, "events.jsonl")
+  argv = session_argv(config, work_dir, steps, fake_ale, extra_argv)
+
+  start = time.time()
+  with open(os.path.join(work_dir, "log"), "w") as log:
+    process = subprocess.Popen(argv, stdout=log, stderr=subprocess.STDOUT)
+    # resource usage of this child only
+    _, status, rusage = os.wait4(process.pid, 0)
+  wall_time = time.time() - start
+  if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0:
+    print("session failed: {}".format(config_name(config)))
+    with open(os.path.join(work_dir, "log")) as log:
+      sys.stdout.write("".join(log.readlines()[-5:]))
+    return None
+
+  events = EventReader(event_log).read_events() if os.path.exists(event_log) else []
+  frames = [values for event, values in events if event == "frames"]
+  if len(frames) == 0 or frames[0]["frames_skip_in_gs"] != config["frames_skip_in_gs"]:
+    print("session ignored frames_skip_in_gs={}: {}".format(
+          config["frames_skip_in_gs"], frames[0] if frames else "no frames event"))
+    return None
+  cpu_time = rusage.ru_utime + rusage.ru_stime
+  graph = [values for event, values in events if event == "graph"]
+  curve = learning_curve(events, steps)
+  return {"config": config,
+          "graph_build_sec": graph[0]["build_sec"] if graph else None,
+          "graph_mb": graph[0]["graph_mb"] if graph else None,
+          "steps_per_sec": steps_per_sec(events),
+          "cpu": cpu_time / wall_time, # number of busy cores
+          "cpu_percent": cpu_time / wall_time / os.cpu_count() * 100.0,
+          "peak_rss_mb": rusage.ru_maxrss / 1024.0,
+          "wall_time": wall_time,
+          "score": curve[-1][1],
+          "learning_curve": curve}
+
+def print_results(results):
+  print("{:100s} {:>10s} {:>8s} {:>6s} {:>6s} {:>10s} {:>9s} {:>10s} {:>8s}".format(
+        "config", "steps/sec", "scaling", "cores", "cpu%", "rss(MB)", "build(s)", "graph(MB)",
+        "score"))
+  # scaling efficiency relative to parallel_size=1 of same other settings
+  single = {}
+  for result in results:
+    config = result["config"]
+    if config["parallel_size"] == 1 and result["steps_per_sec"]:
+      single[config_name(dict(config, parallel_size=1))] = result["steps_per_sec"]
+  for result in results:
+    config = result["config"]
+    base = single.get(config_name(dict(config, parallel_size=1)))
+    scaling = ""
+    if base and result["steps_per_sec"]:
+      scaling = "{:.2f}".format(result["steps_per_sec"] / (base * config["parallel_size"]))
+    score = result.get("score")
+    print("{:100s} {:10.1f} {:>8s} {:6.2f} {:6.1f} {:10.1f} {:9.1f} {:10.1f} {:>8s}".format(
+          config_name(config), result["steps_per_sec"] or 0.0, scaling,
+          result["cpu"], result["cpu_percent"], result["peak_rss_mb"],
+          result.get("graph_build_sec") or 0.0, result.get("graph_mb") or 0.0,
+          "{:.1f}".format(score) if score is not None else "-"))
+
+def print_learning_curves(results):
+  # mean episode score of each configuration along global steps
+  for result in results:
+    curve = result.get("learning_curve")
+    if curve is None:
+      continue
+    print("{:100s} {}".format(config_name(result["config"]), " ".join(
+          "{:>7s}".format("{:.1f}".format(score) if score is not None else "-")
+          for _, score in curve)))
+
+def compare(results, baseline, threshold):
+  # returns list of (config name, reason) of regressions
+  baseline = dict((config_name(result["config"]), result) for result in baseline)
+  regressions = []
+  for result in results:
+    name = config_name(result["config"])
+    base = baseline.get(name)
+    if base is None or not base["steps_per_sec"] or not result["steps_per_sec"]:
+      continue
+    ratio = result["steps_per_sec"] / base["steps_per_sec"]
+    rss_ratio = result["peak_rss_mb"] / base["peak_rss_mb"]
+    marks = []
+    if ratio < 1.0 - threshold:
+      marks.append("STEPS/SEC")
+    if rss_ratio > 1.0 + threshold:
+      marks.append("RSS")
+    if marks:
+      regressions.append((name, marks))
+    print("{:100s} steps/sec {:6.3f}  rss {:6.3f}  {}".format(
+          name, ratio, rss_ratio, " ".join(marks)))
+  return regressions
+
+def parse_list(value, convert):
+  return [convert(v.strip()) for v in value.split(",") if v.strip() != ""]
+
+
+if __name__ == "__main__":
+  args, extra_argv = parser.parse_known_args()
+  values = {"parallel_size": parse_list(args.parallel_sizes, int),
+            "frames_skip_in_gs": parse_list(args.frames_skip_in_gs_list, int),
+            "use_lstm": parse_list(args.use_lstm_list, str),
+            "psc_use": parse_list(args.psc_use_list, str),
+            "shared_graph": parse_list(args.shared_graph_list, str),
+            "bootstrap_pass": parse_list(args.bootstrap_pass_list, str)}
+  configs = [dict(zip([name for name, _ in MATRIX], combination))
+             for combination in itertools.product(*[values[name] for name, _ in MATRIX])]
+
+  work_root = args.keep_dir or tempfile.mkdtemp(prefix="scaling_harness.")
+  results = []
+  try:
+    for i, config in enumerate(configs):
+      print("[{}/{}] {}".format(i + 1, len(configs), config_name(config)))
+      sys.stdout.flush()
+      result = run_session(config, os.path.join(work_root, "session{:03d}".format(i)),
+                           args.steps, args.fake_ale, extra_argv)
+      if result is not None:
+        results.append(result)
+  finally:
+    if args.keep_dir is None:
+      shutil.rmtree(work_root)
+
+  print("=====================================")
+  print_results(results)
+  print("===== learning curves (mean episode score) =====")
+  print_learning_curves(results)
+
+  if args.output is not None:
+    with open(args.output, "w") as f:
+      json.dump(results, f, indent=2)
+    print("results saved to", args.output)
+
+  if args.baseline is not None:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    print("===== compare with {} =====".format(args.baseline))
+    regressions = compare(results, baseline, args.threshold)
+    if len(regressions) > 0:
+      print("{} configurations regressed by more than {:.0f}%".format(
+            len(regressions), args.threshold * 100))
+      sys.exit(1)
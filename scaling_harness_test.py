@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import io
+import sys
+import unittest
+
+from scaling_harness import steps_per_sec, learning_curve, compare, session_argv, config_name
+
+CONFIG = {"parallel_size": 2, "frames_skip_in_gs": 1, "use_lstm": "False", "psc_use": "False",
+          "shared_graph": "False", "bootstrap_pass": "separate"}
+
+def result(config, steps_per_sec, peak_rss_mb=100.0):
+  return {"config": config, "steps_per_sec": steps_per_sec, "peak_rss_mb": peak_rss_mb}
+
+class TestScalingHarness(unittest.TestCase):
+  def setUp(self):
+    self.stdout = sys.stdout
+    sys.stdout = io.StringIO()
+
+  def tearDown(self):
+    sys.stdout = self.stdout
+
+  def test_steps_per_sec(self):
+    self.assertIsNone(steps_per_sec([("graph", {})]))
+    events = [("performance", {"t": 10.0, "s": 1000, "steps_per_sec": 50.0}),
+              ("episode", {"s": 1500, "r": 0}),
+              ("performance", {"t": 20.0, "s": 3000, "steps_per_sec": 150.0})]
+    # startup (before first performance event) is excluded
+    self.assertAlmostEqual(200.0, steps_per_sec(events))
+    self.assertEqual(50.0, steps_per_sec(events[:1]))
+
+  def test_learning_curve(self):
+    events = [("episode", {"s": s, "r": r}) for s, r in [(5, 1), (15, 3), (19, 5), (100, 4)]]
+    curve = learning_curve(events, 40, points=4)
+    self.assertEqual([(10, 1.0), (20, 4.0), (30, None), (40, 4.0)], curve)
+
+  def test_compare(self):
+    slow = dict(CONFIG, parallel_size=4)
+    big = dict(CONFIG, parallel_size=8)
+    baseline = [result(CONFIG, 100.0), result(slow, 100.0), result(big, 100.0)]
+    results = [result(CONFIG, 95.0), result(slow, 80.0), result(big, 100.0, peak_rss_mb=120.0),
+               result(dict(CONFIG, use_lstm="True"), 10.0)]
+    self.assertEqual([(config_name(slow), ["STEPS/SEC"]), (config_name(big), ["RSS"])],
+                     compare(results, baseline, 0.1))
+
+  def test_session_argv(self):
+    argv = session_argv(CONFIG, "work", 1000, extra_argv=["--rom=pong.bin"])
+    self.assertIn("--end-time-step=1000", argv)
+    self.assertIn("--fake-ale=synthetic", argv)
+    self.assertEqual("--rom=pong.bin", argv[-1])
+    self.assertNotIn("--color-maximizing-in-gs=True", argv)
+    # frames_skip_in_gs > 1 is reset to 1 with default color averaging in ALE
+    argv = session_argv(dict(CONFIG, frames_skip_in_gs=4), "work", 1000, fake_ale="none")
+    self.assertIn("--color-averaging-in-ale=False", argv)
+    self.assertIn("--color-maximizing-in-gs=True", argv)
+    self.assertFalse(any(arg.startswith("--fake-ale") for arg in argv))
+
+if __name__ == '__main__':
+  unittest.main()
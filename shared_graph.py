@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import tensorflow as tf
+import numpy as np
+
+from memory_accounting import variables_bytes
+
+# Per-thread graph built once for all threads (--shared-graph=True).
+# Without it, each A3CTrainingThread builds a local network, backward graph,
+# gradient accumulators, apply op and sync op, so graph size and build time
+# grow linearly with parallel_size.
+# The template computes loss and gradients directly on the weights of the
+# global network and applies them in one op, so no local copy, sync or
+# accumulator is needed. Inputs (states, actions, TD, R and LSTM state) are fed
+# per run, and the only per-thread state (LSTM state) is kept in
+# SharedNetworkView of each thread.
+# This is a separate algorithm variant, not the same A3C with a smaller graph:
+# there is no per-thread snapshot of weights, so actions of a rollout are
+# chosen with the latest global weights, and gradients are computed on the
+# global weights at the time of the update (already changed by other threads
+# during the rollout), not on the weights which chose the actions. Compare its
+# learning curve with standard A3C before using it, e.g.
+#   python scaling_harness.py --parallel-sizes=8 --shared-graph-list=False,True ...
+
+class SharedGraphTemplate(object):
+  def __init__(self, global_network, grad_applier, entropy_beta, use_lstm, device):
+    self.network = global_network
+    self.use_lstm = use_lstm
+    global_network.prepare_loss(entropy_beta)
+
+    with tf.device(device):
+      var_list = global_network.get_vars()
+      grads = tf.gradients(global_network.total_loss, var_list,
+                           gate_gradients=False,
+                           aggregation_method=None,
+                           colocate_gradients_with_ops=False)
+      # gradients are computed and applied in one run
+      self.apply_gradients = grad_applier.apply_gradients(var_list, grads)
+
+      if use_lstm:
+        # one-step graph with LSTM state fed and fetched, instead of the
+        # variable of global network (which can't be shared among threads)
+        lstm = global_network.lstm
+        self.step_state_in = tf.placeholder(tf.float32, [1, lstm.state_size])
+        with tf.variable_scope(global_network.scope, reuse=True):
+          step_output, self.step_state_out = lstm(global_network.h_fc1, self.step_state_in)
+        self.step_pi = tf.nn.softmax(tf.matmul(step_output, global_network.W_fc2) +
+                                     global_network.b_fc2)
+        step_v_ = tf.matmul(step_output, global_network.W_fc3) + global_network.b_fc3
+        self.step_v = tf.reshape( step_v_, [-1] )
+        self.state_size = lstm.state_size
+
+
+class SharedNetworkView(object):
+  # per-thread view of SharedGraphTemplate with interface of local network
+  # used by A3CTrainingThread
+  def __init__(self, template):
+    self.template = template
+    network = template.network
+    self.s = network.s
+    self.a = network.a
+    self.td = network.td
+    self.r = network.r
+    if template.use_lstm:
+      self.initial_lstm_state = network.initial_lstm_state
+      self.step_size = network.step_size
+      self.lstm_state = np.zeros([1, template.state_size], dtype=np.float32)
+    self.pi = network.pi
+    self.v = network.v
+
+  def reset_state(self, sess):
+    self.lstm_state = np.zeros_like(self.lstm_state)
+
+  def get_lstm_state(self, sess):
+    return self.lstm_state
+
+  def set_lstm_state(self, sess, lstm_state):
+    self.lstm_state = lstm_state
+
+  def run_policy_and_value(self, sess, s_t):
+    if self.template.use_lstm:
+      pi_out, v_out, self.lstm_state = sess.run(
+        [self.template.step_pi, self.template.step_v, self.template.step_state_out],
+        feed_dict = {self.s : [s_t], self.template.step_state_in : self.lstm_state} )
+    else:
+      pi_out, v_out = sess.run( [self.pi, self.v], feed_dict = {self.s : [s_t]} )
+    return (pi_out[0], v_out[0])
+
+  def run_policy(self, sess, s_t):
+    return self.run_policy_and_value(sess, s_t)[0]
+
+  def run_value(self, sess, s_t):
+    # LSTM state is not updated (see GameACLSTMNetwork.run_value())
+    if self.template.use_lstm:
+      v_out = sess.run( self.template.step_v,
+                        feed_dict = {self.s : [s_t], self.template.step_state_in : self.lstm_state} )
+    else:
+      v_out = sess.run( self.v, feed_dict = {self.s : [s_t]} )
+    return v_out[0]
+
+
+def graph_stats():
+  # size of default graph: number of ops, number and size (MB) of variables,
+  # size (MB) of serialized graph
+  graph = tf.get_default_graph()
+  variables = tf.all_variables() + tf.local_variables()
+  variable_bytes = variables_bytes(variables)
+  graph_bytes = graph.as_graph_def().ByteSize()
+  return {"ops": len(graph.get_operations()),
+          "variables": len(variables),
+          "variable_mb": variable_bytes / 1e6,
+          "graph_mb": graph_bytes / 1e6}
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import time
+
+from phase_timer import PhaseStats
+
+# Policy lag of A3CTrainingThread: number of global updates (apply_gradients
+# of all threads) and wall time between the sync of the local network (start
+# of rollout) and the apply of its gradients.
+# Updates are counted by GlobalCounter, so they are exact.
+
+class StalenessMeter(object):
+  def __init__(self, thread_index, update_counter):
+    self.thread_index = thread_index
+    self.update_counter = update_counter
+    self.updates = PhaseStats(unit=1.0)
+    self.seconds = PhaseStats()
+
+  def mark(self):
+    # at sync: (number of global updates, time)
+    return (self.update_counter.value(), time.time())
+
+  def apply(self, mark):
+    # at apply of gradients of rollout which started at mark
+    updates = self.update_counter.value() - mark[0]
+    self.updates.add(updates)
+    self.seconds.add(time.time() - mark[1])
+    self.update_counter.add(self.thread_index)
+    return updates
+
+  def write_summaries(self, summary_writer, global_t):
+    import tensorflow as tf
+    if self.updates.num == 0:
+      return
+    values = [tf.Summary.Value(tag="staleness/th{}/updates".format(self.thread_index),
+                               histo=self.updates.histogram_proto()),
+              tf.Summary.Value(tag="staleness/th{}/seconds".format(self.thread_index),
+                               histo=self.seconds.histogram_proto())]
+    summary_writer.add_summary(tf.Summary(value=values), global_t)
+
+
+def format_table(meters):
+  # policy lag of each thread and all threads
+  lines = ["### Staleness : {:6s} {:>10s} {:>8s} {:>8s} {:>8s} {:>8s} {:>10s} {:>10s}".format(
+           "thread", "applies", "mean", "p50", "p99", "max", "mean(s)", "p99(s)")]
+  updates_all = PhaseStats(unit=1.0)
+  seconds_all = PhaseStats()
+  rows = []
+  for meter in meters:
+    if meter.updates.num == 0:
+      continue
+    rows.append(("th{}".format(meter.thread_index), meter.updates, meter.seconds))
+    updates_all.merge(meter.updates)
+    seconds_all.merge(meter.seconds)
+  if updates_all.num == 0:
+    return lines[0]
+  rows.append(("all", updates_all, seconds_all))
+  for name, updates, seconds in rows:
+    lines.append("### Staleness : {:6s} {:10d} {:8.1f} {:8.0f} {:8.0f} {:8.0f} {:10.3f} {:10.3f}".format(
+                 name, updates.num, updates.sum / updates.num,
+                 updates.percentile(50), updates.percentile(99), updates.max,
+                 seconds.sum / seconds.num, seconds.percentile(99)))
+  return "\n".join(lines)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+from global_counter import GlobalCounter
+from staleness import StalenessMeter, format_table
+
+class TestStaleness(unittest.TestCase):
+  def test_global_counter(self):
+    counter = GlobalCounter(4, initial=1000)
+    def count(slot):
+      for _ in range(10000):
+        counter.add(slot, 5)
+    threads = [threading.Thread(target=count, args=(i,)) for i in range(4)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEqual(1000 + 4 * 10000 * 5, counter.value())
+
+  def test_meter(self):
+    counter = GlobalCounter(2)
+    meter0 = StalenessMeter(0, counter)
+    meter1 = StalenessMeter(1, counter)
+    mark = meter0.mark()
+    # 3 updates of thread1 during rollout of thread0
+    for _ in range(3):
+      self.assertEqual(0, meter1.apply(meter1.mark()))
+    self.assertEqual(3, meter0.apply(mark))
+    self.assertEqual(4, counter.value())
+    self.assertEqual(1, meter0.updates.num)
+    self.assertEqual(3.0, meter0.updates.max)
+    self.assertEqual(3.0, meter0.updates.percentile(50)) # limit of bucket [2, 4) capped by max
+    self.assertEqual(3, meter1.updates.num)
+    self.assertEqual(0.0, meter1.updates.sum)
+
+    lines = format_table([meter0, meter1]).split("\n")
+    self.assertEqual(4, len(lines))
+    self.assertEqual("all", lines[3].split()[3])
+    self.assertEqual("4", lines[3].split()[4])
+
+if __name__ == '__main__':
+  unittest.main()
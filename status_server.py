@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import resource
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Local HTTP/JSON status endpoint of running training (--status-port).
+#   curl http://localhost:PORT/status
+# Served by a background thread. snapshot() (given by a3c.py) builds status
+# from attributes of training threads read without lock, so serving status
+# never blocks actor threads (values of different threads may be from
+# slightly different times).
+
+def memory_usage():
+  # current and peak RSS of this process, in MiB like ru_maxrss (KiB) / 1024
+  # and supervisor.parse_rss_mb()
+  peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+  rss_mb = peak_mb
+  try:
+    with open("/proc/self/statm") as f:
+      rss_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+  except (IOError, OSError, ValueError):
+    pass # not Linux
+  # ru_maxrss (high-water mark) is updated lazily by kernel, so it can be
+  # slightly lower than current RSS
+  return {"rss_mb": rss_mb, "peak_rss_mb": max(peak_mb, rss_mb)}
+
+def _to_json(value):
+  # numpy scalars and arrays
+  if hasattr(value, "tolist"):
+    return value.tolist()
+  raise TypeError(repr(value))
+
+class _Handler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    if self.path.split("?")[0] not in ["/", "/status"]:
+      self.send_error(404)
+      return
+    try:
+      body = json.dumps(self.server.snapshot(), default=_to_json, indent=1)
+      code = 200
+    except Exception as e:
+      # e.g. container modified by actor thread while reading
+      body = json.dumps({"error": repr(e)})
+      code = 503
+    body = body.encode("utf-8")
+    self.send_response(code)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(body)))
+    self.send_header("Access-Control-Allow-Origin", "*")
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass # don't mix access log into training log
+
+class StatusServer(object):
+  def __init__(self, port, snapshot, host="127.0.0.1"):
+    self.httpd = HTTPServer((host, port), _Handler)
+    self.httpd.snapshot = snapshot
+    self.thread = None
+
+  @property
+  def port(self):
+    return self.httpd.server_address[1]
+
+  def start(self):
+    self.thread = threading.Thread(target=self.httpd.serve_forever, name="status_server")
+    self.thread.daemon = True
+    self.thread.start()
+
+  def stop(self):
+    self.httpd.shutdown()
+    self.httpd.server_close()
+    self.thread.join()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+import numpy as np
+
+from status_server import StatusServer, memory_usage
+
+class TestStatusServer(unittest.TestCase):
+  def setUp(self):
+    self.status = {"global_t": 123, "rooms": np.array([1, 0]), "lr": np.float32(0.5)}
+    self.server = StatusServer(0, lambda: self.status)
+    self.server.start()
+    self.url = "http://127.0.0.1:{}".format(self.server.port)
+
+  def tearDown(self):
+    self.server.stop()
+
+  def test_status(self):
+    status = json.loads(urlopen(self.url + "/status").read().decode("utf-8"))
+    self.assertEqual({"global_t": 123, "rooms": [1, 0], "lr": 0.5}, status)
+    self.status = {"global_t": 456}
+    status = json.loads(urlopen(self.url + "/").read().decode("utf-8"))
+    self.assertEqual(456, status["global_t"])
+
+  def test_errors(self):
+    with self.assertRaises(HTTPError) as cm:
+      urlopen(self.url + "/nothing")
+    self.assertEqual(404, cm.exception.code)
+    self.status = {"bad": object()}
+    with self.assertRaises(HTTPError) as cm:
+      urlopen(self.url + "/status")
+    self.assertEqual(503, cm.exception.code)
+
+  def test_memory_usage(self):
+    memory = memory_usage()
+    self.assertGreater(memory["rss_mb"], 0.0)
+    self.assertGreater(memory["peak_rss_mb"], 0.0)
+    self.assertLessEqual(memory["rss_mb"], memory["peak_rss_mb"])
+
+if __name__ == '__main__':
+  unittest.main()
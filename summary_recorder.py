@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import numpy as np
+
+# Summaries of episodes written without TF session.
+# Summary protos are built in Python from results of episodes buffered per
+# thread, and written through summary_writer in batches of batch_episodes
+# episodes (and by flush()). For each episode, scalar "score" is written at
+# global step of end of episode (same tag as before), and for each
+# batch, distributions of score, steps, rooms visited and psc reward of the
+# thread are written as histograms "episode/th{}/...".
+
+HISTOGRAM_BUCKETS = 30
+
+# fields of buffered episode
+EPISODE_FIELDS = ("global_t", "score", "steps", "rooms", "psc_reward")
+
+def histogram(values, num_buckets=HISTOGRAM_BUCKETS):
+  # fields of HistogramProto (buckets of same width between min and max)
+  values = np.asarray(values, dtype=np.float64)
+  low = values.min()
+  high = values.max()
+  if high == low:
+    counts = [len(values)]
+    limits = [high]
+  else:
+    counts, edges = np.histogram(values, bins=num_buckets, range=(low, high))
+    counts = counts.tolist()
+    limits = edges[1:].tolist()
+  return {"min": float(low), "max": float(high), "num": float(len(values)),
+          "sum": float(values.sum()), "sum_squares": float((values * values).sum()),
+          "bucket_limit": limits, "bucket": [float(c) for c in counts]}
+
+def batch_values(thread_index, episodes):
+  # (scalars, histograms) of batch of episodes of thread
+  #   scalars: list of (global_t, tag, value)
+  #   histograms: list of (tag, histogram())
+  scalars = [(episode[0], "score", float(episode[1])) for episode in episodes]
+  histograms = []
+  for i, field in enumerate(EPISODE_FIELDS):
+    if i == 0:
+      continue
+    tag = "episode/th{}/{}".format(thread_index, field)
+    histograms.append((tag, histogram([episode[i] for episode in episodes])))
+  return scalars, histograms
+
+
+class SummaryRecorder(object):
+  def __init__(self, summary_writer, batch_episodes):
+    self.summary_writer = summary_writer
+    self.batch_episodes = batch_episodes
+    self._buffers = {}
+    self._lock = threading.Lock()
+
+  def record_episode(self, thread_index, global_t, score, steps, rooms, psc_reward):
+    # called by actor thread at end of episode
+    with self._lock:
+      buffer = self._buffers.setdefault(thread_index, [])
+      buffer.append((global_t, score, steps, rooms, psc_reward))
+      if len(buffer) < self.batch_episodes:
+        return
+      self._buffers[thread_index] = []
+    self._write(thread_index, buffer)
+
+  def buffered_episodes(self):
+    # read without lock (for status)
+    return sum(len(buffer) for buffer in list(self._buffers.values()))
+
+  def flush(self):
+    with self._lock:
+      buffers = self._buffers
+      self._buffers = {}
+    for thread_index in sorted(buffers.keys()):
+      if len(buffers[thread_index]) > 0:
+        self._write(thread_index, buffers[thread_index])
+    self.summary_writer.flush()
+
+  def _write(self, thread_index, episodes):
+    import tensorflow as tf
+    scalars, histograms = batch_values(thread_index, episodes)
+    for global_t, tag, value in scalars:
+      summary = tf.Summary(value=[tf.Summary.Value(tag=tag, simple_value=value)])
+      self.summary_writer.add_summary(summary, global_t)
+    values = [tf.Summary.Value(tag=tag, histo=tf.HistogramProto(**histo))
+              for tag, histo in histograms]
+    self.summary_writer.add_summary(tf.Summary(value=values), episodes[-1][0])
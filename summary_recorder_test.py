@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from summary_recorder import histogram, batch_values, SummaryRecorder
+
+class TestSummaryRecorder(unittest.TestCase):
+  def test_histogram(self):
+    histo = histogram([0.0, 1.0, 1.0, 4.0], num_buckets=4)
+    self.assertEqual(0.0, histo["min"])
+    self.assertEqual(4.0, histo["max"])
+    self.assertEqual(4.0, histo["num"])
+    self.assertEqual(6.0, histo["sum"])
+    self.assertEqual(18.0, histo["sum_squares"])
+    self.assertEqual([1.0, 2.0, 3.0, 4.0], histo["bucket_limit"])
+    self.assertEqual([1.0, 2.0, 0.0, 1.0], histo["bucket"])
+    # all values are same
+    histo = histogram([5.0, 5.0])
+    self.assertEqual([5.0], histo["bucket_limit"])
+    self.assertEqual([2.0], histo["bucket"])
+
+  def test_batch_values(self):
+    episodes = [(100, 0.0, 50, 1, 0.5), (250, 400.0, 80, 3, 1.5)]
+    scalars, histograms = batch_values(2, episodes)
+    self.assertEqual([(100, "score", 0.0), (250, "score", 400.0)], scalars)
+    tags = [tag for tag, _ in histograms]
+    self.assertEqual(["episode/th2/score", "episode/th2/steps",
+                      "episode/th2/rooms", "episode/th2/psc_reward"], tags)
+    self.assertEqual(2.0, dict(histograms)["episode/th2/psc_reward"]["sum"])
+
+  def test_batch(self):
+    written = []
+    recorder = SummaryRecorder(None, 2)
+    recorder._write = lambda thread_index, episodes: written.append((thread_index, episodes))
+    recorder.record_episode(0, 10, 1.0, 5, 1, 0.0)
+    recorder.record_episode(1, 11, 2.0, 5, 1, 0.0)
+    self.assertEqual([], written)
+    recorder.record_episode(0, 12, 3.0, 5, 1, 0.0)
+    self.assertEqual([0], [thread_index for thread_index, _ in written])
+    self.assertEqual([10, 12], [episode[0] for episode in written[0][1]])
+    recorder.record_episode(0, 13, 3.0, 5, 1, 0.0)
+    self.assertEqual(1, len(written))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,508 @@
+# -*- coding: utf-8 -*-
+import argparse
+import html
+import json
+import os
+import posixpath
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+
+import yaml
+
+from event_log import EventReader
+from status_server import StatusServer
+
+# Supervisor of training runs on this machine and on hosts reachable over SSH
+# (replaces gcp-restart, gcp-copy and host -> runset table of startup-script).
+#   python supervisor.py runs.yaml --status-dir=/var/www/html --status-port=8080
+# Runs are defined in YAML file, e.g.
+#   hosts:
+#     gcp10:
+#       ssh: itsukara@gcp10
+#       cores: 8
+#       start: gcloud compute instances start gcp10 --zone us-west1-b
+#   runs:
+#     - name: montezuma-b020
+#       host: gcp10                     # default: localhost
+#       dir: pscOHL12092300             # directory of a3c.py (default: .)
+#       args: --rom=montezuma_revenge.bin --psc-use=True --psc-beta=0.020
+#       cpus: 8                         # CPU quota (cores)
+#       memory_mb: 12000                # memory quota (RSS)
+# Each run is started as "python a3c.py ARGS" with checkpoints, summary,
+# event log and log in DIR/runs/NAME. A run which exits without "stop" event of
+# end of training (crashed, killed or host preempted) is restarted after
+# --restart-delay, and a3c.py resumes from the latest complete checkpoint.
+# A run which fails --max-failures times in a row without saving a new
+# checkpoint is given up.
+# CPU quota: run is pinned to its own CPUS cores of the host by taskset (runs
+# which don't fit wait for free cores). Memory quota: RSS is sampled at each
+# poll and run over quota is stopped with SIGINT (checkpoint is saved) and
+# restarted.
+# Metrics are read incrementally from event log of each run (only bytes
+# appended since the previous poll, by "tail -c" over SSH) and written to one
+# status page (status.html and status.json in --status-dir, and /status of
+# --status-port).
+
+parser = argparse.ArgumentParser(description="supervisor of A3C training runs")
+parser.add_argument('config', help="YAML file of hosts and runs")
+parser.add_argument('--poll-interval', type=float, default=30.0,
+                    help="seconds between polls of runs")
+parser.add_argument('--restart-delay', type=float, default=60.0,
+                    help="seconds before restart of crashed run")
+parser.add_argument('--max-failures', type=int, default=5,
+                    help="give up run after MAX_FAILURES restarts without new checkpoint")
+parser.add_argument('--kill-timeout', type=float, default=300.0,
+                    help="seconds to wait for checkpoint after SIGINT before SIGKILL")
+parser.add_argument('--status-dir', default=".",
+                    help="directory of status.html and status.json")
+parser.add_argument('--status-port', type=int, default=None,
+                    help="serve status (json) at http://STATUS_HOST:STATUS_PORT/status")
+parser.add_argument('--status-host', default="127.0.0.1")
+
+LOCALHOST = "localhost"
+# number of latest episodes of average score of run
+SCORE_WINDOW = 100
+
+def parse_rss_mb(proc_status):
+  # RSS (MiB, as status_server.memory_usage()) in content of /proc/PID/status
+  for line in proc_status.splitlines():
+    if line.startswith("VmRSS:"):
+      return int(line.split()[1]) / 1024.0
+  return None
+
+class LocalHost(object):
+  def __init__(self, name, cores=None, python=None):
+    self.name = name
+    self.cores = cores if cores is not None else os.cpu_count()
+    self.python = python or sys.executable
+    self.free_cores = list(range(self.cores))
+
+  def popen(self, command):
+    return subprocess.Popen(["sh", "-c", command], stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE)
+
+  def is_up(self):
+    return True
+
+  def read_from(self, path, offset):
+    try:
+      with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read()
+    except (IOError, OSError):
+      return b""
+
+  def rss_mb(self, pid):
+    try:
+      with open("/proc/{}/status".format(pid)) as f:
+        return parse_rss_mb(f.read())
+    except (IOError, OSError):
+      return None
+
+  def is_alive(self, pid):
+    try:
+      os.kill(pid, 0)
+      return True
+    except OSError:
+      return False
+
+  def signal(self, pid, signum):
+    try:
+      os.kill(pid, signum)
+    except OSError:
+      pass # already exited
+
+  def allocate_cores(self, n):
+    # None if N cores are not free
+    if n > len(self.free_cores):
+      return None
+    cores = self.free_cores[:n]
+    self.free_cores = self.free_cores[n:]
+    return cores
+
+  def release_cores(self, cores):
+    self.free_cores = sorted(self.free_cores + cores)
+
+
+class SSHHost(LocalHost):
+  # commands are run by ssh (BatchMode: key authentication only)
+  def __init__(self, name, target, cores=None, python="python", start=None, timeout=60.0):
+    LocalHost.__init__(self, name, cores=cores, python=python)
+    # number of cores is asked to host when it is up (if not given)
+    self.cores = cores
+    self.free_cores = list(range(cores)) if cores is not None else None
+    self.target = target
+    self.start_command = start
+    self.timeout = timeout
+
+  def ssh_argv(self, command):
+    return ["ssh", "-o", "BatchMode=yes", self.target, command]
+
+  def popen(self, command):
+    return subprocess.Popen(self.ssh_argv(command), stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE)
+
+  def _run(self, command):
+    # (returncode, stdout); returncode is 255 if host is not reachable
+    try:
+      result = subprocess.run(self.ssh_argv(command), stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              timeout=self.timeout)
+    except subprocess.TimeoutExpired:
+      return 255, b""
+    return result.returncode, result.stdout
+
+  def is_up(self):
+    # start host (e.g. preempted VM) if it is not reachable
+    returncode, data = self._run("nproc")
+    if returncode == 0:
+      if self.cores is None:
+        self.cores = int(data)
+        self.free_cores = list(range(self.cores))
+      return True
+    if self.start_command is not None:
+      print("{}: not reachable, {}".format(self.name, self.start_command))
+      subprocess.call(self.start_command, shell=True)
+    return False
+
+  def read_from(self, path, offset):
+    returncode, data = self._run("tail -c +{} {}".format(offset + 1, shlex.quote(path)))
+    return data if returncode == 0 else b""
+
+  def rss_mb(self, pid):
+    returncode, data = self._run("cat /proc/{}/status".format(pid))
+    return parse_rss_mb(data.decode("utf-8", "replace")) if returncode == 0 else None
+
+  def is_alive(self, pid):
+    return self._run("kill -0 {}".format(pid))[0] == 0
+
+  def signal(self, pid, signum):
+    self._run("kill -{} {}".format(int(signum), pid))
+
+
+class RunMetrics(object):
+  # metrics of run updated from events
+  def __init__(self):
+    self.global_t = 0
+    self.steps_per_sec = None
+    self.checkpoint_t = None
+    self.episodes = 0
+    self.scores = deque(maxlen=SCORE_WINDOW)
+    self.max_score = None
+    self.rooms = set()
+    # latest Episode_scores average of each thread
+    self.thread_averages = {}
+    # (global_t, mean of thread_averages) at each "average" event
+    self.score_history = []
+    self.finished = False
+
+  def update(self, events):
+    for event, values in events:
+      if "s" in values:
+        self.global_t = max(self.global_t, values["s"])
+      if event == "performance":
+        self.steps_per_sec = values["steps_per_sec"]
+      elif event == "checkpoint":
+        self.checkpoint_t = values["s"]
+      elif event == "episode":
+        self.episodes += 1
+        self.scores.append(values["r"])
+        if self.max_score is None or values["r"] > self.max_score:
+          self.max_score = values["r"]
+        self.rooms.add(values["room"])
+      elif event == "new_room":
+        self.rooms.add(values["room"])
+      elif event == "average":
+        self.thread_averages[values["th"]] = values["average"]
+        averages = list(self.thread_averages.values())
+        self.score_history.append((values["s"], sum(averages) / len(averages)))
+      elif event == "stop":
+        self.finished = values["reason"] == "end"
+
+  def average_score(self):
+    if len(self.scores) == 0:
+      return None
+    return sum(self.scores) / float(len(self.scores))
+
+  def to_dict(self):
+    return {"global_t": self.global_t,
+            "steps_per_sec": self.steps_per_sec,
+            "checkpoint_t": self.checkpoint_t,
+            "episodes": self.episodes,
+            "average_score": self.average_score(),
+            "max_score": self.max_score,
+            "rooms": sorted(self.rooms),
+            "thread_averages": dict((str(th), v) for th, v in sorted(self.thread_averages.items()))}
+
+
+class Run(object):
+  def __init__(self, name, host, directory=".", args=(), program="a3c.py",
+               cpus=None, memory_mb=None, config=None):
+    self.name = name
+    self.host = host
+    self.dir = directory
+    self.args = shlex.split(args) if isinstance(args, str) else list(args)
+    self.program = program
+    self.cpus = cpus
+    self.memory_mb = memory_mb
+    # options of run (shown in status, given by sweep.py)
+    self.config = config
+    # files of run (relative to self.dir)
+    self.work_dir = posixpath.join("runs", name)
+    self.event_log = posixpath.join(self.work_dir, "events.jsonl")
+
+    self.state = "pending" # running, restarting, finished, failed, stopped
+    self.reason = None
+    self.process = None
+    self.pid = None
+    self.cores = None
+    self.starts = 0
+    self.failures = 0
+    self.exit_code = None
+    self.rss_mb = None
+    self.next_start_time = 0.0
+    self.stop_time = None
+    self.stop_reason = None
+    self.restart_after_stop = True
+    self.checkpoint_at_start = None
+    self.metrics = RunMetrics()
+    self.events = EventReader()
+    self.event_offset = 0
+
+  def command(self):
+    # shell command which prints pid and execs program
+    argv = [self.host.python, self.program] + self.args + [
+      "--checkpoint-dir=" + posixpath.join(self.work_dir, "checkpoints"),
+      "--log-file=" + posixpath.join(self.work_dir, "summary"),
+      "--event-log=" + self.event_log]
+    command = " ".join(shlex.quote(arg) for arg in argv)
+    if self.cores is not None:
+      command = "taskset -c {} {}".format(",".join(str(core) for core in self.cores), command)
+    return "cd {} && mkdir -p {} && echo $$ && exec {} >> {} 2>&1".format(
+      shlex.quote(self.dir), shlex.quote(self.work_dir), command,
+      shlex.quote(posixpath.join(self.work_dir, "log")))
+
+  def read_events(self):
+    data = self.host.read_from(posixpath.join(self.dir, self.event_log), self.event_offset)
+    if len(data) == 0:
+      return
+    self.event_offset += len(data)
+    self.metrics.update(self.events.parse(data.decode("utf-8")))
+
+  def status(self):
+    return {"name": self.name, "host": self.host.name, "state": self.state,
+            "reason": self.reason, "starts": self.starts, "failures": self.failures,
+            "pid": self.pid, "exit_code": self.exit_code, "cores": self.cores,
+            "rss_mb": self.rss_mb, "memory_mb": self.memory_mb,
+            "config": self.config, "metrics": self.metrics.to_dict()}
+
+
+class Supervisor(object):
+  def __init__(self, runs, restart_delay=60.0, max_failures=5, kill_timeout=300.0):
+    self.runs = runs
+    self.restart_delay = restart_delay
+    self.max_failures = max_failures
+    self.kill_timeout = kill_timeout
+    self.stopping = False
+
+  def start_run(self, run):
+    if not run.host.is_up():
+      return
+    if run.pid is not None and run.host.is_alive(run.pid):
+      # connection to host was lost, but previous process is still running
+      self.stop_run(run, "orphan")
+      return
+    if run.cpus is not None:
+      run.cores = run.host.allocate_cores(run.cpus)
+      if run.cores is None:
+        run.reason = "waiting for {} cores".format(run.cpus)
+        return
+    run.process = run.host.popen(run.command())
+    line = run.process.stdout.readline()
+    run.pid = int(line) if line.strip().isdigit() else None
+    run.state = "running"
+    run.reason = None
+    run.starts += 1
+    run.exit_code = None
+    run.stop_time = None
+    run.stop_reason = None
+    run.checkpoint_at_start = run.metrics.checkpoint_t
+    print("{}: started on {} (pid={}, cores={})".format(run.name, run.host.name, run.pid, run.cores))
+
+  def stop_run(self, run, reason, restart=True):
+    # SIGINT (checkpoint is saved by a3c.py), then SIGKILL after kill_timeout
+    now = time.time()
+    if run.stop_time is None:
+      print("{}: stopping ({})".format(run.name, reason))
+      run.stop_time = now
+      run.stop_reason = reason
+      run.restart_after_stop = restart
+      run.host.signal(run.pid, signal.SIGINT)
+    elif now - run.stop_time > self.kill_timeout:
+      print("{}: killed ({})".format(run.name, reason))
+      run.host.signal(run.pid, signal.SIGKILL)
+
+  def on_exit(self, run, exit_code):
+    run.exit_code = exit_code
+    run.process.stdout.close()
+    run.process = None
+    run.rss_mb = None
+    if run.cores is not None:
+      run.host.release_cores(run.cores)
+      run.cores = None
+    run.read_events()
+    if run.metrics.finished:
+      run.state = "finished"
+      run.reason = None
+    elif self.stopping:
+      run.state = "stopped"
+      run.reason = None
+    elif not run.restart_after_stop:
+      run.state = "stopped"
+      run.reason = run.stop_reason
+    else:
+      if exit_code == 255 and isinstance(run.host, SSHHost):
+        run.reason = "connection lost"
+      elif run.stop_reason is not None:
+        run.reason = run.stop_reason
+      else:
+        run.reason = "exit {}".format(exit_code)
+      if run.metrics.checkpoint_t != run.checkpoint_at_start:
+        run.failures = 0
+      else:
+        run.failures += 1
+      if run.failures > self.max_failures:
+        run.state = "failed"
+      else:
+        run.state = "restarting"
+        run.next_start_time = time.time() + self.restart_delay
+    run.stop_time = None
+    run.stop_reason = None
+    run.restart_after_stop = True
+    print("{}: {} (exit code {}, {})".format(run.name, run.state, exit_code, run.reason))
+
+  def poll(self):
+    now = time.time()
+    for run in self.runs:
+      if run.state == "running":
+        run.read_events()
+        exit_code = run.process.poll()
+        if exit_code is not None:
+          self.on_exit(run, exit_code)
+          continue
+        if self.stopping:
+          self.stop_run(run, "supervisor stopped")
+          continue
+        if run.pid is not None:
+          run.rss_mb = run.host.rss_mb(run.pid)
+        if run.stop_time is not None:
+          self.stop_run(run, run.stop_reason, run.restart_after_stop)
+        elif run.memory_mb is not None and run.rss_mb is not None and \
+             run.rss_mb > run.memory_mb:
+          self.stop_run(run, "memory {:.0f}MB > {}MB".format(run.rss_mb, run.memory_mb))
+      elif run.state in ["pending", "restarting"]:
+        if self.stopping:
+          run.state = "stopped"
+        elif now >= run.next_start_time:
+          self.start_run(run)
+
+  def is_done(self):
+    return all(run.state in ["finished", "failed", "stopped"] for run in self.runs)
+
+  def snapshot(self):
+    return {"time": time.time(), "runs": [run.status() for run in self.runs]}
+
+
+def load_hosts(config):
+  # hosts in "hosts" of config (and localhost) by name
+  hosts = {LOCALHOST: LocalHost(LOCALHOST)}
+  for name, host_config in (config.get("hosts") or {}).items():
+    host_config = dict(host_config)
+    if "ssh" in host_config:
+      hosts[name] = SSHHost(name, host_config.pop("ssh"), **host_config)
+    else:
+      hosts[name] = LocalHost(name, **host_config)
+  return hosts
+
+def load_config(path):
+  # list of Run
+  with open(path) as f:
+    config = yaml.safe_load(f)
+  hosts = load_hosts(config)
+  runs = []
+  for run_config in config["runs"]:
+    run_config = dict(run_config)
+    host = hosts[run_config.pop("host", LOCALHOST)]
+    run_config["directory"] = run_config.pop("dir", ".")
+    runs.append(Run(host=host, **run_config))
+  return runs
+
+def _format(value, format_spec="{}"):
+  return "" if value is None else format_spec.format(value)
+
+def status_html(snapshot):
+  rows = []
+  for run in snapshot["runs"]:
+    metrics = run["metrics"]
+    values = [run["name"], run["host"], run["state"], _format(run["reason"]),
+              str(run["starts"]), str(metrics["global_t"]),
+              _format(metrics["steps_per_sec"], "{:.0f}"), _format(metrics["checkpoint_t"]),
+              str(metrics["episodes"]), _format(metrics["average_score"], "{:.1f}"),
+              _format(metrics["max_score"], "{:.0f}"),
+              " ".join(str(room) for room in metrics["rooms"]),
+              _format(run["rss_mb"], "{:.0f}"), _format(run["cores"]),
+              " ".join("{}={}".format(k, v) for k, v in sorted((run["config"] or {}).items()))]
+    rows.append("<tr>" + "".join("<td>{}</td>".format(html.escape(value)) for value in values) + "</tr>")
+  header = ["run", "host", "state", "reason", "starts", "global_t", "steps/sec",
+            "checkpoint", "episodes", "average", "max", "rooms", "rss(MB)", "cores", "config"]
+  return "\n".join([
+    "<html>",
+    "<head><meta http-equiv=\"refresh\" content=\"60\"><title>runs</title></head>",
+    "<body>",
+    "<p>{}</p>".format(time.strftime("%Y/%m/%d-%H:%M:%S", time.localtime(snapshot["time"]))),
+    "<table border=\"1\">",
+    "<tr>" + "".join("<th>{}</th>".format(name) for name in header) + "</tr>"] +
+    rows + ["</table>", "</body>", "</html>", ""])
+
+def write_status(snapshot, status_dir):
+  # written atomically (status page can be served while it is updated)
+  for fname, content in [("status.json", json.dumps(snapshot, indent=1)),
+                         ("status.html", status_html(snapshot))]:
+    path = os.path.join(status_dir, fname)
+    with open(path + ".tmp", "w") as f:
+      f.write(content)
+    os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+  args = parser.parse_args()
+  supervisor = Supervisor(load_config(args.config), restart_delay=args.restart_delay,
+                          max_failures=args.max_failures, kill_timeout=args.kill_timeout)
+
+  def signal_handler(signum, frame):
+    print("stopping all runs")
+    supervisor.stopping = True
+  signal.signal(signal.SIGINT, signal_handler)
+  signal.signal(signal.SIGTERM, signal_handler)
+
+  status_server = None
+  if args.status_port is not None:
+    status_server = StatusServer(args.status_port, supervisor.snapshot, host=args.status_host)
+    status_server.start()
+    print("Status is served at http://{}:{}/status".format(args.status_host, status_server.port))
+
+  while True:
+    supervisor.poll()
+    write_status(supervisor.snapshot(), args.status_dir)
+    sys.stdout.flush()
+    if supervisor.is_done():
+      break
+    # poll stopping runs more often
+    time.sleep(1.0 if supervisor.stopping else args.poll_interval)
+
+  if status_server is not None:
+    status_server.stop()
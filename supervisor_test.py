@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import supervisor
+from supervisor import LocalHost, Run, RunMetrics, Supervisor
+
+# fake a3c.py: crashes at first start, and ends training at second start
+# (or is stopped by SIGINT while sleeping with "--sleep")
+PROGRAM = """
+import argparse, os, signal, sys, time
+sys.path.insert(0, {repo!r})
+import event_log
+parser = argparse.ArgumentParser()
+parser.add_argument('--event-log')
+parser.add_argument('--checkpoint-dir')
+parser.add_argument('--sleep', type=float, default=0.0)
+args, _ = parser.parse_known_args()
+event_log.open_log(args.event_log)
+if args.sleep > 0:
+  signal.signal(signal.SIGINT, lambda signum, frame: None)
+  time.sleep(args.sleep)
+  event_log.emit("stop", 0, 1.0, "signal")
+  event_log.close()
+  sys.exit(0)
+count_file = os.path.join(args.checkpoint_dir, "count")
+if not os.path.exists(args.checkpoint_dir):
+  os.makedirs(args.checkpoint_dir)
+count = int(open(count_file).read()) if os.path.exists(count_file) else 0
+open(count_file, "w").write(str(count + 1))
+event_log.emit("episode", 1.0, 100 * count + 50, 0, 10 * count, "END", count, 100)
+event_log.emit("checkpoint", 100 * (count + 1), 1.0)
+if count == 0:
+  event_log.close()
+  sys.exit(1)
+event_log.emit("stop", 200, 2.0, "end")
+event_log.close()
+"""
+
+class TestSupervisor(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.program = os.path.join(self.dir, "program.py")
+    with open(self.program, "w") as f:
+      f.write(PROGRAM.format(repo=os.path.dirname(os.path.abspath(supervisor.__file__))))
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def supervise(self, runs, **kwargs):
+    sv = Supervisor(runs, restart_delay=0.0, kill_timeout=10.0, **kwargs)
+    deadline = time.time() + 60.0
+    while not sv.is_done():
+      self.assertLess(time.time(), deadline)
+      sv.poll()
+      time.sleep(0.05)
+    return sv
+
+  def test_parse_rss_mb(self):
+    self.assertEqual(2.0, supervisor.parse_rss_mb("Name:\tpython\nVmRSS:\t    2048 kB\n"))
+    self.assertIsNone(supervisor.parse_rss_mb("Name:\tpython\n"))
+
+  def test_metrics(self):
+    metrics = RunMetrics()
+    metrics.update([("episode", {"t": 1.0, "s": 100, "th": 0, "r": 400, "end": "END", "room": 1, "steps": 10}),
+                    ("episode", {"t": 2.0, "s": 200, "th": 1, "r": 0, "end": "END", "room": 0, "steps": 10}),
+                    ("new_room", {"th": 1, "room": 4}),
+                    ("average", {"s": 250, "th": 1, "average": 12.5}),
+                    ("checkpoint", {"s": 300, "wall_t": 10.0})])
+    self.assertEqual(300, metrics.global_t)
+    self.assertEqual(200.0, metrics.average_score())
+    self.assertEqual(400, metrics.max_score)
+    self.assertEqual([0, 1, 4], metrics.to_dict()["rooms"])
+    self.assertEqual({"1": 12.5}, metrics.to_dict()["thread_averages"])
+    self.assertFalse(metrics.finished)
+    metrics.update([("stop", {"s": 300, "wall_t": 11.0, "reason": "end"})])
+    self.assertTrue(metrics.finished)
+
+  def test_cores(self):
+    host = LocalHost("localhost", cores=4)
+    self.assertEqual([0, 1, 2], host.allocate_cores(3))
+    self.assertIsNone(host.allocate_cores(2))
+    self.assertEqual([3], host.allocate_cores(1))
+    host.release_cores([0, 1, 2])
+    self.assertEqual([0, 1], host.allocate_cores(2))
+
+  def test_restart(self):
+    host = LocalHost("localhost", cores=1)
+    run = Run("a", host, directory=self.dir, program=self.program, cpus=1)
+    sv = self.supervise([run])
+    self.assertEqual("finished", run.state)
+    self.assertEqual(2, run.starts)
+    self.assertEqual(200, run.metrics.checkpoint_t)
+    self.assertEqual(200, run.metrics.global_t)
+    self.assertEqual(2, run.metrics.episodes)
+    self.assertEqual([0, 1], sorted(run.metrics.rooms))
+    self.assertEqual([0], host.free_cores)
+    self.assertTrue(os.path.exists(os.path.join(self.dir, "runs", "a", "log")))
+
+    supervisor.write_status(sv.snapshot(), self.dir)
+    with open(os.path.join(self.dir, "status.json")) as f:
+      status = json.load(f)
+    self.assertEqual("finished", status["runs"][0]["state"])
+    with open(os.path.join(self.dir, "status.html")) as f:
+      self.assertIn("<td>finished</td>", f.read())
+
+  def test_failures(self):
+    # always crashes without new checkpoint
+    run = Run("b", LocalHost("localhost"), directory=self.dir, program=self.program)
+    with open(self.program, "w") as f:
+      f.write("import sys\nsys.exit(3)\n")
+    self.supervise([run], max_failures=2)
+    self.assertEqual("failed", run.state)
+    self.assertEqual(3, run.starts)
+    self.assertEqual("exit 3", run.reason)
+
+  def test_memory_quota(self):
+    run = Run("c", LocalHost("localhost"), directory=self.dir, program=self.program,
+              args=["--sleep=30"], memory_mb=1)
+    self.supervise([run], max_failures=0)
+    self.assertEqual("failed", run.state)
+    self.assertEqual(1, run.starts)
+    self.assertTrue(run.reason.startswith("memory"))
+    self.assertFalse(run.metrics.finished)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+import argparse
+import itertools
+import math
+import shlex
+import signal
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+import yaml
+
+import options
+import supervisor
+from supervisor import Run, Supervisor
+
+# Parallel hyperparameter sweep on supervisor.py (replaces case blocks of
+# run-option and tes_list/psc_beta_list/psc_pow_list files of gen-param.py).
+#   python sweep.py sweep.yaml --status-dir=/var/www/html
+#   python sweep.py sweep.yaml --dry-run (print configurations only)
+# Search space is defined in YAML file, e.g.
+#   name: psc
+#   args: --rom=montezuma_revenge.bin --psc-use=True --end-mega-step=100
+#   samples: 12                 # number of sampled configs (0: full grid)
+#   seed: 0
+#   space:
+#     parallel_size: [4, 8]     # list: grid values (or choice if sampled)
+#     psc_beta: {log_uniform: [0.005, 0.05]}
+#     frames_skip_in_gs: {choice: [4, 6, 7]}
+#     tes_list: {per_thread: {uniform: [20, 40], round: 0}}
+#   early_stop:
+#     min_steps: 20000000
+#     count: 2
+#     margin: 0.0
+#   hosts: (same as supervisor.py, localhost is always used)
+# Distributions (dict) are sampled for each config, also in grid mode.
+# "per_thread" makes comma separated list of parallel_size values for options
+# like --tes-list.
+# Runs are packed onto free cores of hosts: each run needs parallel_size cores
+# (its threads are pinned to them), and configs are placed largest first on
+# the host with fewest free cores left (best fit), so cores stay saturated
+# when runs of different sizes end.
+# Progress of runs is tracked by supervisor.py through their event logs.
+# With early_stop, a run past min_steps is stopped when at least COUNT other
+# runs which reached the same global step had higher Episode_scores average
+# (mean over threads) at that step than the best average of the run (+MARGIN).
+
+parser = argparse.ArgumentParser(description="parallel hyperparameter sweep of A3C")
+parser.add_argument('config', help="YAML file of search space")
+parser.add_argument('--dry-run', action='store_true',
+                    help="print configurations and exit")
+parser.add_argument('--poll-interval', type=float, default=30.0,
+                    help="seconds between polls of runs")
+parser.add_argument('--restart-delay', type=float, default=60.0,
+                    help="seconds before restart of crashed run")
+parser.add_argument('--max-failures', type=int, default=5,
+                    help="give up run after MAX_FAILURES restarts without new checkpoint")
+parser.add_argument('--kill-timeout', type=float, default=300.0,
+                    help="seconds to wait for checkpoint after SIGINT before SIGKILL")
+parser.add_argument('--status-dir', default=".",
+                    help="directory of status.html and status.json")
+
+def sample_value(spec, rng):
+  if "choice" in spec:
+    value = spec["choice"][rng.randint(len(spec["choice"]))]
+  elif "uniform" in spec:
+    low, high = spec["uniform"]
+    value = rng.uniform(low, high)
+  elif "log_uniform" in spec:
+    low, high = spec["log_uniform"]
+    value = math.exp(rng.uniform(math.log(low), math.log(high)))
+  else:
+    raise ValueError("unknown distribution: {}".format(spec))
+  if "round" in spec:
+    value = round(value, spec["round"])
+    if spec["round"] == 0:
+      value = int(value)
+  return value
+
+def config_value(spec, rng, parallel_size):
+  # value of option given by distribution SPEC
+  if "per_thread" in spec:
+    return ",".join(str(sample_value(spec["per_thread"], rng)) for _ in range(parallel_size))
+  return sample_value(spec, rng)
+
+def base_parallel_size(base_args):
+  base_parser = argparse.ArgumentParser(add_help=False)
+  base_parser.add_argument('--parallel-size', type=int, default=options.PARALLEL_SIZE)
+  return base_parser.parse_known_args(base_args)[0].parallel_size
+
+def generate_configs(space, samples=0, seed=0, base_args=()):
+  """List of configs (OrderedDict of option -> value) of search space.
+
+  With samples == 0, configs are full grid of list values, otherwise SAMPLES
+  configs are sampled (list values are chosen at random).
+  """
+  rng = np.random.RandomState(seed)
+  # parallel_size first (needed by per_thread)
+  names = sorted(space.keys(), key=lambda name: name != "parallel_size")
+  grid_names = [name for name in names if isinstance(space[name], list)]
+  if samples == 0:
+    grid = [OrderedDict(zip(grid_names, values))
+            for values in itertools.product(*[space[name] for name in grid_names])]
+  else:
+    grid = [OrderedDict((name, space[name][rng.randint(len(space[name]))]) for name in grid_names)
+            for _ in range(samples)]
+  configs = []
+  for values in grid:
+    parallel_size = values.get("parallel_size", base_parallel_size(base_args))
+    config = OrderedDict()
+    for name in names:
+      if name in values:
+        config[name] = values[name]
+      else:
+        config[name] = config_value(space[name], rng, parallel_size)
+    configs.append(config)
+  return configs
+
+def config_args(config):
+  return ["--{}={}".format(name.replace("_", "-"), value) for name, value in config.items()]
+
+def make_runs(sweep_config):
+  # (unplaced) runs of sweep: host is set by place()
+  base_args = shlex.split(sweep_config.get("args", ""))
+  configs = generate_configs(sweep_config["space"], sweep_config.get("samples", 0),
+                             sweep_config.get("seed", 0), base_args)
+  runs = []
+  for i, config in enumerate(configs):
+    parallel_size = config.get("parallel_size", base_parallel_size(base_args))
+    runs.append(Run("{}-{:03d}".format(sweep_config.get("name", "sweep"), i), None,
+                    directory=sweep_config.get("dir", "."),
+                    args=base_args + config_args(config), cpus=parallel_size,
+                    memory_mb=sweep_config.get("memory_mb"), config=config))
+  return runs
+
+def reserved_cores(host, runs):
+  # cores of runs on HOST which are not running but will be started
+  return sum(run.cpus for run in runs
+             if run.host is host and run.state in ["pending", "restarting"])
+
+def place(unplaced, hosts, runs):
+  """Place runs of UNPLACED onto free cores of HOSTS (best fit decreasing).
+
+  RUNS are runs already placed. Returns list of placed runs.
+  """
+  free = dict((host.name, len(host.free_cores) - reserved_cores(host, runs))
+              for host in hosts if host.free_cores is not None)
+  placed = []
+  for run in sorted(unplaced, key=lambda run: -run.cpus):
+    fits = [host for host in hosts if free.get(host.name, 0) >= run.cpus]
+    if len(fits) == 0:
+      continue
+    host = min(fits, key=lambda host: free[host.name] - run.cpus)
+    free[host.name] -= run.cpus
+    run.host = host
+    placed.append(run)
+  return placed
+
+def score_at(history, global_t):
+  # latest score of (global_t, score) history at or before GLOBAL_T
+  score = None
+  for t, value in history:
+    if t > global_t:
+      break
+    score = value
+  return score
+
+def is_dominated(run, runs, min_steps, count, margin=0.0):
+  metrics = run.metrics
+  if metrics.global_t < min_steps or len(metrics.score_history) == 0:
+    return False
+  best = max(value for _, value in metrics.score_history)
+  better = 0
+  for other in runs:
+    if other is run or other.metrics.global_t < metrics.global_t:
+      continue
+    score = score_at(other.metrics.score_history, metrics.global_t)
+    if score is not None and score > best + margin:
+      better += 1
+  return better >= count
+
+def stop_dominated(supervisor_, runs, early_stop):
+  for run in runs:
+    if run.state == "running" and run.stop_time is None and \
+       is_dominated(run, runs, early_stop.get("min_steps", 0),
+                    early_stop.get("count", 1), early_stop.get("margin", 0.0)):
+      supervisor_.stop_run(run, "dominated", restart=False)
+
+
+if __name__ == "__main__":
+  args = parser.parse_args()
+  with open(args.config) as f:
+    sweep_config = yaml.safe_load(f)
+  unplaced = make_runs(sweep_config)
+  if args.dry_run:
+    for run in unplaced:
+      print(run.name, "cpus={}".format(run.cpus), " ".join(config_args(run.config)))
+    sys.exit(0)
+
+  hosts = list(supervisor.load_hosts(sweep_config).values())
+  for host in hosts:
+    host.is_up()
+  max_cores = max(host.cores or 0 for host in hosts)
+  for run in [run for run in unplaced if run.cpus > max_cores]:
+    print("{}: skipped ({} threads > {} cores)".format(run.name, run.cpus, max_cores))
+    unplaced.remove(run)
+  early_stop = sweep_config.get("early_stop")
+  supervisor_ = Supervisor([], restart_delay=args.restart_delay,
+                           max_failures=args.max_failures, kill_timeout=args.kill_timeout)
+
+  def signal_handler(signum, frame):
+    print("stopping all runs")
+    supervisor_.stopping = True
+  signal.signal(signal.SIGINT, signal_handler)
+  signal.signal(signal.SIGTERM, signal_handler)
+
+  print("{} runs on {} cores".format(len(unplaced), sum(host.cores or 0 for host in hosts)))
+  while True:
+    if not supervisor_.stopping:
+      for host in hosts:
+        if host.free_cores is None:
+          host.is_up() # number of cores of SSH host is not known yet
+      for run in place(unplaced, hosts, supervisor_.runs):
+        unplaced.remove(run)
+        supervisor_.runs.append(run)
+    supervisor_.poll()
+    if early_stop is not None:
+      stop_dominated(supervisor_, supervisor_.runs, early_stop)
+    snapshot = supervisor_.snapshot()
+    snapshot["unplaced"] = [run.name for run in unplaced]
+    supervisor.write_status(snapshot, args.status_dir)
+    sys.stdout.flush()
+    if supervisor_.is_done() and (supervisor_.stopping or len(unplaced) == 0):
+      break
+    time.sleep(1.0 if supervisor_.stopping else args.poll_interval)
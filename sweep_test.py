@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import sweep
+from supervisor import LocalHost, Run
+
+def run_with_history(name, global_t, history, state="running"):
+  run = Run(name, None)
+  run.state = state
+  run.metrics.global_t = global_t
+  run.metrics.score_history = history
+  return run
+
+class TestSweep(unittest.TestCase):
+  def test_grid(self):
+    space = {"psc_beta": [0.01, 0.02, 0.03], "use_lstm": [True, False],
+             "psc_pow": {"uniform": [1.0, 3.0]}}
+    configs = sweep.generate_configs(space)
+    self.assertEqual(6, len(configs))
+    self.assertEqual(6, len(set((c["psc_beta"], c["use_lstm"]) for c in configs)))
+    self.assertTrue(all(1.0 <= c["psc_pow"] <= 3.0 for c in configs))
+    self.assertEqual(["--psc-beta=0.01", "--use-lstm=True"],
+                     sweep.config_args(configs[0])[:2])
+
+  def test_samples(self):
+    space = {"parallel_size": [2, 4],
+             "psc_beta": {"log_uniform": [0.005, 0.05]},
+             "frames_skip_in_gs": {"choice": [4, 6, 7]},
+             "tes_list": {"per_thread": {"uniform": [20, 40], "round": 0}}}
+    configs = sweep.generate_configs(space, samples=10, seed=1)
+    self.assertEqual(10, len(configs))
+    self.assertEqual(configs, sweep.generate_configs(space, samples=10, seed=1))
+    self.assertEqual("parallel_size", list(configs[0].keys())[0])
+    for config in configs:
+      self.assertTrue(0.005 <= config["psc_beta"] <= 0.05)
+      self.assertIn(config["frames_skip_in_gs"], [4, 6, 7])
+      tes = config["tes_list"].split(",")
+      self.assertEqual(config["parallel_size"], len(tes))
+      self.assertTrue(all(20 <= int(t) <= 40 for t in tes))
+    # parallel size of base args
+    configs = sweep.generate_configs({"tes_list": {"per_thread": {"choice": [30]}}},
+                                     base_args=["--parallel-size=3"])
+    self.assertEqual("30,30,30", configs[0]["tes_list"])
+
+  def test_make_runs(self):
+    runs = sweep.make_runs({"name": "s", "args": "--rom=pong.bin --parallel-size=2",
+                            "space": {"parallel_size": [1, 4], "gamma": [0.9]}})
+    self.assertEqual(["s-000", "s-001"], [run.name for run in runs])
+    self.assertEqual([1, 4], [run.cpus for run in runs])
+    self.assertEqual(["--rom=pong.bin", "--parallel-size=2", "--parallel-size=1", "--gamma=0.9"],
+                     runs[0].args)
+
+  def test_place(self):
+    small = LocalHost("small", cores=4)
+    large = LocalHost("large", cores=8)
+    runs = [Run(str(i), None, cpus=cpus) for i, cpus in enumerate([2, 8, 4, 2, 2])]
+    placed = sweep.place(runs, [small, large], [])
+    # largest first, on host with fewest cores left
+    self.assertEqual(["1", "2"], [run.name for run in placed])
+    self.assertEqual([large, small], [run.host for run in placed])
+    # cores of pending runs are reserved
+    self.assertEqual([], sweep.place(runs[:1], [small, large], placed))
+    small.allocate_cores(4)
+    large.allocate_cores(6)
+    placed = sweep.place([runs[0], runs[3]], [small, large], [])
+    self.assertEqual([large], [run.host for run in placed])
+
+  def test_dominated(self):
+    self.assertEqual(None, sweep.score_at([(100, 1.0)], 50))
+    self.assertEqual(2.0, sweep.score_at([(100, 1.0), (200, 2.0), (300, 3.0)], 250))
+    bad = run_with_history("bad", 300, [(100, 0.0), (300, 1.0)])
+    good = run_with_history("good", 400, [(100, 5.0), (250, 6.0)])
+    fine = run_with_history("fine", 300, [(200, 2.0)])
+    behind = run_with_history("behind", 200, [(200, 100.0)])
+    runs = [bad, good, fine, behind]
+    self.assertTrue(sweep.is_dominated(bad, runs, min_steps=0, count=2))
+    self.assertFalse(sweep.is_dominated(bad, runs, min_steps=0, count=3))
+    self.assertFalse(sweep.is_dominated(bad, runs, min_steps=0, count=2, margin=1.5))
+    self.assertFalse(sweep.is_dominated(bad, runs, min_steps=1000, count=1))
+    self.assertFalse(sweep.is_dominated(good, runs, min_steps=0, count=1))
+
+if __name__ == '__main__':
+  unittest.main()